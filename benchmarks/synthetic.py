@@ -0,0 +1,286 @@
+"""
+synthetic.py
+
+Generates synthetic BioRECIPE models and machine reading outputs (LEE sets) for benchmarking VIOLIN
+Created October 2026 - MeLoDy Lab
+"""
+
+import numpy as np
+import pandas as pd
+
+# Element types and their listname abbreviations (see formatting.type_abbr_dict)
+type_mix_def = {'protein': 0.6,
+                'protein family': 0.2,
+                'gene': 0.1,
+                'chemical': 0.1}
+
+# Compartment names and GO identifiers
+compartment_mix_def = {'cytoplasm': ('GO:0005737', 0.5),
+                       'nucleus': ('GO:0005634', 0.3),
+                       'plasma membrane': ('GO:0005886', 0.2)}
+
+_type_abbr = {'protein': 'pn',
+              'protein family': 'pf',
+              'protein complex': 'pf',
+              'gene': 'gene',
+              'chemical': 'che',
+              'rna': 'rna',
+              'biological process': 'bp'}
+
+model_columns_def = ['#', 'Variable', 'Element Name', 'Element Type', 'Element Subtype', 'Element HGNC Symbol',
+                     'Element Database', 'Element IDs', 'Compartment', 'Compartment ID',
+                     'Cell Line', 'Cell Type', 'Tissue Type', 'Organism',
+                     'Positive Regulator List', 'Positive Connection Type List',
+                     'Positive Mechanism List', 'Positive Site List',
+                     'Negative Regulator List', 'Negative Connection Type List',
+                     'Negative Mechanism List', 'Negative Site List',
+                     'Positive Regulation Rule', 'Negative Regulation Rule']
+
+reading_columns_def = ["Regulator Name", "Regulator Type", "Regulator Subtype", "Regulator HGNC Symbol", "Regulator Database", "Regulator ID", "Regulator Compartment", "Regulator Compartment ID",
+                       "Regulated Name", "Regulated Type", "Regulated Subtype", "Regulated HGNC Symbol", "Regulated Database", "Regulated ID", "Regulated Compartment", "Regulated Compartment ID",
+                       "Sign", "Connection Type", "Mechanism", "Site",
+                       "Cell Line", "Cell Type", "Tissue Type", "Organism",
+                       "Score", "Source", "Statements", "Paper IDs"]
+
+
+def _element_names(prefix, idx, width):
+    # Fixed-width names, so that no element name is a substring of another one
+    return ['{}{}'.format(prefix, str(i).zfill(width)) for i in idx]
+
+
+def synthetic_model(n_elements,
+                    in_degree=2,
+                    type_mix=type_mix_def,
+                    compartment_mix=compartment_mix_def,
+                    negative_fraction=0.3,
+                    direct_fraction=0.5,
+                    seed=0):
+    """
+    This function generates a random model spreadsheet in the BioRECIPE format
+
+    Parameters
+    ----------
+    n_elements : int
+        Number of model elements (rows)
+    in_degree : int
+        Average number of regulators of each element
+        Default is 2
+    type_mix : dict
+        Element types and the fraction of elements of each type
+        Default values found in type_mix_def
+    compartment_mix : dict
+        Compartment names with their (GO identifier, fraction) pairs
+        Default values found in compartment_mix_def
+    negative_fraction : float
+        Fraction of regulators that are negative regulators
+        Default is 0.3
+    direct_fraction : float
+        Fraction of model interactions with a direct connection type
+        Default is 0.5
+    seed : int
+        Seed of the random number generator
+        Default is 0
+
+    Returns
+    -------
+    model_df : pd.DataFrame
+        Model dataframe in the BioRECIPE format, as it would be read from a model file
+    """
+    rng = np.random.default_rng(seed)
+    width = len(str(n_elements))
+
+    types = rng.choice(list(type_mix.keys()), size=n_elements,
+                       p=np.array(list(type_mix.values())) / sum(type_mix.values()))
+    comp_names = list(compartment_mix.keys())
+    comp_p = np.array([compartment_mix[c][1] for c in comp_names])
+    comps = rng.choice(comp_names, size=n_elements, p=comp_p / comp_p.sum())
+    comp_ids = [compartment_mix[c][0] for c in comps]
+
+    names = _element_names('P', range(n_elements), width)
+    listnames = ['{}_{}_kin_{}'.format(name, _type_abbr.get(t, t.replace(' ', '')), cid.replace(':', ''))
+                 for name, t, cid in zip(names, types, comp_ids)]
+
+    pos_regs, pos_cxn, neg_regs, neg_cxn = [], [], [], []
+    for idx in range(n_elements):
+        n_regs = min(rng.poisson(in_degree), n_elements - 1)
+        regs = rng.choice(n_elements - 1, size=n_regs, replace=False)
+        # Skip the element itself, so there are no self-regulations
+        regs = [r if r < idx else r + 1 for r in regs]
+        negative = rng.random(n_regs) < negative_fraction
+        direct = rng.random(n_regs) < direct_fraction
+        pos = [listnames[r] for r, neg in zip(regs, negative) if not neg]
+        neg = [listnames[r] for r, neg in zip(regs, negative) if neg]
+        pos_regs.append(','.join(pos) if pos else np.nan)
+        neg_regs.append(','.join(neg) if neg else np.nan)
+        pos_cxn.append(','.join('D' if d else 'I' for d, neg in zip(direct, negative) if not neg) if pos else np.nan)
+        neg_cxn.append(','.join('D' if d else 'I' for d, neg in zip(direct, negative) if neg) if neg else np.nan)
+
+    model_df = pd.DataFrame({
+        '#': np.arange(1, n_elements + 1),
+        'Variable': [name + '_' + _type_abbr.get(t, 'other') for name, t in zip(names, types)],
+        'Element Name': names,
+        'Element Type': types,
+        'Element Subtype': 'kinase',
+        'Element HGNC Symbol': _element_names('SYM', range(n_elements), width),
+        'Element Database': 'UniProt',
+        'Element IDs': _element_names('Q', range(n_elements), width),
+        'Compartment': comps,
+        'Compartment ID': comp_ids,
+        'Cell Line': np.nan,
+        'Cell Type': np.nan,
+        'Tissue Type': np.nan,
+        'Organism': 'Human',
+        'Positive Regulator List': pos_regs,
+        'Positive Connection Type List': pos_cxn,
+        'Positive Mechanism List': np.nan,
+        'Positive Site List': np.nan,
+        'Negative Regulator List': neg_regs,
+        'Negative Connection Type List': neg_cxn,
+        'Negative Mechanism List': np.nan,
+        'Negative Site List': np.nan,
+        'Positive Regulation Rule': np.nan,
+        'Negative Regulation Rule': np.nan,
+    }, columns=model_columns_def)
+
+    return model_df
+
+
+def _model_edges(model_df):
+    # (regulator row, regulated row, sign) triples of the model interactions
+    name_idx = {name: idx for idx, name in enumerate(model_df['Element Name'])}
+    edges = []
+    for idx in range(len(model_df)):
+        for sign in ['Positive', 'Negative']:
+            regs = model_df.at[idx, sign + ' Regulator List']
+            if isinstance(regs, str):
+                # Listnames start with the element name
+                edges += [(name_idx[reg.split('_')[0]], idx, sign.lower()) for reg in regs.split(',')]
+    return edges
+
+
+def synthetic_reading(model_df,
+                      n_lees,
+                      duplicate_rate=0.2,
+                      hit_rate=0.5,
+                      path_only_fraction=0.2,
+                      seed=0):
+    """
+    This function generates a random machine reading output (LEE set) in the BioRECIPE format,
+    with interactions drawn with respect to a (synthetic) model
+
+    Parameters
+    ----------
+    model_df : pd.DataFrame
+        Model dataframe in the BioRECIPE format, see synthetic_model()
+    n_lees : int
+        Total number of LEEs (rows), including duplicates
+    duplicate_rate : float
+        Fraction of the rows which repeat an earlier LEE (with a different paper ID),
+        these are merged into the Evidence Score by preprocessing
+        Default is 0.2
+    hit_rate : float
+        Fraction of the unique LEEs whose regulator and regulated are both model elements
+        Default is 0.5
+    path_only_fraction : float
+        Fraction of the hits which are not model interactions,
+        but are connected by a (two-step) path in the model
+        Default is 0.2
+    seed : int
+        Seed of the random number generator
+        Default is 0
+
+    Returns
+    -------
+    reading_df : pd.DataFrame
+        Reading dataframe in the BioRECIPE format, as it would be read from a reading file
+    """
+    rng = np.random.default_rng(seed)
+    n_model = len(model_df)
+    n_unique = max(1, int(round(n_lees * (1 - duplicate_rate))))
+    n_hits = int(round(n_unique * hit_rate))
+    n_path = int(round(n_hits * path_only_fraction))
+    n_misses = n_unique - n_hits
+
+    edges = _model_edges(model_df)
+    regulators_of = {}
+    for s, t, sign in edges:
+        regulators_of.setdefault(t, []).append((s, sign))
+
+    pairs = []
+    # Hits matching a model interaction (either sign, so that some are contradictions)
+    for e in rng.integers(0, len(edges), size=n_hits - n_path) if edges else []:
+        s, t, sign = edges[e]
+        if rng.random() < 0.2:
+            sign = 'negative' if sign == 'positive' else 'positive'
+        pairs.append((s, t, sign))
+    # Hits only connected through a path: regulator of a regulator of the target
+    two_step = [(s2, t) for t, regs in regulators_of.items() for s, _ in regs
+                for s2, _ in regulators_of.get(s, []) if s2 != t]
+    for e in rng.integers(0, len(two_step), size=n_path) if two_step else []:
+        s, t = two_step[e]
+        pairs.append((s, t, rng.choice(['positive', 'negative'])))
+    # Misses: hanging extensions (target in model) and full extensions (neither in model)
+    width = len(str(n_misses + n_unique + 1))
+    for m in range(n_misses):
+        t = int(rng.integers(0, n_model)) if m % 2 == 0 else -1
+        pairs.append((-(m + 1), t, rng.choice(['positive', 'negative'])))
+
+    def element(idx, miss_id):
+        if idx >= 0:
+            row = model_df.loc[idx]
+            return (row['Element Name'], row['Element Type'], row['Element HGNC Symbol'],
+                    row['Element IDs'].split(',')[0], row['Compartment'], row['Compartment ID'])
+        name = 'X' + str(miss_id).zfill(width)
+        return (name, 'protein', np.nan, 'U' + str(miss_id).zfill(width), np.nan, np.nan)
+
+    rows = []
+    for n, (s, t, sign) in enumerate(pairs):
+        reg = element(s, -s if s < 0 else n)
+        regd = element(t, n_misses + n + 1)
+        rows.append([reg[0], reg[1], np.nan, reg[2], 'uniprot', reg[3], reg[4], reg[5],
+                     regd[0], regd[1], np.nan, regd[2], 'uniprot', regd[3], regd[4], regd[5],
+                     sign, rng.choice(['D', 'I']), np.nan, np.nan,
+                     np.nan, np.nan, np.nan, np.nan,
+                     np.nan, 'synthetic', 'Synthetic statement {}.'.format(n), 'PMC{}'.format(n)])
+
+    reading_df = pd.DataFrame(rows, columns=reading_columns_def)
+    # Duplicated LEEs, found in other papers
+    n_dup = n_lees - len(reading_df)
+    if n_dup > 0:
+        dup = reading_df.iloc[rng.integers(0, len(reading_df), size=n_dup)].copy()
+        dup['Paper IDs'] = ['PMC{}'.format(len(reading_df) + i) for i in range(n_dup)]
+        reading_df = pd.concat([reading_df, dup], ignore_index=True)
+
+    return reading_df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def write_synthetic(path, n_elements, n_lees, seed=0, **kwargs):
+    """
+    This function writes a synthetic model and reading to .csv files
+
+    Parameters
+    ----------
+    path : str
+        Directory and filename prefix of the synthetic files
+    n_elements : int
+        Number of model elements
+    n_lees : int
+        Number of LEEs in the reading
+    seed : int
+        Seed of the random number generator
+        Default is 0
+    kwargs : dict
+        Additional parameters for synthetic_reading()
+
+    Returns
+    -------
+    model_file, reading_file : str
+        Filenames of the written model and reading
+    """
+    model_df = synthetic_model(n_elements, seed=seed)
+    reading_df = synthetic_reading(model_df, n_lees, seed=seed, **kwargs)
+    model_file = '{}_model.csv'.format(path)
+    reading_file = '{}_reading.csv'.format(path)
+    model_df.to_csv(model_file, index=False)
+    reading_df.to_csv(reading_file, index=False)
+    return model_file, reading_file
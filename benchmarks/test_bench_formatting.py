@@ -0,0 +1,41 @@
+"""
+test_bench_formatting.py
+
+Times formatting.format_variable_names on synthetic models where every variable name is non-conforming.
+Run with pytest-benchmark, from the benchmarks directory:
+
+    pytest test_bench_formatting.py --benchmark-only
+
+The number of model elements is set with VIOLIN_BENCH_INVALID, e.g. VIOLIN_BENCH_INVALID=1000,5000;
+the default is 2000.
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from synthetic import synthetic_model
+from violin.formatting import format_variable_names
+
+sizes = [int(x) for x in os.environ.get('VIOLIN_BENCH_INVALID', '2000').split(',')]
+
+
+def invalid_model(n_elements):
+    # Variable names starting with a number and containing '-' and ' ', used in the regulation rules
+    model_df = synthetic_model(n_elements).fillna('nan')
+    variables = ['{}{}-{} x'.format(idx, name, t.split(' ')[0])
+                 for idx, (name, t) in enumerate(zip(model_df['Element Name'], model_df['Element Type']))]
+    model_df['Variable'] = variables
+    model_df['Positive Regulation Rule'] = [' or '.join(variables[i - k] for k in (1, 2) if i >= k)
+                                            for i in range(n_elements)]
+    return model_df
+
+
+@pytest.mark.parametrize('n_elements', sizes, ids=lambda n: '{}_invalid'.format(n))
+def test_format_variable_names(benchmark, n_elements):
+    model_df = invalid_model(n_elements)
+    formatted = benchmark.pedantic(format_variable_names, setup=lambda: ((model_df.copy(),), {}), rounds=3)
+    assert formatted['Variable'].str.fullmatch(r'[a-zA-Z0-9_]+').all()
+    assert not formatted['Positive Regulation Rule'].str.contains('-').any()
@@ -0,0 +1,73 @@
+"""
+test_bench_paths.py
+
+Times the path queries of network.path_finding (reachability and path sign between two model elements)
+as the model grows, for NetworkX searches, the sparse SignedReachability of the whole network,
+and depth-bounded bidirectional searches (BoundedPaths).
+Run with pytest-benchmark, from the benchmarks directory:
+
+    pytest test_bench_paths.py --benchmark-only
+
+The numbers of model elements are set with VIOLIN_BENCH_PATH_MODELS, e.g. VIOLIN_BENCH_PATH_MODELS=500,2000,8000;
+the default is 500,2000. The maximum path length of the bounded searches is set with VIOLIN_BENCH_MAX_PATH,
+the default is 4. The latency per query (and the time to build the sparse index) is kept in extra_info.
+"""
+
+import os
+import random
+import time
+import warnings
+
+import networkx as nx
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from synthetic import synthetic_model
+from violin.in_out import preprocessing_model
+from violin.network import node_edge_list, signed_reachability, BoundedPaths
+
+sizes = [int(x) for x in os.environ.get('VIOLIN_BENCH_PATH_MODELS', '500,2000').split(',')]
+max_length = int(os.environ.get('VIOLIN_BENCH_MAX_PATH', '4'))
+n_queries = 200
+
+
+def _networkx_weight(graph, source, target):
+    # The searches of path_finding without precomputed paths
+    if source == target or not nx.has_path(graph, source, target):
+        return None
+    path = nx.shortest_path(graph, source=source, target=target, weight='weight')
+    return sum(graph[u][v]['weight'] for u, v in zip(path[:-1], path[1:]))
+
+
+@pytest.fixture(scope='module', params=sizes, ids=lambda n: '{}_elements'.format(n))
+def network(request):
+    warnings.simplefilter('ignore')
+    graph = node_edge_list(preprocessing_model(synthetic_model(request.param, in_degree=3)))
+    nodes = list(graph.nodes)
+    rng = random.Random(0)
+    queries = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(n_queries)]
+    return graph, queries
+
+
+@pytest.mark.parametrize('method', ['networkx', 'sparse', 'bounded'])
+def test_path_queries(benchmark, network, method):
+    graph, queries = network
+    tic = time.perf_counter()
+    if method == 'networkx':
+        weight = lambda source, target: _networkx_weight(graph, source, target)
+    elif method == 'sparse':
+        graph.graph.pop('signed_reachability', None)
+        weight = signed_reachability(graph).weight
+    else:
+        # A new BoundedPaths per round, so that queries are not answered from the cache of a previous round
+        weight = lambda source, target: BoundedPaths(graph, max_length).weight(source, target)
+    benchmark.extra_info['build_s'] = time.perf_counter() - tic
+
+    found = benchmark.pedantic(lambda: [weight(source, target) for source, target in queries], rounds=3)
+    benchmark.extra_info['per_query_ms'] = 1000*benchmark.stats.stats.mean/len(queries)
+    benchmark.extra_info['reachable'] = sum(w is not None for w in found)
+    if method == 'bounded':
+        # Paths within the bound are a subset of all paths
+        unbounded = [_networkx_weight(graph, source, target) for source, target in queries]
+        assert all(u is not None for w, u in zip(found, unbounded) if w is not None)
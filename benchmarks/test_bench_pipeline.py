@@ -0,0 +1,85 @@
+"""
+test_bench_pipeline.py
+
+Times each stage of the VIOLIN pipeline on synthetic inputs, and records peak memory at the smallest size.
+Run with pytest-benchmark, from the benchmarks directory:
+
+    pytest test_bench_pipeline.py --benchmark-only
+
+Reading sizes (number of LEEs) are set with the VIOLIN_BENCH_SIZES environment variable,
+e.g. VIOLIN_BENCH_SIZES=1000,10000,100000,1000000; the default is 1000.
+The number of model elements is set with VIOLIN_BENCH_MODEL, the default is 500.
+Peak memory is measured by running the stage once more under tracemalloc, which would double the time of the larger
+sizes, so it is only kept in extra_info for the smallest size.
+"""
+
+import os
+import tracemalloc
+import warnings
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from synthetic import write_synthetic
+from violin.in_out import preprocessing_model, preprocessing_reading, output
+from violin.network import node_edge_list
+from violin.scoring import score_reading, kind_dict, match_dict
+
+sizes = [int(x) for x in os.environ.get('VIOLIN_BENCH_SIZES', '1000').split(',')]
+n_elements = int(os.environ.get('VIOLIN_BENCH_MODEL', '500'))
+
+attributes = ['Regulated Compartment ID', 'Regulator Compartment ID']
+
+
+def _peak_memory(func, *args, **kwargs):
+    # Peak memory (in MB) allocated by python during a single call
+    tracemalloc.start()
+    func(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def _run(benchmark, inputs, func, *args, **kwargs):
+    # Single round: the larger sizes take too long to be repeated
+    if inputs['size'] == min(sizes):
+        benchmark.extra_info['peak_memory_mb'] = _peak_memory(func, *args, **kwargs)
+    return benchmark.pedantic(func, args=args, kwargs=kwargs, rounds=1, iterations=1)
+
+
+@pytest.fixture(scope='module', params=sizes, ids=lambda n: '{}_lees'.format(n))
+def inputs(request, tmp_path_factory):
+    warnings.simplefilter('ignore')
+    path = str(tmp_path_factory.mktemp('synthetic') / 'bench')
+    model_file, reading_file = write_synthetic(path, n_elements, request.param)
+    model_df = preprocessing_model(model_file)
+    reading_df = preprocessing_reading(reading_file, atts=attributes)
+    graph = node_edge_list(model_df)
+    return {'size': request.param, 'path': path, 'model_file': model_file, 'reading_file': reading_file,
+            'model_df': model_df, 'reading_df': reading_df, 'graph': graph}
+
+
+def test_preprocessing_model(benchmark, inputs):
+    _run(benchmark, inputs, preprocessing_model, inputs['model_file'])
+
+
+def test_preprocessing_reading(benchmark, inputs):
+    _run(benchmark, inputs, preprocessing_reading, inputs['reading_file'], atts=attributes)
+
+
+def test_node_edge_list(benchmark, inputs):
+    _run(benchmark, inputs, node_edge_list, inputs['model_df'])
+
+
+def test_score_reading(benchmark, inputs):
+    scored = _run(benchmark, inputs, score_reading, inputs['reading_df'], inputs['model_df'], inputs['graph'],
+                  kind_values=kind_dict, match_values=match_dict, attributes=list(attributes))
+    assert scored['Kind Score'].notna().all()
+
+
+def test_output(benchmark, inputs):
+    # Scored here, outside of the timed call, so the stage does not depend on the other tests
+    scored = score_reading(inputs['reading_df'], inputs['model_df'], inputs['graph'],
+                           kind_values=kind_dict, match_values=match_dict, attributes=list(attributes))
+    _run(benchmark, inputs, output, scored, inputs['path'], kind_values=kind_dict)
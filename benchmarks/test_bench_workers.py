@@ -0,0 +1,84 @@
+"""
+test_bench_workers.py
+
+Times the startup of scoring workers and records their memory, when each worker receives a pickled copy of the model
+(model dataframe, network, and signed reachability) and when the workers memory-map the compiled model
+(see shared.SharedModel), as the number of workers grows.
+Run with pytest-benchmark, from the benchmarks directory:
+
+    pytest test_bench_workers.py --benchmark-only
+
+The number of model elements is set with VIOLIN_BENCH_MODEL, the default is 2000, and the numbers of workers with
+VIOLIN_BENCH_WORKERS, the default is 1,2,4. The proportional set size of each worker after attaching to the model
+(PSS, shared pages divided among the processes mapping them, read from /proc on Linux) is kept in extra_info.
+"""
+
+import concurrent.futures
+import multiprocessing
+import os
+import tempfile
+import time
+import warnings
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from synthetic import synthetic_model
+from violin.in_out import preprocessing_model
+from violin.network import node_edge_list, signed_reachability
+from violin.shared import compile_model
+
+n_elements = int(os.environ.get('VIOLIN_BENCH_MODEL', '2000'))
+worker_counts = [int(x) for x in os.environ.get('VIOLIN_BENCH_WORKERS', '1,2,4').split(',')]
+
+
+def _pss():
+    # Proportional set size of this process, in MB
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def _attach(model, wait):
+    # Uses the model as score_reading does, then waits so that each worker gets one task
+    if isinstance(model, tuple):
+        model_df, graph = model
+    else:
+        model_df, graph = model.model_df, model.graph
+    paths = signed_reachability(graph)
+    int(paths.distances.sum())
+    time.sleep(wait)
+    return os.getpid(), model_df.shape[0], _pss()
+
+
+@pytest.fixture(scope='module')
+def compiled():
+    warnings.simplefilter('ignore')
+    model_df = preprocessing_model(synthetic_model(n_elements, in_degree=3))
+    graph = node_edge_list(model_df)
+    signed_reachability(graph)
+    with tempfile.TemporaryDirectory() as path:
+        yield model_df, graph, compile_model(model_df, graph, path)
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/smaps_rollup'), reason='PSS is read from /proc')
+@pytest.mark.parametrize('workers', worker_counts)
+@pytest.mark.parametrize('mode', ['pickled', 'shared'])
+def test_worker_memory(benchmark, compiled, mode, workers):
+    model_df, graph, shared = compiled
+    model = (model_df, graph) if mode == 'pickled' else shared
+    results = []
+
+    def run():
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context('spawn')) as executor:
+            results[:] = list(executor.map(_attach, [model]*workers, [0.5]*workers))
+
+    benchmark.pedantic(run, rounds=2)
+    benchmark.extra_info['shared_mb'] = shared.nbytes / 2**20
+    benchmark.extra_info['workers'] = len(set(pid for pid, _, _ in results))
+    benchmark.extra_info['pss_per_worker_mb'] = sum(pss for _, _, pss in results) / len(results)
+    assert all(rows == model_df.shape[0] for _, rows, _ in results)
@@ -1,5 +1,7 @@
 ## This is script for testing the functionality of VIOLIN
+import importlib.util
 import unittest
+import numpy as np
 import pandas as pd
 import os
 import sys
@@ -35,6 +37,46 @@ attributes = ['Regulated Compartment ID', 'Regulator Compartment ID', 'Cell Line
 
 model_file = 'input/models/SkMel133_biorecipe.xlsx'
 
+categories = ['corroborations', 'contradictions', 'extensions', 'flagged']
+
+
+def interrupted_run(reading_df, model_df, graph, checkpoint_dir, **kwargs):
+    # Scores the reading with a checkpoint after every chunk of 2 LEEs, and interrupts it after the first chunks
+    from unittest import mock
+    from violin import scoring
+
+    kind_score = scoring.kind_score
+    calls = []
+    def interrupted_kind_score(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 4:
+            raise KeyboardInterrupt
+        return kind_score(*args, **kwargs)
+    with mock.patch.object(scoring, 'kind_score', interrupted_kind_score):
+        try:
+            scoring.score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=list(attributes),
+                                  chunk_size=2, checkpoint_dir=checkpoint_dir, checkpoint_interval=1,
+                                  kernels=False, **kwargs)
+        except KeyboardInterrupt:
+            return
+    raise AssertionError('the run was not interrupted')
+
+
+class ReadingTestCase(unittest.TestCase):
+    # The model, its network and the test readings, loaded once for the tests of a class
+
+    @classmethod
+    def setUpClass(cls):
+        from violin.in_out import preprocessing_model, preprocessing_reading
+        from violin.network import node_edge_list
+
+        cls.model_df = preprocessing_model(model_file)
+        cls.graph = node_edge_list(cls.model_df)
+        cls.readings = {category: preprocessing_reading('test/input_reading_{}_test.xlsx'.format(category),
+                                                        evidence_score_cols=evidence_scoring_cols, atts=attributes)
+                        for category in categories}
+
+
 class TestVIOLIN(unittest.TestCase):
 
     # Test Corroborations
@@ -141,5 +183,905 @@ class TestVIOLIN(unittest.TestCase):
         self.assertEqual(df.loc[0, 'Kind Score'], kind_dict['internal extension'])
 
 
+class TestCheckpoint(ReadingTestCase):
+
+    def test_resume(self):
+        import tempfile
+        from violin.scoring import score_reading
+
+        reading_df = self.readings['corroborations']
+        counter = {'corroboration': [], 'contradiction': []}
+        uninterrupted = score_reading(reading_df, self.model_df, self.graph, counter=counter,
+                                      kind_values=kind_dict, attributes=list(attributes))
+
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            interrupted_run(reading_df, self.model_df, self.graph, checkpoint_dir,
+                            counter={'corroboration': [], 'contradiction': []})
+            resumed_counter = {'corroboration': [], 'contradiction': []}
+            resumed = score_reading(reading_df, self.model_df, self.graph, counter=resumed_counter,
+                                    kind_values=kind_dict, attributes=list(attributes),
+                                    chunk_size=2, checkpoint_dir=checkpoint_dir, checkpoint_interval=1, resume=True)
+        pd.testing.assert_frame_equal(uninterrupted, resumed)
+        self.assertEqual(counter, resumed_counter)
+
+    def test_resume_with_counter(self):
+        import tempfile
+        from violin.scoring import score_reading
+
+        reading_df = self.readings['contradictions']
+        counter = {'corroboration': [], 'contradiction': []}
+        score_reading(reading_df, self.model_df, self.graph, counter=counter, kind_values=kind_dict,
+                      attributes=list(attributes))
+
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            # The interrupted run has no counter, so its chunks do not hold the counter entries of the first LEEs
+            interrupted_run(reading_df, self.model_df, self.graph, checkpoint_dir)
+            resumed_counter = {'corroboration': [], 'contradiction': []}
+            score_reading(reading_df, self.model_df, self.graph, counter=resumed_counter, kind_values=kind_dict,
+                          attributes=list(attributes), chunk_size=2, checkpoint_dir=checkpoint_dir,
+                          checkpoint_interval=1, resume=True)
+        self.assertEqual(counter, resumed_counter)
+
+
+class TestProgress(ReadingTestCase):
+
+    def setUp(self):
+        self.reading_df = self.readings['contradictions']
+
+    def test_reports(self):
+        from violin.scoring import score_reading
+
+        reports = []
+        score_reading(self.reading_df, self.model_df, self.graph, kind_values=kind_dict,
+                      attributes=list(attributes), progress=reports.append, chunk_size=4)
+        total = self.reading_df.shape[0]
+        # One report per chunk
+        self.assertEqual([report['processed'] for report in reports], list(range(4, total, 4)) + [total])
+        self.assertTrue(all(report['total'] == total for report in reports))
+        self.assertEqual(sum(reports[-1]['categories'].values()), total)
+
+    def test_resume(self):
+        import tempfile
+        from violin.scoring import score_reading
+        from violin.checkpoint import load_chunks
+
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            interrupted_run(self.reading_df, self.model_df, self.graph, checkpoint_dir)
+            restored = load_chunks(os.path.join(checkpoint_dir, os.listdir(checkpoint_dir)[0]))[-1]['stop']
+            self.assertGreater(restored, 0)
+
+            reports = []
+            score_reading(self.reading_df, self.model_df, self.graph, kind_values=kind_dict,
+                          attributes=list(attributes), chunk_size=2, checkpoint_dir=checkpoint_dir,
+                          checkpoint_interval=1, resume=True, progress=reports.append)
+        total = self.reading_df.shape[0]
+        # Processed starts at the restored row, and the tally only counts the LEEs scored by this run
+        self.assertEqual(reports[0]['processed'], restored + 2)
+        self.assertEqual(reports[-1]['processed'], total)
+        self.assertEqual(sum(reports[-1]['categories'].values()), total - restored)
+
+    def test_tqdm(self):
+        import io
+        import pytest
+        pytest.importorskip('tqdm')
+        from violin.scoring import score_reading
+        from violin.progress import tqdm_progress
+
+        output = io.StringIO()
+        score_reading(self.reading_df, self.model_df, self.graph, kind_values=kind_dict,
+                      attributes=list(attributes), progress=tqdm_progress(file=output), chunk_size=4)
+        total = self.reading_df.shape[0]
+        self.assertIn('%d/%d' % (total, total), output.getvalue())
+
+
+class TestEdgeCounter(ReadingTestCase):
+
+    def test_records(self):
+        import tempfile
+        from violin.scoring import score_reading
+        from violin.counter import EdgeCounter
+
+        model_df, graph, reading_df = self.model_df, self.graph, self.readings['contradictions']
+        counter = {'corroboration': [], 'contradiction': []}
+        score_reading(reading_df, model_df, graph, counter=counter, kind_values=kind_dict, attributes=list(attributes))
+        edge_counter = EdgeCounter()
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            score_reading(reading_df, model_df, graph, counter=edge_counter, kind_values=kind_dict,
+                          attributes=list(attributes), chunk_size=2, checkpoint_dir=checkpoint_dir)
+            resumed_counter = EdgeCounter()
+            score_reading(reading_df, model_df, graph, counter=resumed_counter, kind_values=kind_dict,
+                          attributes=list(attributes), chunk_size=2, checkpoint_dir=checkpoint_dir, resume=True)
+        self.assertEqual(edge_counter.to_dict(), counter)
+        self.assertEqual(edge_counter, resumed_counter)
+        self.assertTrue(len(counter['contradiction']) > 0)
+
+        edges = edge_counter.edges()
+        self.assertEqual(edges['corroboration'].sum(), len(counter['corroboration']))
+        self.assertEqual(edges['contradiction'].sum(), len(counter['contradiction']))
+        half = len(edge_counter) // 2
+        merged = EdgeCounter.concat([EdgeCounter(edge_counter.records[:half]), edge_counter.since(half)])
+        self.assertEqual(merged, edge_counter)
+
+
+class TestDedup(ReadingTestCase):
+
+    def test_same_scores(self):
+        from violin.in_out import format_reading
+        from violin.scoring import score_reading
+        from violin.counter import EdgeCounter
+
+        reading = pd.read_excel('test/input_reading_contradictions_test.xlsx').fillna('nan')
+        # Copies of the LEEs which only differ in columns not used by the classification
+        copies = reading.copy()
+        copies['Mechanism'] = 'phosphorylation'
+        copies['Site'] = 'S473'
+        reading_df = format_reading(pd.concat([reading, copies], ignore_index=True), evidence_scoring_cols)
+
+        scored, counters = [], []
+        for dedup in [True, False]:
+            counters.append(EdgeCounter())
+            scored.append(score_reading(reading_df, self.model_df, self.graph, counter=counters[-1],
+                                        kind_values=kind_dict, attributes=['Regulated Compartment ID'], dedup=dedup))
+        pd.testing.assert_frame_equal(scored[0], scored[1])
+        self.assertEqual(counters[0], counters[1])
+        self.assertEqual(scored[0].attrs['dedup']['classified'] * 2, reading_df.shape[0])
+
+
+class TestSignedReachability(ReadingTestCase):
+
+    def test_shortest_path_sign(self):
+        try:
+            import scipy
+        except ImportError:
+            self.skipTest('requires scipy')
+        import networkx as nx
+        from violin.network import SignedReachability
+
+        graph = self.graph
+        paths = SignedReachability(graph)
+        for source in graph:
+            weights = nx.single_source_dijkstra_path_length(graph, source, weight='weight')
+            for target in graph:
+                expected = weights.get(target) if target != source else None
+                self.assertEqual(paths.weight(source, target), expected)
+
+    def test_reading_sources(self):
+        try:
+            import scipy
+        except ImportError:
+            self.skipTest('requires scipy')
+        from violin.network import node_edge_list, signed_reachability, SignedReachability
+        from violin.scoring import score_reading, path_sources
+
+        # A network of its own, without the reachability rows cached by the other tests
+        model_df, reading_df = self.model_df, self.readings['extensions']
+        graph = node_edge_list(model_df)
+        sources = path_sources(reading_df, model_df)
+        self.assertTrue(0 < len(sources) < graph.number_of_nodes())
+
+        # Only the rows of the reading elements are computed, with the weights of the all-pairs reachability
+        paths = signed_reachability(graph, sources)
+        self.assertEqual(list(paths.sources), sources)
+        self.assertEqual(paths.distances.shape, (len(sources), graph.number_of_nodes()))
+        everything = SignedReachability(graph)
+        for source in sources:
+            for target in graph:
+                self.assertEqual(paths.weight(source, target), everything.weight(source, target))
+        # Another source adds its row
+        other = next(node for node in graph if node not in sources)
+        self.assertEqual(paths.weight(other, sources[0]), everything.weight(other, sources[0]))
+        self.assertEqual(paths.distances.shape[0], len(sources) + 1)
+
+        # Changing an edge sign, or replacing an edge by another, computes the distances again
+        changed = graph.copy()
+        u, v, w = next(iter(changed.edges(data='weight')))
+        changed[u][v]['weight'] = 1 - w
+        self.assertEqual(signed_reachability(changed, [u]).weight(u, v), 1 - w)
+        changed.remove_edge(u, v)
+        x = next(node for node in changed if node != u and not changed.has_edge(u, node))
+        changed.add_edge(u, x, weight=0)
+        self.assertEqual(signed_reachability(changed, [u]).weight(u, x), 0)
+        self.assertEqual(signed_reachability(changed, [u]).weight(u, v), SignedReachability(changed).weight(u, v))
+
+        scored = score_reading(reading_df, model_df, node_edge_list(model_df), kind_values=kind_dict,
+                               attributes=attributes)
+        searched = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=attributes,
+                                 path_search='networkx')
+        self.assertEqual(list(scored['Kind Score']), list(searched['Kind Score']))
+
+    def test_bounded_paths(self):
+        import networkx as nx
+        from violin.network import BoundedPaths
+        from violin.scoring import score_reading
+
+        model_df, graph, reading_df = self.model_df, self.graph, self.readings['extensions']
+        for source in list(graph)[:40]:
+            lengths = nx.single_source_shortest_path_length(graph, source, cutoff=3)
+            weights = nx.single_source_dijkstra_path_length(graph, source, weight='weight')
+            for target in graph:
+                within = BoundedPaths(graph, 3).weight(source, target)
+                self.assertEqual(within is not None, target in lengths and target != source)
+                unbounded = BoundedPaths(graph, graph.number_of_nodes()).weight(source, target)
+                self.assertEqual(unbounded, weights.get(target) if target != source else None)
+
+        scored = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=attributes)
+        bounded = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=attributes,
+                                max_path_length=graph.number_of_nodes())
+        self.assertEqual(list(bounded['Kind Score']), list(scored['Kind Score']))
+
+    def test_parity_reachability(self):
+        import networkx as nx
+        from violin.network import ParityReachability
+
+        graph = self.graph
+        parities = ParityReachability(graph, witnesses=True)
+        for source in list(graph)[:40]:
+            weights = nx.single_source_dijkstra_path_length(graph, source, weight='weight')
+            for target in graph:
+                if target == source:
+                    continue
+                # The sign of the shortest weighted path is one of the signs found
+                self.assertEqual(parities.reachable(source, target), target in weights)
+                if target in weights:
+                    self.assertTrue(parities.reachable(source, target, weights[target] % 2))
+                for parity in [0, 1]:
+                    path = parities.witness(source, target, parity)
+                    self.assertEqual(path is not None, parities.reachable(source, target, parity))
+                    if path is not None:
+                        self.assertEqual((path[0], path[-1]), (source, target))
+                        self.assertEqual(sum(graph[u][v]['weight'] for u, v in zip(path[:-1], path[1:])) % 2, parity)
+
+
+class TestScoreTop(ReadingTestCase):
+
+    def test_same_subset(self):
+        from violin.scoring import score_reading, score_top
+
+        model_df, graph, reading_df = self.model_df, self.graph, self.readings['extensions']
+        scored = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=list(attributes))
+        scored = scored.sort_values(by='Total Score', ascending=False, kind='mergesort').reset_index(drop=True)
+        for filter_opt, expected in [('50%', scored.head(int(scored.shape[0]*0.5))),
+                                     ('St>40', scored[scored['Total Score'] >= 40])]:
+            top = score_top(reading_df, model_df, graph, filter_opt=filter_opt,
+                            kind_values=kind_dict, attributes=list(attributes))
+            pd.testing.assert_frame_equal(top, expected.reset_index(drop=True))
+
+    def test_ties_at_cut(self):
+        import tempfile
+        from violin.in_out import output
+        from violin.scoring import score_reading, score_top
+
+        model_df, graph, reading_df = self.model_df, self.graph, self.readings['contradictions']
+        scored = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=list(attributes))
+        # The cut falls inside the LEEs tied at the highest Total Score
+        self.assertGreater(list(scored['Total Score']).count(scored['Total Score'].max()), 4)
+        with tempfile.TemporaryDirectory() as output_dir:
+            output(scored, os.path.join(output_dir, 'ties'), kind_values=kind_dict)
+            output_df = pd.read_csv(os.path.join(output_dir, 'ties_outputDF.csv'), index_col=None, dtype=str,
+                                    keep_default_na=False)
+        cols = ['Regulator Name', 'Regulated Name', 'Sign', 'Connection Type', 'Paper IDs']
+        for top in [score_top(reading_df, model_df, graph, top_k=4, kind_values=kind_dict,
+                              attributes=list(attributes)),
+                    score_top(reading_df, model_df, graph, filter_opt='25%', kind_values=kind_dict,
+                              attributes=list(attributes))]:
+            # The first rows of the output file, ties in reading order
+            self.assertEqual(top[cols].assign(**{'Paper IDs': top['Paper IDs'].map(','.join)}).values.tolist(),
+                             output_df[cols].head(4).values.tolist())
+            self.assertEqual(list(top['Total Score']), list(scored['Total Score'].head(4)))
+
+    def test_negative_epistemic_value(self):
+        from violin.scoring import score_reading, score_top
+
+        model_df, graph = self.model_df, self.graph
+        reading_df = pd.concat([self.readings[category] for category in categories], ignore_index=True)
+        reading_df['Epistemic Value'] = -1
+        scored = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=list(attributes))
+        scored = scored.sort_values(by='Total Score', ascending=False, kind='mergesort').reset_index(drop=True)
+        for filter_opt, expected in [('St>-30', scored[scored['Total Score'] >= -30]), ('10%', scored.head(4))]:
+            top = score_top(reading_df, model_df, graph, filter_opt=filter_opt,
+                            kind_values=kind_dict, attributes=list(attributes))
+            self.assertGreater(expected.shape[0], 0)
+            pd.testing.assert_frame_equal(top, expected.reset_index(drop=True))
+        top = score_top(reading_df, model_df, graph, top_k=5, kind_values=kind_dict, attributes=list(attributes))
+        self.assertEqual(list(top['Total Score']), list(scored['Total Score'].head(5)))
+
+
+class TestScoringService(ReadingTestCase):
+
+    def test_batched_requests(self):
+        import asyncio
+        import json
+        import urllib.request
+        from unittest import mock
+        import violin.service
+        from violin.in_out import read_table, format_reading
+        from violin.scoring import score_reading
+        from violin.progress import category_values
+
+        model_df, graph = self.model_df, self.graph
+        raw = read_table('test/input_reading_corroborations_test.xlsx').fillna('nan').astype(str)
+        halves = [raw.iloc[:raw.shape[0]//2], raw.iloc[raw.shape[0]//2:]]
+        expected = []
+        for half in halves:
+            scored = score_reading(format_reading(half.reset_index(drop=True), evidence_scoring_cols), model_df,
+                                   graph, kind_values=kind_dict, attributes=list(attributes))
+            scored['Category'] = scored['Kind Score'].map(category_values(kind_dict))
+            expected.append(scored)
+
+        def post(port, records):
+            request = urllib.request.Request('http://127.0.0.1:%d/score/skmel' % port,
+                                             data=json.dumps({'lees': records}).encode(), method='POST')
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read())
+
+        def get(port, path):
+            with urllib.request.urlopen('http://127.0.0.1:%d%s' % (port, path)) as response:
+                return json.loads(response.read())
+
+        async def run(service):
+            server = await service.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            loop = asyncio.get_running_loop()
+            try:
+                responses = await asyncio.gather(*[loop.run_in_executor(None, post, port, half.to_dict('records'))
+                                                   for half in halves])
+                metrics = await loop.run_in_executor(None, get, port, '/metrics')
+            finally:
+                await service.stop()
+            return responses, metrics
+
+        service = violin.service.ScoringService({'skmel': (model_df, graph)}, workers=0, batch_window=0.5,
+                                                kind_values=kind_dict, attributes=attributes,
+                                                evidence_score_cols=evidence_scoring_cols)
+        with mock.patch('violin.service.score_reading', wraps=score_reading) as scoring:
+            responses, metrics = asyncio.run(run(service))
+        # Both requests arrived within the batch window, and were scored in one call
+        self.assertEqual(scoring.call_count, 1)
+        for response, scored in zip(responses, expected):
+            lees = pd.DataFrame(response['lees'])
+            self.assertEqual(lees.shape[0], scored.shape[0])
+            self.assertGreater(lees.shape[0], 0)
+            for col in ['Match Score', 'Kind Score', 'Total Score', 'Category']:
+                self.assertEqual(list(lees[col]), list(scored[col]))
+        self.assertEqual(metrics['latency']['count'], 2)
+        self.assertEqual(sum(metrics['latency']['counts']), 2)
+        self.assertEqual(metrics['models']['skmel']['count'], 2)
+        self.assertEqual(len(metrics['latency']['buckets_ms']), len(metrics['latency']['counts']))
+
+
+class TestSession(unittest.TestCase):
+
+    def test_in_memory_tables(self):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            self.skipTest('requires pyarrow')
+        from violin.session import ViolinSession
+
+        reading_file = 'test/input_reading_extensions_test.xlsx'
+        from_files = ViolinSession(model_file, reading_file, kind_values=kind_dict, attributes=attributes,
+                                   evidence_score_cols=evidence_scoring_cols)
+        from_tables = ViolinSession(pa.Table.from_pandas(pd.read_excel(model_file)), pd.read_excel(reading_file),
+                                    kind_values=kind_dict, attributes=attributes,
+                                    evidence_score_cols=evidence_scoring_cols)
+        pd.testing.assert_frame_equal(from_files.scored, from_tables.scored)
+        extensions = from_tables.category('extensions')
+        self.assertEqual(len(extensions), 3)
+        self.assertTrue(extensions['Kind Score'].isin([kind_dict['hanging extension'], kind_dict['full extension'],
+                                                       kind_dict['internal extension']]).all())
+
+
+class TestRegulationRule(unittest.TestCase):
+
+    def test_rule_elements(self):
+        from violin.formatting import get_element, get_weights, get_necessary_pairs
+
+        self.assertEqual(get_element('{ATMpn_nucMEL}[CHK2rna_nucMEL],(A,!B),C^'),
+                         ['ATMpn_nucMEL', 'CHK2rna_nucMEL', 'A', 'B', 'C'])
+        self.assertEqual(get_element('AP1*NFAT*NFKAPPAB+IL2'), ['AP1', 'NFAT', 'NFKAPPAB', 'IL2'])
+        self.assertEqual(get_weights('{0.5*A}[2*B],C'), [('A', 0.5), ('B', 2.0), ('C', 1.0)])
+        self.assertEqual(get_necessary_pairs('{A}[(B,C)],D'), [(['A'], ['B', 'C'])])
+        with self.assertRaises(ValueError):
+            get_element('A,B+C')
+
+    def test_regulator_lists_from_rules(self):
+        from violin.in_out import preprocessing_model
+
+        model = pd.read_excel(model_file)
+        model_df = preprocessing_model(model)
+        model[['Positive Regulator List', 'Negative Regulator List']] = float('nan')
+        rule_model_df = preprocessing_model(model)
+        pd.testing.assert_series_equal(model_df['Positive Regulator List'], rule_model_df['Positive Regulator List'])
+        pd.testing.assert_series_equal(model_df['Negative Regulator List'], rule_model_df['Negative Regulator List'])
+
+
+class TestIndex(unittest.TestCase):
+
+    def test_element_queries(self):
+        import tempfile
+        from violin.session import ViolinSession
+        from violin.progress import category_values
+
+        session = ViolinSession(model_file, 'test/input_reading_extensions_test.xlsx', kind_values=kind_dict,
+                                attributes=attributes, evidence_score_cols=evidence_scoring_cols)
+        scored = session.scored
+        with tempfile.TemporaryDirectory() as path:
+            index = session.index(path)
+            value_category = category_values(kind_dict)
+            for lee in range(scored.shape[0]):
+                regulator = scored.at[lee, 'Regulator Name'].lower()
+                regulated = scored.at[lee, 'Regulated Name'].lower()
+                if index.rows(regulator) and index.rows(regulated):
+                    self.assertIn(lee, index.lees(regulator, role='regulator'))
+                    self.assertIn(lee, index.edge(regulator, regulated))
+                category = value_category[scored.at[lee, 'Kind Score']]
+                self.assertEqual(index.summary([lee]).at[0, 'Category'], category)
+                if index.rows(regulated):
+                    self.assertIn(lee, index.lees(regulated, category=category))
+            session.write(os.path.join(path, 'out'))
+            output_df = index.read_output([0], os.path.join(path, 'out_outputDF.csv'))
+            self.assertEqual(output_df.at[0, 'Total Score'], scored.at[0, 'Total Score'])
+
+
+class TestCoverage(ReadingTestCase):
+
+    def test_model_coverage(self):
+        from violin.scoring import score_reading
+        from violin.counter import EdgeCounter
+        from violin.coverage import model_coverage
+
+        model_df, graph, reading_df = self.model_df, self.graph, self.readings['corroborations']
+        counter = EdgeCounter()
+        scored = score_reading(reading_df, model_df, graph, counter=counter, kind_values=kind_dict,
+                               attributes=list(attributes))
+        coverage_df, edges_df = model_coverage(scored, model_df, counter, kind_values=kind_dict)
+
+        self.assertEqual(coverage_df.shape[0], model_df.shape[0])
+        self.assertEqual(edges_df['Total LEEs'].sum(), len(counter))
+        records = counter.records
+        self.assertAlmostEqual(edges_df['Corroborating Evidence'].sum(),
+                               scored['Evidence Score'].values[records['lee'][records['category'] == 0]].sum())
+        for _, edge in edges_df[edges_df['Corroborating LEEs'] > 0].iterrows():
+            self.assertIn(edge['Regulator'], coverage_df.at[edge['t_idx'], 'Corroborated Regulators'].split(','))
+        # Every corroborated LEE involves the regulated element of its model interaction
+        self.assertTrue((coverage_df.loc[edges_df['t_idx'], 'Corroborations LEEs'] > 0).all())
+
+
+class TestEntityIndex(ReadingTestCase):
+
+    def test_fuzzy_match(self):
+        import tempfile
+        from violin.numeric import find_element
+        from violin.embedding import EntityIndex
+
+        model_df = self.model_df
+        entities = EntityIndex(model_df)
+        exact = find_element('hgnc', 'braf', 'protein', model_df, False)
+        self.assertEqual(find_element('hgnc', 'b-raf', 'protein', model_df, False), -1)
+        self.assertEqual(find_element('hgnc', 'b-raf', 'protein', model_df, entities), exact)
+        self.assertEqual(find_element('hgnc', 'zzzz', 'protein', model_df, entities), -1)
+        self.assertIn(('hgnc', 'b-raf'), entities.cache)
+        with tempfile.TemporaryDirectory() as path:
+            entities.save(os.path.join(path, 'model.entities.npz'))
+            loaded = EntityIndex.load(os.path.join(path, 'model.entities.npz'))
+        queries = ['b-raf', 'mapk-1', 'MEK1', 'zzzz']
+        self.assertEqual(loaded.query('hgnc', queries), entities.query('hgnc', queries))
+
+    def test_absent_genes(self):
+        from violin.numeric import find_element
+        from violin.embedding import EntityIndex
+
+        model_df = self.model_df
+        entities = EntityIndex(model_df)
+        # Paralogs and family members missing from the model, and IDs next to a model ID, are not grounded
+        self.assertEqual(find_element('hgnc', 'akt3', 'protein', model_df, entities), -1)
+        self.assertEqual(find_element('hgnc', 'rps6kb3', 'protein', model_df, entities), -1)
+        model_id = model_df.loc[163, 'Element IDs']
+        off_by_one = str(int(model_id) + 1)
+        self.assertEqual(find_element('id', model_id, model_df.loc[163, 'Element Type'], model_df, entities), [163])
+        self.assertEqual(find_element('id', off_by_one, model_df.loc[163, 'Element Type'], model_df, entities), -1)
+
+        # Only the strings missing the exact lookup are resolved in batch
+        reading_df = self.readings['contradictions']
+        entities.cache = {}
+        entities.resolve_reading(reading_df, model_df)
+        names = set(reading_df['Regulator Name']) | set(reading_df['Regulated Name'])
+        self.assertTrue(any(name in entry for name in names for entry in model_df['Element Name']))
+        for search_type, name in entities.cache:
+            self.assertIn(search_type, ['name', 'hgnc'])
+            if search_type == 'name':
+                self.assertFalse(any(name in entry for entry in model_df['Element Name']))
+
+
+class TestGrounding(ReadingTestCase):
+
+    def test_synonym_table(self):
+        import pickle
+        import tempfile
+        from violin.grounding import build_synonyms, canonicalize_reading
+        from violin.numeric import find_element
+
+        with tempfile.TemporaryDirectory() as path:
+            with open(os.path.join(path, 'hgnc.tsv'), 'w') as f:
+                f.write('hgnc_id\tsymbol\talias_symbol\tprev_symbol\tuniprot_ids\n'
+                        'HGNC:6871\tMAPK1\tERK2|ERK\t\tP28482\n'
+                        'HGNC:6877\tMAPK3\tERK1|ERK\t\tP27361\n')
+            with open(os.path.join(path, 'chebi.tsv'), 'w') as f:
+                f.write('COMPOUND_ID\tNAME\nCHEBI:15422\tATP\nCHEBI:15422\tadenosine triphosphate\n')
+            synonyms = build_synonyms([os.path.join(path, 'hgnc.tsv'), os.path.join(path, 'chebi.tsv')],
+                                      os.path.join(path, 'table'))
+            self.assertEqual(synonyms.lookup('hgnc:6871'), synonyms.lookup('erk2'))
+            self.assertEqual(synonyms.lookup('uniprot:p27361')['symbol'], 'mapk3')
+            self.assertIsNone(synonyms.lookup('erk'))   # ambiguous synonym
+            self.assertEqual(synonyms.lookup('adenosine triphosphate')['id'], '15422')
+            self.assertEqual(pickle.loads(pickle.dumps(synonyms)).lookup('erk1'), synonyms.lookup('mapk3'))
+
+            reading_df = pd.DataFrame({'Regulator Name': ['ERK2', 'ATP'], 'Regulator HGNC Symbol': ['nan', 'nan'],
+                                       'Regulator Database': ['nan', 'nan'],
+                                       'Regulator ID': ['nan', 'CHEBI:15422'],
+                                       'Regulated Name': ['x', 'y'], 'Regulated HGNC Symbol': ['nan', 'nan'],
+                                       'Regulated Database': ['HGNC', 'UniProt'], 'Regulated ID': ['6877', 'Q99999']})
+            grounded = canonicalize_reading(reading_df, synonyms)
+        self.assertEqual(grounded.attrs['grounded'], 3)
+        self.assertEqual(list(grounded['Regulator HGNC Symbol']), ['mapk1', 'nan'])
+        self.assertEqual(list(grounded['Regulated ID']), ['p27361', 'Q99999'])
+        self.assertEqual(list(grounded['Regulator Name']), ['ERK2', 'ATP'])
+        self.assertNotEqual(find_element('id', grounded.at[0, 'Regulated ID'], 'protein', self.model_df, False), -1)
+
+    def test_hash_collisions(self):
+        import tempfile
+        from unittest import mock
+        from violin.grounding import build_synonyms
+
+        with tempfile.TemporaryDirectory() as path:
+            with open(os.path.join(path, 'hgnc.tsv'), 'w') as f:
+                f.write('hgnc_id\tsymbol\talias_symbol\tprev_symbol\tuniprot_ids\n'
+                        'HGNC:6871\tMAPK1\tERK2\t\tP28482\n'
+                        'HGNC:6877\tMAPK3\tERK1\t\tP27361\n')
+            # Every key has the same hash
+            with mock.patch('violin.grounding._hash', return_value=7):
+                synonyms = build_synonyms([os.path.join(path, 'hgnc.tsv')], os.path.join(path, 'table'))
+                self.assertEqual(synonyms.lookup('erk2')['symbol'], 'mapk1')
+                self.assertEqual(synonyms.lookup('erk1')['symbol'], 'mapk3')
+                self.assertEqual(synonyms.lookup('uniprot:p27361')['symbol'], 'mapk3')
+                self.assertIsNone(synonyms.lookup('braf'))
+
+
+class TestKernels(ReadingTestCase):
+
+    def test_compare_codes(self):
+        import itertools
+        import numpy as np
+        from violin.numeric import compare
+        from violin import kernels
+
+        atts = ['Cell Line', 'Regulated Compartment', 'Regulated Compartment ID', 'Regulator Compartment ID']
+        values = ['nan', 'a', 'b']
+        model, reading, expected = [], [], []
+        for model_values in itertools.product(values, repeat=len(atts)):
+            for reading_values in itertools.product(values, repeat=len(atts)):
+                model.append([values.index(v) for v in model_values])
+                reading.append([values.index(v) for v in reading_values])
+                expected.append(compare(dict(zip(atts, model_values)), dict(zip(atts, reading_values))))
+        groups = np.array([0, 2, 2, 1])
+        for compare_codes in [kernels._compare_numpy, kernels._compare_loop, kernels.compare_codes]:
+            self.assertEqual(list(compare_codes(np.array(model), np.array(reading), groups)), expected)
+        self.assertEqual(list(kernels.compare_codes(np.zeros((2, 0)), np.zeros((2, 0)), np.zeros(0))),
+                         [compare({}, {})]*2)
+
+        rng = np.random.default_rng(0)
+        ranks = rng.integers(0, 5, 200)
+        ptr = np.concatenate([[0], np.sort(rng.choice(np.arange(1, 200), 40, replace=False)), [200]])
+        for reduce_kinds in [kernels._reduce_loop, kernels.reduce_kinds]:
+            best, position = reduce_kinds(ranks, ptr)
+            for n in range(len(ptr) - 1):
+                segment = list(ranks[ptr[n]:ptr[n + 1]])
+                self.assertEqual((best[n], position[n]), (min(segment), segment.index(min(segment))))
+
+    def test_same_classification(self):
+        from violin.scoring import score_reading
+
+        kind_values = dict(kind_dict, flagged4=50, flagged5=51)
+        for category, reading_df in self.readings.items():
+            for classify_scheme in ['1', '2', '3']:
+                scored, counters = [], []
+                for kernels in [False, True]:
+                    counters.append({'corroboration': [], 'contradiction': []})
+                    scored.append(score_reading(reading_df, self.model_df, self.graph, counter=counters[-1],
+                                                kind_values=kind_values, attributes=list(attributes),
+                                                classify_scheme=classify_scheme, kernels=kernels))
+                pd.testing.assert_frame_equal(scored[0], scored[1])
+                self.assertEqual(counters[0], counters[1])
+
+
+class TestXlsx(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_name = os.path.join(directory.name, 'reading.xlsx')
+        self.df = pd.DataFrame({'Regulator Name': ['gene%d' % n for n in range(7)],
+                                'Regulated Name': ['protein%d' % n for n in range(7)],
+                                'Evidence': list(range(7))})
+        self.df.to_excel(self.file_name, index=False)
+
+    def test_iter_rows(self):
+        from violin.xlsx import read_excel, iter_rows
+
+        chunks = list(iter_rows(self.file_name, chunk_size=3))
+        self.assertEqual([chunk.shape[0] for chunk in chunks], [3, 3, 1])
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), read_excel(self.file_name))
+
+    def test_convert(self):
+        from unittest import mock
+        from violin.in_out import read_table
+        from violin.xlsx import read_excel, convert
+
+        path = convert(self.file_name)
+        self.assertEqual(path, self.file_name + '.parquet')
+        self.assertTrue(os.path.exists(path))
+        # The sheet is not opened while the cached copy is valid
+        with mock.patch('pandas.read_excel', side_effect=AssertionError('the sheet was read')):
+            pd.testing.assert_frame_equal(read_table(self.file_name), self.df)
+            pd.testing.assert_frame_equal(read_excel(self.file_name), self.df)
+
+    def test_stale_cache(self):
+        from violin.xlsx import read_excel, convert
+
+        path = convert(self.file_name)
+        changed = self.df.assign(Evidence=self.df['Evidence'] + 10)
+        changed.to_excel(self.file_name, index=False)
+        mtime = os.path.getmtime(path)
+        os.utime(self.file_name, (mtime + 10, mtime + 10))
+        pd.testing.assert_frame_equal(read_excel(self.file_name), changed)
+
+    def test_no_cache(self):
+        from violin.xlsx import read_excel, convert
+
+        path = convert(self.file_name)
+        cached = self.df.assign(Evidence=self.df['Evidence'] + 10)
+        cached.to_parquet(path, index=False)
+        pd.testing.assert_frame_equal(read_excel(self.file_name), cached)
+        pd.testing.assert_frame_equal(read_excel(self.file_name, use_cache=False), self.df)
+
+
+class TestParquetOutput(ReadingTestCase):
+
+    def test_partitioned_dataset(self):
+        import tempfile
+        from violin.in_out import output, read_output
+        from violin.scoring import score_reading
+
+        scored = score_reading(self.readings['contradictions'], self.model_df, self.graph, kind_values=kind_dict,
+                               attributes=list(attributes))
+        with tempfile.TemporaryDirectory() as path:
+            output(scored, os.path.join(path, 'RA2'), kind_values=kind_dict)
+            output(scored, os.path.join(path, 'RA2'), kind_values=kind_dict, output_format='parquet')
+            dataset = os.path.join(path, 'RA2_output.parquet')
+            csv_df = pd.read_csv(os.path.join(path, 'RA2_outputDF.csv'))
+            output_df = read_output(dataset)
+            contradictions = read_output(dataset, columns=['LEE', 'Total Score'], category='contradictions')
+            partitions = sorted(os.listdir(dataset))
+        self.assertEqual(partitions, ['Category=' + category for category in sorted(set(output_df['Category']))])
+        self.assertEqual(list(output_df['Total Score']), list(csv_df['Total Score']))
+        self.assertEqual(list(output_df['Kind Score']), list(csv_df['Kind Score']))
+        self.assertEqual([','.join(ids) for ids in output_df['Paper IDs']], list(csv_df['Paper IDs'].astype(str)))
+        self.assertEqual(list(output_df['Statements'][0]), list(scored.at[output_df['LEE'][0], 'Statements']))
+        self.assertEqual(list(contradictions.columns), ['LEE', 'Total Score'])
+        self.assertEqual(sorted(contradictions['LEE']),
+                         list(output_df['LEE'][output_df['Category'] == 'contradictions'].sort_values()))
+
+
+class TestResultsStore(ReadingTestCase):
+
+    def test_runs_and_queries(self):
+        import tempfile
+        from violin.scoring import score_reading
+        from violin.index import build_index
+        from violin.store import ResultsStore
+
+        model_df = self.model_df
+        scored = {category: score_reading(self.readings[category], model_df, self.graph, kind_values=kind_dict,
+                                          attributes=list(attributes))
+                  for category in ['contradictions', 'extensions']}
+        with tempfile.TemporaryDirectory() as path:
+            store = ResultsStore(os.path.join(path, 'violin.sqlite'))
+            for category in scored:
+                store.add_run(scored[category], model_df, kind_dict, run_id=category)
+            store.add_run(scored['extensions'], model_df, kind_dict, run_id='extensions')
+            index = build_index(scored['contradictions'], model_df, os.path.join(path, 'index'), kind_values=kind_dict)
+
+            self.assertEqual(list(store.runs()['run_id']), ['contradictions', 'extensions'])
+            self.assertEqual(store.query(run_id='extensions').shape[0], scored['extensions'].shape[0])
+            lees = store.query(run_id='contradictions', element='mapk1', category='contradictions')
+            self.assertEqual(sorted(lees['lee']), list(index.lees('mapk1', category='contradictions')))
+            evidence = scored['contradictions']['Evidence Score'].max()
+            top = store.query(run_id='contradictions', min_evidence=evidence, limit=3, full=True)
+            self.assertEqual(list(top['Evidence Score']), [evidence]*top.shape[0])
+            self.assertEqual(list(top['Total Score']), sorted(top['Total Score'], reverse=True))
+            paper_id = scored['contradictions'].at[0, 'Paper IDs'][0]
+            self.assertIn(0, list(store.query(run_id='contradictions', paper_id=paper_id)['lee']))
+            store.delete_run('extensions')
+            self.assertEqual(store.query(run_id='extensions').shape[0], 0)
+            store.close()
+
+
+class TestScoreHistogram(ReadingTestCase):
+
+    def test_histogram_plots(self):
+        import tempfile
+        from violin.in_out import output
+        from violin.scoring import score_reading
+        from violin.histogram import ScoreHistogram
+        from violin.visualize_violin import visualize, plot_all
+
+        histogram = ScoreHistogram()
+        scored = score_reading(self.readings['extensions'], self.model_df, self.graph, kind_values=kind_dict, attributes=list(attributes),
+                               chunk_size=7, histogram=histogram)
+        self.assertEqual(len(histogram), scored.shape[0])
+        self.assertEqual(dict(histogram.score_counts('Total Score')),
+                         dict(scored['Total Score'].astype(float).value_counts()))
+        top = histogram.filter('%', 0.3)
+        self.assertEqual(len(top), int(scored.shape[0]*0.3))
+        self.assertEqual(top.score_counts('Total Score').index.min(),
+                         scored['Total Score'].astype(float).sort_values(ascending=False).iloc[len(top)-1])
+        self.assertEqual(len(histogram.filter('Se', 2.)), (scored['Evidence Score'] >= 2).sum())
+        with tempfile.TemporaryDirectory() as path:
+            output(scored, os.path.join(path, 'RA'), kind_values=kind_dict)
+            histogram.save(os.path.join(path, 'RA_histogram.json'))
+            self.assertEqual(ScoreHistogram.load(os.path.join(path, 'RA_histogram.json')).counts, histogram.counts)
+            self.assertEqual(ScoreHistogram.from_scored(pd.read_csv(os.path.join(path, 'RA_outputDF.csv'))).counts,
+                             histogram.counts)
+            files = visualize(match_dict, kind_dict, os.path.join(path, 'RA_extensions.csv'), save_dir=path)
+            self.assertEqual(files, [os.path.join(path, 'extensions_Overview.png')])
+            files = plot_all(match_dict, kind_dict, histogram, os.path.join(path, 'plots'), workers=0)
+            self.assertEqual(sorted(os.listdir(os.path.join(path, 'plots'))), sorted(os.path.basename(file)
+                                                                                  for file in files))
+            self.assertEqual(len(files), 6)
+
+    def test_filter_ties(self):
+        from violin.histogram import ScoreHistogram
+
+        # Ties at the cut are kept by numeric Kind Score, not as text ('10' < '2')
+        histogram = ScoreHistogram({(30, 1, 1, 40): 1, (10, 1, 1, 40): 1, (2, 1, 1, 40): 1, (2, 1, 1, 50): 1})
+        self.assertEqual(histogram.filter('%', 0.5).counts, {(2, 1, 1, 50): 1, (2, 1, 1, 40): 1})
+        self.assertEqual(histogram.filter('%', 0.75).counts, {(2, 1, 1, 50): 1, (2, 1, 1, 40): 1, (10, 1, 1, 40): 1})
+
+
+class TestDistributed(ReadingTestCase):
+
+    def score(self, executor, **kwargs):
+        from violin.scoring import score_reading
+        from violin.counter import EdgeCounter
+
+        model_df, graph, reading_df = self.model_df, self.graph, self.readings['flagged']
+        local_counter, counter = EdgeCounter(), EdgeCounter()
+        local = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=list(attributes),
+                              counter=local_counter)
+        scored = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=list(attributes),
+                               counter=counter, executor=executor, **kwargs)
+        self.assertTrue(scored.equals(local))
+        self.assertEqual(counter, local_counter)
+        self.assertEqual(scored.attrs['dedup']['lees'], reading_df.shape[0])
+
+    def test_partitions(self):
+        from violin.distributed import partition_lees
+        from violin.index import lee_elements
+
+        model_df, reading_df = self.model_df, self.readings['flagged']
+        parts = partition_lees(reading_df, model_df, 3)
+        self.assertEqual(sorted(np.concatenate(parts)), list(range(reading_df.shape[0])))
+        # The LEEs of a model element are in one partition
+        regulators, _ = lee_elements(reading_df, model_df)
+        partition = {}
+        for p, rows in enumerate(parts):
+            for x in rows:
+                if len(regulators[x]):
+                    self.assertEqual(partition.setdefault(regulators[x][0], p), p)
+
+    def test_partition_sources(self):
+        try:
+            import scipy
+        except ImportError:
+            self.skipTest('requires scipy')
+        from concurrent.futures import Executor, Future
+        from violin.network import node_edge_list
+        from violin.scoring import score_reading, path_sources
+
+        class Recorder(Executor):
+            # Runs each partition in this process on its own copy of the model network
+            workers, graphs = 2, []
+
+            def submit(self, fn, model, reading_df, settings, sources):
+                model = (model[0], model[1].copy(), model[2])
+                self.graphs.append((model[1], reading_df, sources))
+                future = Future()
+                future.set_result(fn(model, reading_df, settings, sources))
+                return future
+
+        # A network of its own, without the reachability rows cached by the other tests
+        model_df, reading_df = self.model_df, self.readings['flagged']
+        graph = node_edge_list(model_df)
+        executor = Recorder()
+        scored = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=list(attributes),
+                               executor=executor, partitions=3)
+        self.assertTrue(scored.equals(score_reading(reading_df, model_df, graph, kind_values=kind_dict,
+                                                    attributes=list(attributes))))
+        self.assertEqual(len(executor.graphs), 3)
+        # Each partition only searches from the model elements of its LEEs
+        for part_graph, part_df, sources in executor.graphs:
+            self.assertEqual(sources, path_sources(part_df, model_df))
+            self.assertEqual(list(part_graph.graph['signed_reachability'][1].sources), sources)
+            self.assertLess(len(sources), graph.number_of_nodes())
+
+    def test_process_pool(self):
+        from violin.distributed import make_executor
+
+        with make_executor('process', workers=2) as executor:
+            self.score(executor, partitions=3)
+
+    @unittest.skipIf(importlib.util.find_spec('distributed') is None, 'dask.distributed is not installed')
+    def test_dask_local_cluster(self):
+        from violin.distributed import DaskExecutor
+
+        executor = DaskExecutor(workers=2)
+        try:
+            self.score(executor)
+        finally:
+            executor.shutdown()
+
+
+class TestSharedModel(ReadingTestCase):
+
+    def test_attach(self):
+        import pickle
+        import tempfile
+        from violin.network import signed_reachability
+        from violin.scoring import score_reading
+        from violin.distributed import make_executor
+        from violin.shared import compile_model
+
+        model_df, graph, reading_df = self.model_df, self.graph, self.readings['corroborations']
+        local = score_reading(reading_df, model_df, graph, kind_values=kind_dict, attributes=list(attributes))
+        with tempfile.TemporaryDirectory() as path:
+            shared = pickle.loads(pickle.dumps(compile_model(model_df, graph, path)))
+            self.assertTrue(shared.model_df.equals(model_df))
+            self.assertEqual(list(shared.graph.nodes), list(graph.nodes))
+            self.assertEqual(sorted(shared.graph.edges(data='weight')), sorted(graph.edges(data='weight')))
+            paths, shared_paths = signed_reachability(graph), signed_reachability(shared.graph)
+            self.assertIsInstance(shared_paths.distances, np.memmap)
+            nodes = list(graph.nodes)
+            for source, target in zip(nodes[::7], nodes[3::5]):
+                self.assertEqual(shared_paths.weight(source, target), paths.weight(source, target))
+            with make_executor('process', workers=2) as executor:
+                scored = score_reading(reading_df, model_df, graph, kind_values=kind_dict,
+                                       attributes=list(attributes), executor=executor, shared_model=path)
+            self.assertTrue(scored.equals(local))
+
+
+class TestCompare(ReadingTestCase):
+
+    def test_engines(self):
+        from violin.scoring import score_reading
+        from violin.compare import compare_readings, agreement
+
+        readings = {'A': 'test/input_reading_extensions_test.xlsx',
+                    'B': 'test/input_reading_extensions_test.xlsx',
+                    'C': 'test/input_reading_contradictions_test.xlsx'}
+        joint_df = compare_readings(model_file, readings, kind_values=kind_dict, attributes=attributes,
+                                    evidence_score_cols=evidence_scoring_cols, workers=0)
+        for engine, category in [('A', 'extensions'), ('C', 'contradictions')]:
+            scored = score_reading(self.readings[category], self.model_df, self.graph, kind_values=kind_dict,
+                                   attributes=list(attributes))
+            reported = joint_df[joint_df[engine + ' Category'] != '']
+            self.assertEqual(sorted(reported[engine + ' Total Score']), sorted(scored['Total Score'].astype(float)))
+
+        stats_df, overlap_df = agreement(joint_df, list(readings))
+        self.assertEqual(stats_df.at['all', 'LEEs'], joint_df.shape[0])
+        self.assertEqual(stats_df.at['A', 'Shared LEEs'], stats_df.at['A', 'LEEs'])
+        self.assertEqual(overlap_df.at['A', 'B'], 1.0)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
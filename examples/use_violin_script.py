@@ -14,9 +14,18 @@ import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(os.getcwd(), os.pardir, '/src/violin')))
 
 from violin.in_out import preprocessing_model, preprocessing_reading, output
-from violin.scoring import score_reading
+from violin.scoring import score_reading, score_top, path_sources
 from violin.network import node_edge_list
-from violin.visualize_violin import visualize
+from violin.visualize_violin import visualize, plot_all
+from violin.histogram import ScoreHistogram
+from violin.progress import print_progress, tqdm_progress
+from violin.index import build_index
+from violin.counter import EdgeCounter
+from violin.coverage import output_coverage
+from violin.embedding import entity_index
+from violin.store import ResultsStore
+from violin.distributed import make_executor
+from violin.shared import compile_model
 
 evidence_scoring_cols = ["Regulator Name", "Regulator Type", "Regulator Subtype", "Regulator HGNC Symbol", "Regulator Database", "Regulator ID", "Regulator Compartment", "Regulator Compartment ID",
                         "Regulated Name", "Regulated Type", "Regulated Subtype", "Regulated HGNC Symbol", "Regulated Database", "Regulated ID", "Regulated Compartment", "Regulated Compartment ID",
@@ -26,7 +35,11 @@ evidence_scoring_cols = ["Regulator Name", "Regulator Type", "Regulator Subtype"
 attributes = ['Regulated Compartment ID', 'Regulator Compartment ID', 'Cell Line']
 
 #Inputs: Model file, Reading File, Output Header, Classification, Filtering Option, Attributes
-def use_violin(model_file, lee_file, out_file, approach = '1', score = 'extend', filt_opt = '100%', plot=True):
+def use_violin(model_file, lee_file, out_file, approach = '1', score = 'extend', filt_opt = '100%', plot=True, progress=None,
+               checkpoint_dir=None, resume=False, prune=False, index=False,
+               coverage=False, embedding_match=False, synonyms=None, max_path_length=None,
+               path_sign='shortest', output_format='csv', store=None, run_id=None, plot_dir=None,
+               executor=None, workers=None, address=None):
     """
     This function runs VIOLIN via a terminal command
 
@@ -50,6 +63,65 @@ def use_violin(model_file, lee_file, out_file, approach = '1', score = 'extend',
         Accepted options are 'X%','Se>Y', or 'St>Z',
         where X, Y, and Z, are values
         Default is '100%' (Total Output)
+    progress : callable
+        Progress callback for scoring, see violin.progress
+        Default is None (no progress reporting)
+    checkpoint_dir : str
+        Directory where scored chunks are saved, so an interrupted run can be resumed
+        Default is None (no checkpoints)
+    resume : bool
+        Whether to resume an interrupted run from the chunks saved in checkpoint_dir
+        Default is False
+    prune : bool
+        Whether to only classify the LEEs which can pass filt_opt (see scoring.score_top),
+        the output files then only contain these LEEs
+        Default is False
+    index : bool
+        Whether to also write the inverted index from model elements to LEEs
+        in the out_file + '_index' directory (see violin.index)
+        Default is False
+    coverage : bool
+        Whether to also write the model-coverage report (out_file + '_model_coverage.csv' and
+        '_edge_coverage.csv', see violin.coverage); not available with prune
+        Default is False
+    embedding_match : bool
+        Whether LEE elements not found in the model are matched to the most similar model element
+        (see violin.embedding); the index is saved next to the model file and reused while the model is unchanged
+        Default is False
+    synonyms : str
+        Directory of a synonym table canonicalizing the LEE elements (see violin.grounding)
+        Default is None (no canonicalization)
+    max_path_length : int
+        Maximum number of edges of the model paths corroborating or flagging an LEE (see scoring.score_reading)
+        Default is None (no maximum)
+    path_sign : str
+        Which model path sign is compared to indirect LEEs: 'shortest' or 'any' (see scoring.score_reading)
+        Default is 'shortest'
+    output_format : str
+        'csv' (output and score files of each category) or 'parquet' (one dataset partitioned by category,
+        out_file + '_output.parquet', see in_out.output_parquet)
+        Default is 'csv'
+    store : str
+        SQLite database to which the scored LEEs are also added (see violin.store)
+        Default is None
+    run_id : str
+        ID of the run in the store
+        Default is None (date and time, and a random suffix)
+    plot_dir : str
+        Directory where the score histogram of the run (out_file's name + '_histogram.json', see violin.histogram)
+        and the graphs of all output and of each category are saved, drawn in parallel without a display
+        Default is None (graphs are only shown when plot is True)
+    executor : str
+        Scores partitions of the reading in worker processes: 'process' (on this machine, attached to the model
+        compiled in a temporary directory, see violin.shared), 'dask', or 'ray' (see violin.distributed);
+        not available with prune or checkpoint_dir
+        Default is None (scored in this process)
+    workers : int
+        Number of worker processes (of the local cluster for 'dask' and 'ray')
+        Default is None (one per CPU)
+    address : str
+        Address of the Dask scheduler or Ray cluster
+        Default is None (local cluster)
     """
     # Defining the scoring scheme
     if score == 'extend':
@@ -160,24 +232,85 @@ def use_violin(model_file, lee_file, out_file, approach = '1', score = 'extend',
         raise ValueError('Unaccepted scoring option'+'\n'+
                          'options are: \'extend\', \'extend subcategories\', \'corroborate\', \'corroborate subcategories\'')
 
+    if coverage and prune:
+        raise ValueError('The coverage report requires every LEE to be scored, it is not available with prune')
+    if executor is not None and (prune or checkpoint_dir is not None):
+        raise ValueError('Scoring on an executor is not available with prune or checkpoints')
+
     # Import model and LEE set, using default input parameters
     model_df = preprocessing_model(model_file)
-    reading_df = preprocessing_reading(reading=lee_file,evidence_score_cols=evidence_scoring_cols, atts = attributes)
+    reading_df = preprocessing_reading(reading=lee_file,evidence_score_cols=evidence_scoring_cols, atts = attributes,
+                                       synonyms=synonyms)
     graph = node_edge_list(model_df)
+    if embedding_match:
+        embedding_match = entity_index(model_df, model_file)
 
     #Scoring and Output
-    scored = score_reading(reading_df,
+    counter = EdgeCounter() if coverage else None
+    histogram = ScoreHistogram()
+    if prune:
+        scored = score_top(reading_df,
                            model_df,
                            graph,
+                           filter_opt = filt_opt,
                            kind_values = kind_dict,
                            match_values = match_dict,
                            attributes=attributes,
-                           classify_scheme = approach)
-    output(scored,out_file,kind_values=kind_dict)
+                           classify_scheme = approach,
+                           embedding_match = embedding_match,
+                           max_path_length = max_path_length,
+                           path_sign = path_sign)
+    else:
+        pool = make_executor(executor, workers, address) if executor is not None else None
+        # Local workers memory-map the compiled model, with the reachability from the elements of the reading
+        compiled = tempfile.TemporaryDirectory() if executor == 'process' else None
+        shared = compile_model(model_df, graph, compiled.name,
+                               sources=path_sources(reading_df, model_df, embedding_match)) \
+            if compiled is not None else None
+        scored = score_reading(reading_df,
+                               model_df,
+                               graph,
+                               kind_values = kind_dict,
+                               match_values = match_dict,
+                               attributes=attributes,
+                               classify_scheme = approach,
+                               embedding_match = embedding_match,
+                               max_path_length = max_path_length,
+                               path_sign = path_sign,
+                               counter = counter,
+                               progress = progress,
+                               checkpoint_dir = checkpoint_dir,
+                               resume = resume,
+                               histogram = histogram,
+                               executor = pool,
+                               shared_model = shared)
+        if pool is not None:
+            pool.shutdown()
+        if compiled is not None:
+            compiled.cleanup()
+    if prune:
+        histogram = ScoreHistogram.from_scored(scored)
+    output(scored,out_file,kind_values=kind_dict,output_format=output_format)
+    if index:
+        build_index(scored, model_df, out_file+'_index', kind_values=kind_dict, embedding_match=embedding_match)
+    if coverage:
+        output_coverage(scored, model_df, counter, out_file, kind_values=kind_dict, embedding_match=embedding_match)
+    if store is not None:
+        results = ResultsStore(store)
+        results.add_run(scored, model_df, kind_dict, run_id=run_id, embedding_match=embedding_match,
+                        model=model_file, reading=lee_file,
+                        settings={'approach': approach, 'score': score, 'attributes': attributes})
+        results.close()
 
-    #Visualization
+    #Visualization, from the score histogram
+    # Pruned output is already filtered
+    plot_opt = '100%' if prune else filt_opt
+    if plot_dir is not None:
+        os.makedirs(plot_dir, exist_ok=True)
+        histogram.save(os.path.join(plot_dir, os.path.basename(out_file)+'_histogram.json'))
+        plot_all(match_dict, kind_dict, histogram, plot_dir, filter_opt=plot_opt)
     if plot:
-        visualize(match_dict, kind_dict, out_file+'_outputDF.csv', filter_opt=filt_opt)
+        visualize(match_dict, kind_dict, histogram, filter_opt=plot_opt)
     else:
         pass
 
@@ -199,19 +332,86 @@ def main():
 
     parser.add_argument('approach', type=str, choices=['1', '2', '3'],
                         help='(optional) classify schemes, default is 1')
+    parser.add_argument('--progress', action='store_true',
+                        help='(optional) report scoring progress, with a tqdm progress bar when tqdm is installed')
+    parser.add_argument('--prune', action='store_true',
+                        help='(optional) only classify the LEEs which can pass the filter')
+    parser.add_argument('--checkpoint-dir', type=str, default=None,
+                        help='(optional) directory where scored chunks are saved during scoring')
+    parser.add_argument('--resume', action='store_true',
+                        help='(optional) resume an interrupted run from the chunks saved in --checkpoint-dir')
+    parser.add_argument('--index', action='store_true',
+                        help='(optional) write the inverted index from model elements to LEEs for model-centric queries')
+    parser.add_argument('--coverage', action='store_true',
+                        help='(optional) write the model-coverage report (evidence per model interaction and element)')
+    parser.add_argument('--embedding-match', action='store_true',
+                        help='(optional) match LEE elements not found in the model to the most similar model element')
+    parser.add_argument('--synonyms', type=str, default=None,
+                        help='(optional) directory of a synonym table (python -m violin.grounding) canonicalizing LEE elements')
+    parser.add_argument('--max-path-length', type=int, default=None,
+                        help='(optional) maximum number of edges of the model paths corroborating or flagging an LEE')
+    parser.add_argument('--path-sign', type=str, choices=['shortest', 'any'], default='shortest',
+                        help='(optional) compare indirect LEEs with the sign of the shortest path (default) or of any path')
+    parser.add_argument('--output-format', type=str, choices=['csv', 'parquet'], default='csv',
+                        help='(optional) write CSV files (default) or one Parquet dataset partitioned by category')
+    parser.add_argument('--store', type=str, default=None,
+                        help='(optional) SQLite database to which the scored LEEs are added (query with python -m violin.store)')
+    parser.add_argument('--run-id', type=str, default=None,
+                        help='(optional) ID of the run in --store')
+    parser.add_argument('--executor', type=str, choices=['process', 'dask', 'ray'], default=None,
+                        help='(optional) score partitions of the reading in worker processes, on this machine or a Dask or Ray cluster')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='(optional) number of worker processes of --executor')
+    parser.add_argument('--address', type=str, default=None,
+                        help='(optional) address of the Dask scheduler or Ray cluster of --executor')
+    parser.add_argument('--plot-dir', type=str, default=None,
+                        help='(optional) directory where the score histogram and the graphs of the output are saved')
     args = parser.parse_args()
+    if args.resume and args.checkpoint_dir is None:
+        parser.error('--resume requires --checkpoint-dir')
+
+    progress = None
+    if args.progress:
+        try:
+            progress = tqdm_progress(desc='Scoring')
+        except ImportError:
+            progress = print_progress
 
     if (os.path.splitext(args.model)[1] in ['.txt','.csv','.tsv','.xlsx'] and os.path.splitext(args.reading)[1] in ['.txt','.csv','.tsv','.xlsx'] and type(args.output)==str):
         if args.filter == None:
             if args.approach == None:
-                use_violin(args.model,args.reading,args.output,args.score)
+                use_violin(args.model,args.reading,args.output,args.score,progress=progress,
+                           checkpoint_dir=args.checkpoint_dir,resume=args.resume,prune=args.prune,index=args.index,
+                           coverage=args.coverage,embedding_match=args.embedding_match,
+                           synonyms=args.synonyms,max_path_length=args.max_path_length,
+                           path_sign=args.path_sign,output_format=args.output_format,
+                           store=args.store,run_id=args.run_id,plot_dir=args.plot_dir,
+                           executor=args.executor,workers=args.workers,address=args.address)
             else:
-                use_violin(args.model,args.reading,args.output,args.approach,args.score)
+                use_violin(args.model,args.reading,args.output,args.approach,args.score,progress=progress,
+                           checkpoint_dir=args.checkpoint_dir,resume=args.resume,prune=args.prune,index=args.index,
+                           coverage=args.coverage,embedding_match=args.embedding_match,
+                           synonyms=args.synonyms,max_path_length=args.max_path_length,
+                           path_sign=args.path_sign,output_format=args.output_format,
+                           store=args.store,run_id=args.run_id,plot_dir=args.plot_dir,
+                           executor=args.executor,workers=args.workers,address=args.address)
         else:
             if args.approach == None:
-                use_violin(args.model,args.reading,args.output,args.score,args.filter)
+                use_violin(args.model,args.reading,args.output,args.score,args.filter,progress=progress,
+                           checkpoint_dir=args.checkpoint_dir,resume=args.resume,prune=args.prune,index=args.index,
+                           coverage=args.coverage,embedding_match=args.embedding_match,
+                           synonyms=args.synonyms,max_path_length=args.max_path_length,
+                           path_sign=args.path_sign,output_format=args.output_format,
+                           store=args.store,run_id=args.run_id,plot_dir=args.plot_dir,
+                           executor=args.executor,workers=args.workers,address=args.address)
             else:
-                use_violin(args.model,args.reading,args.output,args.approach,args.score,args.filter)
+                use_violin(args.model,args.reading,args.output,args.approach,args.score,args.filter,progress=progress,
+                           checkpoint_dir=args.checkpoint_dir,resume=args.resume,prune=args.prune,index=args.index,
+                           coverage=args.coverage,embedding_match=args.embedding_match,
+                           synonyms=args.synonyms,max_path_length=args.max_path_length,
+                           path_sign=args.path_sign,output_format=args.output_format,
+                           store=args.store,run_id=args.run_id,plot_dir=args.plot_dir,
+                           executor=args.executor,workers=args.workers,address=args.address)
 
     else:
         raise ValueError('Unrecognized input format')
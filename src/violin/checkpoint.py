@@ -0,0 +1,146 @@
+"""
+checkpoint.py
+
+Handles saving and restoring scored chunks of a VIOLIN scoring run, so interrupted runs can be resumed
+Created October 2026 - MeLoDy Lab
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+import pandas as pd
+
+# Columns added to the reading dataframe by scoring.score_reading
+score_cols = ['Match Score', 'Kind Score', 'Epistemic Value', 'Total Score']
+
+
+def content_hash(df):
+    """
+    Hashes the contents (values, column names, and row order) of a dataframe
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Model or reading dataframe
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal SHA-256 digest
+    """
+    # List columns (e.g. Paper IDs) are not hashable by pandas, so hash their string representation
+    hashed = pd.util.hash_pandas_object(df.astype(str), index=True).values
+    digest = hashlib.sha256(hashed.tobytes())
+    digest.update(json.dumps([str(c) for c in df.columns]).encode())
+    return digest.hexdigest()
+
+
+def checkpoint_key(model_df, reading_df, **settings):
+    """
+    Creates the key of a scoring run from the model and reading contents and the scoring settings,
+    so that checkpoints are only reused by an identical run
+
+    Parameters
+    ----------
+    model_df : pd.DataFrame
+        The model dataframe
+    reading_df : pd.DataFrame
+        The reading dataframe
+    settings : dict
+        Scoring parameters (kind_values, match_values, attributes, classify_scheme, ...)
+
+    Returns
+    -------
+    key : str
+        Name of the checkpoint subdirectory of the run
+    """
+    digest = hashlib.sha256()
+    digest.update(content_hash(model_df).encode())
+    digest.update(content_hash(reading_df).encode())
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:32]
+
+
+def checkpoint_path(checkpoint_dir, key, resume=False):
+    """
+    Returns the checkpoint directory of a scoring run. Unless resuming,
+    checkpoints of a previous identical run are removed
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory where checkpoints are stored
+    key : str
+        Key of the scoring run, see checkpoint_key()
+    resume : bool
+        Whether saved chunks are kept to resume the run
+        Default is False
+
+    Returns
+    -------
+    path : str
+        Directory of the scoring run checkpoints
+    """
+    path = os.path.join(checkpoint_dir, key)
+    if not resume and os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def save_chunk(path, start, stop, scored_reading_df, counter_delta):
+    """
+    Saves the scores of rows start:stop and the counter entries added while scoring them.
+    The file is written atomically, so an interrupted write never leaves a partial checkpoint
+
+    Parameters
+    ----------
+    path : str
+        Checkpoint directory of the scoring run
+    start : int
+        First row of the chunk
+    stop : int
+        Row after the last row of the chunk
+    scored_reading_df : pd.DataFrame
+        Reading dataframe with the scores
+    counter_delta : counter.EdgeCounter or dict
+        Counter entries added by the chunk (see counter.counter_since), or None
+    """
+    chunk = {'start': start,
+             'stop': stop,
+             'scores': scored_reading_df[score_cols].iloc[start:stop].values.tolist(),
+             'counter': counter_delta}
+    file_name = os.path.join(path, 'chunk_{:012d}.pkl'.format(start))
+    with open(file_name + '.tmp', 'wb') as f:
+        pickle.dump(chunk, f)
+    os.replace(file_name + '.tmp', file_name)
+
+
+def load_chunks(path):
+    """
+    Loads the saved chunks of a scoring run, in row order.
+    Only chunks covering a contiguous range of rows from the first row are returned
+
+    Parameters
+    ----------
+    path : str
+        Checkpoint directory of the scoring run
+
+    Returns
+    -------
+    chunks : list
+        Saved chunks, each a dictionary with 'start', 'stop', 'scores' and 'counter'
+    """
+    chunks = []
+    stop = 0
+    for file_name in sorted(f for f in os.listdir(path) if f.startswith('chunk_') and f.endswith('.pkl')):
+        with open(os.path.join(path, file_name), 'rb') as f:
+            chunk = pickle.load(f)
+        if chunk['start'] != stop:
+            break
+        chunks.append(chunk)
+        stop = chunk['stop']
+    return chunks
@@ -0,0 +1,285 @@
+"""
+compare.py
+
+Compares reading engines: the same model is scored against the readings of several engines
+(e.g. GPT, INDRA, LLAMA, and REACH), preprocessing the model once and classifying each distinct LEE once
+Created October 2026 - MeLoDy Lab
+
+Usage:
+    python -m violin.compare examples/input/models/SkMel133_biorecipe.xlsx \
+        --readings-dir examples/input/interactions --reading-file RA2_reading_BioRECIPE.xlsx --output output/RA2
+"""
+
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from violin.in_out import preprocessing_model, preprocessing_reading, evidence_score_def
+from violin.network import node_edge_list
+from violin.scoring import score_reading, epistemic_value, kind_dict, match_dict
+from violin.progress import categories, category_values
+
+# Compiled model of a worker process: (model_df, graph)
+_worker_model = {}
+
+
+def _init_worker(model_df, graph):
+    # Each worker process receives the compiled model once, at startup
+    warnings.simplefilter('ignore')
+    _worker_model['model'] = (model_df, graph)
+
+
+def _preprocess(reading, evidence_score_cols, synonyms):
+    return preprocessing_reading(reading, evidence_score_cols=evidence_score_cols, synonyms=synonyms)
+
+
+def _classify(reading_df, settings):
+    model_df, graph = _worker_model['model']
+    scored = score_reading(reading_df.reset_index(drop=True), model_df, graph, **settings)
+    return scored[['Match Score', 'Kind Score']]
+
+
+def lee_key(reading_df, key_cols):
+    """
+    Normalized key identifying the same LEE across readings: the values of key_cols,
+    lower-case and with whitespace collapsed
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        Preprocessed reading dataframe
+    key_cols : list
+        Columns identifying an LEE (e.g. in_out.evidence_score_def)
+
+    Returns
+    -------
+    keys : pd.Series
+    """
+    normalized = [reading_df[col].astype(str).str.lower().str.split().str.join(' ') for col in key_cols]
+    return pd.Series(['\t'.join(values) for values in zip(*normalized)], index=reading_df.index)
+
+
+def compare_readings(model, readings, kind_values=kind_dict, match_values=match_dict, attributes=[],
+                     classify_scheme='1', evidence_score_cols=evidence_score_def, key_cols=None, workers=None,
+                     synonyms=None):
+    """
+    Scores several readings against the same model. The model is preprocessed once, the readings are
+    preprocessed concurrently, and each distinct LEE (see lee_key) is classified once, whichever engines report it;
+    the Total Score of each engine uses the Evidence Score (and Epistemic Value) of that engine
+
+    Parameters
+    ----------
+    model : str, pd.DataFrame, or pyarrow.Table
+        Model in BioRECIPE format
+    readings : dict
+        Engine name -> reading in BioRECIPE format (filename or table)
+    kind_values : dict
+        Dictionary assigning Kind Score values
+        Default values found in scoring.kind_dict
+    match_values : dict
+        Dictionary assigning Match Score values
+        Default values found in scoring.match_dict
+    attributes : list
+        List of attributes compared between the model and the LEEs
+        Default is none
+    classify_scheme : str
+        The scheme of the classification
+        Default is '1'
+    evidence_score_cols : list
+        Column headings used to identify identical interactions within a reading
+        Default values found in in_out.evidence_score_def
+    key_cols : list
+        Column headings identifying the same LEE across readings. An LEE is classified with the values of the
+        first engine reporting it, so columns used by the classification (names, types, identifiers, sign,
+        connection type, and attributes) should be kept
+        Default is None (evidence_score_cols and attributes)
+    workers : int
+        Number of worker processes, 0 to work in this process
+        Default is None (one per CPU, at most one per reading)
+    synonyms : grounding.SynonymTable or str
+        Synonym table (or its directory) canonicalizing the LEE elements of every reading (see grounding);
+        the workers share its memory-mapped arrays
+        Default is None (no canonicalization)
+
+    Returns
+    -------
+    joint_df : pd.DataFrame
+        One row per distinct LEE: its key columns, Match Score, Kind Score, and Category,
+        the number of Engines reporting it, and the Evidence Score, Total Score, and Category of each engine
+        (empty when the engine does not report the LEE)
+    """
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(readings))
+    if key_cols is None:
+        # Attributes compared by the classification also identify an LEE
+        key_cols = list(dict.fromkeys(list(evidence_score_cols) + list(attributes)))
+    settings = {'kind_values': kind_values, 'match_values': match_values,
+                'attributes': list(attributes), 'classify_scheme': classify_scheme}
+
+    model_df = preprocessing_model(model)
+    graph = node_edge_list(model_df)
+    if workers > 0:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                          mp_context=multiprocessing.get_context('spawn'),
+                                                          initializer=_init_worker, initargs=(model_df, graph))
+        run = executor.map
+    else:
+        executor = None
+        _init_worker(model_df, graph)
+        run = map
+    try:
+        engines = list(readings)
+        reading_dfs = dict(zip(engines, run(_preprocess, readings.values(), [evidence_score_cols]*len(engines),
+                                            [synonyms]*len(engines))))
+
+        engine_dfs = {}
+        for engine, reading_df in reading_dfs.items():
+            reading_df = reading_df.reset_index(drop=True)
+            reading_df['_key'] = lee_key(reading_df, key_cols)
+            reading_df['_e_value'] = [epistemic_value(x, reading_df) for x in range(reading_df.shape[0])]
+            engine_dfs[engine] = reading_df
+
+        # Classify each distinct LEE once, in chunks scored concurrently
+        unique = pd.concat(engine_dfs.values(), ignore_index=True).drop_duplicates('_key').reset_index(drop=True)
+        chunks = [unique.iloc[rows].drop(columns=['_key', '_e_value'])
+                  for rows in np.array_split(np.arange(unique.shape[0]), max(1, workers)*4) if len(rows)]
+        scores = pd.concat(list(run(_classify, chunks, [settings]*len(chunks))), ignore_index=True)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    joint_df = unique[key_cols].copy()
+    joint_df['Match Score'] = scores['Match Score'].values
+    joint_df['Kind Score'] = scores['Kind Score'].values
+    joint_df['Category'] = joint_df['Kind Score'].map(category_values(kind_values))
+    present = []
+    for engine, reading_df in engine_dfs.items():
+        # Keys which only differ in case or whitespace are merged, as duplicates are within a reading
+        per_key = reading_df.groupby('_key').agg(evidence=('Evidence Score', 'sum'), e_value=('_e_value', 'first'))
+        evidence = unique['_key'].map(per_key['evidence'])
+        e_value = unique['_key'].map(per_key['e_value']).astype(float)
+        found = evidence.notna().values
+        present.append(found)
+        joint_df[engine + ' Evidence Score'] = evidence.values
+        joint_df[engine + ' Total Score'] = ((evidence.astype(float)*joint_df['Match Score'].astype(float)
+                                              + joint_df['Kind Score'].astype(float))*e_value).values
+        joint_df[engine + ' Category'] = joint_df['Category'].where(found, '')
+    joint_df.insert(len(key_cols) + 3, 'Engines', np.sum(present, axis=0))
+    return joint_df
+
+
+def agreement(joint_df, engines):
+    """
+    Agreement statistics of the engines of a comparison
+
+    Parameters
+    ----------
+    joint_df : pd.DataFrame
+        See compare_readings
+    engines : list
+        Engine names
+
+    Returns
+    -------
+    stats_df : pd.DataFrame
+        Per engine (and 'all' engines): number of LEEs, LEEs reported by no other engine,
+        LEEs shared with another engine, and LEEs of each category
+    overlap_df : pd.DataFrame
+        Engine x engine Jaccard index of the reported LEEs
+    """
+    present = {engine: (joint_df[engine + ' Category'] != '').values for engine in engines}
+    shared = joint_df['Engines'].values > 1
+    stats = {}
+    for engine, found in list(present.items()) + [('all', np.ones(joint_df.shape[0], dtype=bool))]:
+        row = {'LEEs': int(found.sum()),
+               'Unique LEEs': int((found & ~shared).sum()),
+               'Shared LEEs': int((found & shared).sum())}
+        for category in categories:
+            row[category.capitalize()] = int((found & (joint_df['Category'] == category).values).sum())
+        stats[engine] = row
+    stats_df = pd.DataFrame.from_dict(stats, orient='index')
+
+    overlap_df = pd.DataFrame(index=engines, columns=engines, dtype=float)
+    for a in engines:
+        for b in engines:
+            union = (present[a] | present[b]).sum()
+            overlap_df.at[a, b] = (present[a] & present[b]).sum() / union if union else np.nan
+    return stats_df, overlap_df
+
+
+def output_comparison(joint_df, engines, file_name):
+    """
+    Writes the comparison of the engines: {file_name}_comparison.csv (see compare_readings),
+    {file_name}_agreement.csv and {file_name}_overlap.csv (see agreement)
+
+    Parameters
+    ----------
+    joint_df : pd.DataFrame
+        See compare_readings
+    engines : list
+        Engine names
+    file_name : str
+        Directory and filename of the output suffix
+    """
+    stats_df, overlap_df = agreement(joint_df, engines)
+    joint_df.sort_values(by=['Engines', 'Kind Score'], ascending=False, kind='mergesort').replace('nan', '') \
+        .to_csv(f'{file_name}_comparison.csv', index=False)
+    stats_df.to_csv(f'{file_name}_agreement.csv', index_label='Engine')
+    overlap_df.to_csv(f'{file_name}_overlap.csv', index_label='Engine')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare reading engines against the same VIOLIN model')
+    parser.add_argument('model', type=str,
+                        help='file containing the model - must be extension .txt, .csv, .tsv, .xlsx, or .parquet')
+    parser.add_argument('--reading', action='append', default=[],
+                        help='reading of an engine, as engine=file; can be repeated')
+    parser.add_argument('--readings-dir', type=str, default=None,
+                        help='(optional) directory with one subdirectory per engine, used with --reading-file')
+    parser.add_argument('--reading-file', type=str, default=None,
+                        help='(optional) name of the reading file in each engine subdirectory of --readings-dir')
+    parser.add_argument('--output', type=str, required=True,
+                        help='directory and suffix for output')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes, 0 to work in this process')
+    parser.add_argument('--attributes', type=str, default='',
+                        help='comma-separated attributes compared between the model and the LEEs')
+    parser.add_argument('--approach', type=str, choices=['1', '2', '3'], default='1',
+                        help='classify scheme, default is 1')
+    parser.add_argument('--key-cols', type=str, default=None,
+                        help='(optional) comma-separated columns identifying the same LEE across readings')
+    parser.add_argument('--synonyms', type=str, default=None,
+                        help='(optional) directory of a synonym table (python -m violin.grounding) canonicalizing LEE elements')
+    args = parser.parse_args()
+
+    readings = {}
+    for reading in args.reading:
+        if '=' not in reading:
+            parser.error('--reading must be given as engine=file')
+        engine, reading_file = reading.split('=', 1)
+        readings[engine] = reading_file
+    if args.readings_dir is not None:
+        if args.reading_file is None:
+            parser.error('--readings-dir requires --reading-file')
+        for engine in sorted(os.listdir(args.readings_dir)):
+            reading_file = os.path.join(args.readings_dir, engine, args.reading_file)
+            if os.path.isfile(reading_file):
+                readings[engine] = reading_file
+    if len(readings) < 2:
+        parser.error('at least two readings are needed for a comparison')
+
+    warnings.simplefilter('ignore')
+    joint_df = compare_readings(args.model, readings, workers=args.workers,
+                                attributes=[a.strip() for a in args.attributes.split(',') if a.strip()],
+                                classify_scheme=args.approach, synonyms=args.synonyms,
+                                key_cols=None if args.key_cols is None else [c.strip() for c in args.key_cols.split(',')])
+    output_comparison(joint_df, list(readings), args.output)
+
+
+if __name__ == '__main__':
+    main()
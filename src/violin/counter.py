@@ -0,0 +1,223 @@
+"""
+counter.py
+
+Handles the record of the model interactions corroborated or contradicted by the LEEs during scoring
+Created October 2026 - MeLoDy Lab
+"""
+
+import numpy as np
+import pandas as pd
+
+# Category codes of the counter records
+counter_categories = ['corroboration', 'contradiction']
+
+record_dtype = np.dtype([('t_idx', np.int32), ('s_idx', np.int32), ('category', np.int8), ('lee', np.int64)])
+
+
+class EdgeCounter:
+    """
+    Array-backed record of the model interactions matched by corroborated or contradicted LEEs.
+    Each record holds the model rows of the regulated (t_idx) and regulator (s_idx) elements,
+    the category code (see counter_categories), and the LEE id (row of the reading dataframe).
+    Can be passed as the counter of scoring.score_reading and scoring.score_top in place of
+    the {'corroboration': [], 'contradiction': []} dictionary of 't_idx+s_idx' strings
+
+    Parameters
+    ----------
+    records : np.ndarray
+        Initial records, of record_dtype
+        Default is None (empty counter)
+
+    Examples
+    --------
+    >>> counter = EdgeCounter()
+    >>> scored = score_reading(reading_df, model_df, graph, counter=counter)
+    >>> counter.edges()        # corroboration and contradiction counts of each model interaction
+    >>> EdgeCounter.concat([counter_a, counter_b])
+    """
+
+    def __init__(self, records=None):
+        self._data = np.empty(16, dtype=record_dtype)
+        self._size = 0
+        if records is not None:
+            self.extend(records)
+
+    def __len__(self):
+        return self._size
+
+    def __eq__(self, other):
+        return isinstance(other, EdgeCounter) and np.array_equal(self.records, other.records)
+
+    def __repr__(self):
+        return 'EdgeCounter({} records)'.format(self._size)
+
+    def __getstate__(self):
+        return {'records': self.records.copy()}
+
+    def __setstate__(self, state):
+        self.__init__(state['records'])
+
+    @property
+    def records(self):
+        """Records of the counter, in the order they were added"""
+        return self._data[:self._size]
+
+    def _reserve(self, size):
+        # Capacity doubles, so appending is amortized O(1)
+        if size > len(self._data):
+            data = np.empty(max(size, 2*len(self._data)), dtype=record_dtype)
+            data[:self._size] = self.records
+            self._data = data
+
+    def append(self, t_idx, s_idx, category, lee):
+        """
+        Adds a record
+
+        Parameters
+        ----------
+        t_idx : int
+            Model row of the regulated element
+        s_idx : int
+            Model row of the regulator
+        category : str
+            'corroboration' or 'contradiction'
+        lee : int
+            LEE id (row of the reading dataframe)
+        """
+        self._reserve(self._size + 1)
+        self._data[self._size] = (t_idx, s_idx, counter_categories.index(category), lee)
+        self._size += 1
+
+    def extend(self, records):
+        """
+        Adds records, e.g. those of another counter
+
+        Parameters
+        ----------
+        records : np.ndarray or EdgeCounter
+            Records of record_dtype
+        """
+        if isinstance(records, EdgeCounter):
+            records = records.records
+        self._reserve(self._size + len(records))
+        self._data[self._size:self._size + len(records)] = records
+        self._size += len(records)
+
+    def since(self, size):
+        """
+        Records added after the counter had a given size (e.g. by a chunk of LEEs)
+
+        Parameters
+        ----------
+        size : int
+            Earlier length of the counter
+
+        Returns
+        -------
+        counter : EdgeCounter
+        """
+        return EdgeCounter(self.records[size:])
+
+    @classmethod
+    def concat(cls, counters):
+        """
+        Merges the counters of separately scored parts of a reading
+
+        Parameters
+        ----------
+        counters : list
+            EdgeCounters, in the order of the parts
+
+        Returns
+        -------
+        counter : EdgeCounter
+        """
+        records = [c.records for c in counters]
+        return cls(np.concatenate(records) if records else None)
+
+    def edges(self):
+        """
+        Number of corroborating and contradicting LEEs of each matched model interaction
+
+        Returns
+        -------
+        edges_df : pd.DataFrame
+            Columns t_idx, s_idx, corroboration, and contradiction, sorted by t_idx and s_idx
+        """
+        records = self.records
+        keys, inverse = np.unique(records[['t_idx', 's_idx']], return_inverse=True)
+        counts = np.zeros((len(keys), len(counter_categories)), dtype=np.int64)
+        np.add.at(counts, (inverse, records['category']), 1)
+        edges_df = pd.DataFrame({'t_idx': keys['t_idx'], 's_idx': keys['s_idx']})
+        for code, category in enumerate(counter_categories):
+            edges_df[category] = counts[:, code]
+        return edges_df
+
+    def to_dict(self):
+        """
+        Counter as the dictionary of 't_idx+s_idx' strings used by earlier versions
+
+        Returns
+        -------
+        counter : dict
+            'corroboration' and 'contradiction' lists
+        """
+        records = self.records
+        return {category: ['{}+{}'.format(t, s) for t, s in
+                           records[['t_idx', 's_idx']][records['category'] == code].tolist()]
+                for code, category in enumerate(counter_categories)}
+
+
+def count(counter, category, t_idx, s_idx, lee):
+    """
+    Adds a matched model interaction to a counter (EdgeCounter or dictionary of 't_idx+s_idx' strings)
+
+    Parameters
+    ----------
+    counter : EdgeCounter or dict
+        The counter
+    category : str
+        'corroboration' or 'contradiction'
+    t_idx, s_idx : int
+        Model rows of the regulated element and the regulator
+    lee : int
+        LEE id
+    """
+    if isinstance(counter, EdgeCounter):
+        counter.append(t_idx, s_idx, category, lee)
+    else:
+        counter[category].append('{}+{}'.format(t_idx, s_idx))
+
+
+def counter_size(counter):
+    """Current size of a counter, see counter_since()"""
+    if isinstance(counter, EdgeCounter):
+        return len(counter)
+    return {category: len(counter[category]) for category in counter}
+
+
+def counter_since(counter, size):
+    """Entries added to a counter since counter_size() returned size"""
+    if isinstance(counter, EdgeCounter):
+        return counter.since(size)
+    return {category: counter[category][size[category]:] for category in counter}
+
+
+def merge_counter(counter, delta, lee=None):
+    """
+    Adds the entries of delta (from counter_since()) to a counter, in place.
+    When lee is given, the entries are added for that LEE id instead (e.g. for a duplicate LEE)
+    """
+    if isinstance(counter, EdgeCounter):
+        if not isinstance(delta, EdgeCounter):
+            raise ValueError('The saved counter entries have no LEE ids, an EdgeCounter cannot be restored from them')
+        records = delta.records
+        if lee is not None:
+            records = records.copy()
+            records['lee'] = lee
+        counter.extend(records)
+    else:
+        if isinstance(delta, EdgeCounter):
+            delta = delta.to_dict()
+        for category in delta:
+            counter[category] += delta[category]
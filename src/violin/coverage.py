@@ -0,0 +1,174 @@
+"""
+coverage.py
+
+Handles the model-coverage report: how many LEEs, with how much evidence, corroborate or contradict
+each model interaction, and which categories of LEEs involve each model element
+Created October 2026 - MeLoDy Lab
+"""
+
+import numpy as np
+import pandas as pd
+
+from violin.counter import EdgeCounter, counter_categories
+from violin.index import lee_elements
+from violin.progress import categories, category_values
+from violin.scoring import kind_dict
+
+# Coverage column labels of the edge table and of the annotated model, per counter category
+_edge_labels = {'corroboration': ('Corroborating', 'Corroborated'), 'contradiction': ('Contradicting', 'Contradicted')}
+
+
+def _model_sign(model_df, t_idx, s_idx):
+    # Sign of the model interaction s -> t, empty if s is not a regulator of t in the model
+    listname = model_df.at[s_idx, 'Listname']
+    for sign, col in [('positive', 'Positive Regulator List'), ('negative', 'Negative Regulator List')]:
+        if listname in str(model_df.at[t_idx, col]).split(','):
+            return sign
+    return ''
+
+
+def edge_coverage(scored_reading_df, model_df, counter):
+    """
+    Aggregates the corroborating and contradicting LEEs of each model interaction
+
+    Parameters
+    ----------
+    scored_reading_df : pd.DataFrame
+        The scored reading dataframe (see scoring.score_reading), the LEE ids of the counter are its rows
+    model_df : pd.DataFrame
+        The model dataframe
+    counter : counter.EdgeCounter
+        Counter filled while scoring the reading
+
+    Returns
+    -------
+    edges_df : pd.DataFrame
+        One row per matched model interaction (regulator s_idx, regulated element t_idx), with the number of LEEs
+        and the summed Evidence Score of each category, sorted by the number of LEEs;
+        the Model Sign is empty when the regulator is not in a regulator list of the element (path matches)
+    """
+    if not isinstance(counter, EdgeCounter):
+        raise ValueError('The coverage report requires the LEE ids of a counter.EdgeCounter')
+    records = pd.DataFrame(counter.records)
+    records['Evidence Score'] = scored_reading_df['Evidence Score'].astype(float).values[records['lee'].values]
+    grouped = records.groupby(['t_idx', 's_idx', 'category'])['Evidence Score'].agg(['size', 'sum'])
+    grouped = grouped.unstack('category', fill_value=0)
+
+    edges_df = grouped.index.to_frame(index=False)
+    for code, category in enumerate(counter_categories):
+        label = _edge_labels[category][0]
+        edges_df[label + ' LEEs'] = grouped[('size', code)].values if ('size', code) in grouped else 0
+        edges_df[label + ' Evidence'] = grouped[('sum', code)].values if ('sum', code) in grouped else 0.0
+    edges_df.insert(0, 'Regulator', model_df['Variable'].values[edges_df['s_idx'].values])
+    edges_df.insert(1, 'Regulated', model_df['Variable'].values[edges_df['t_idx'].values])
+    edges_df.insert(2, 'Model Sign', [_model_sign(model_df, t, s) for t, s in zip(edges_df['t_idx'], edges_df['s_idx'])])
+    edges_df['Total LEEs'] = edges_df['Corroborating LEEs'] + edges_df['Contradicting LEEs']
+    return edges_df.sort_values(by='Total LEEs', ascending=False, kind='mergesort').reset_index(drop=True)
+
+
+def element_coverage(scored_reading_df, model_df, kind_values=kind_dict, embedding_match=False):
+    """
+    Aggregates the LEEs whose regulator or regulated element matches each model element, per output category
+
+    Parameters
+    ----------
+    scored_reading_df : pd.DataFrame
+        The scored reading dataframe
+    model_df : pd.DataFrame
+        The model dataframe
+    kind_values : dict
+        Dictionary assigning Kind Score values, used for the categories
+        Default values found in scoring.kind_dict
+    embedding_match : bool or embedding.EntityIndex
+        Passed to numeric.find_element
+        Default is False
+
+    Returns
+    -------
+    elements_df : pd.DataFrame
+        One row per model row, with the number of LEEs and the summed Evidence Score of each category
+    """
+    scored = scored_reading_df.reset_index(drop=True)
+    regulators, regulated = lee_elements(scored, model_df, embedding_match)
+    # (model row, LEE) pairs; an LEE whose regulator and regulated element match the same row is counted once
+    pairs = pd.DataFrame({'row': [r for rows in regulators + regulated for r in rows],
+                          'lee': [x for lees in [regulators, regulated] for x, rows in enumerate(lees) for _ in rows]},
+                         dtype=np.int64).drop_duplicates()
+    value_category = category_values(kind_values)
+    pairs['category'] = scored['Kind Score'].map(value_category).values[pairs['lee'].values]
+    pairs['Evidence Score'] = scored['Evidence Score'].astype(float).values[pairs['lee'].values]
+    grouped = pairs.groupby(['row', 'category'])['Evidence Score'].agg(['size', 'sum']).unstack('category', fill_value=0)
+
+    elements_df = pd.DataFrame(index=pd.RangeIndex(model_df.shape[0]))
+    for category in categories:
+        label = category.capitalize()
+        for stat, col in [('size', label + ' LEEs'), ('sum', label + ' Evidence')]:
+            values = grouped[(stat, category)] if (stat, category) in grouped else pd.Series(dtype=float)
+            elements_df[col] = values.reindex(elements_df.index, fill_value=0).values
+    return elements_df
+
+
+def model_coverage(scored_reading_df, model_df, counter, kind_values=kind_dict, embedding_match=False):
+    """
+    Annotates the model with its coverage by the reading: the LEEs involving each element (see element_coverage),
+    and the regulators whose interaction with the element is corroborated or contradicted (see edge_coverage)
+
+    Parameters
+    ----------
+    scored_reading_df : pd.DataFrame
+        The scored reading dataframe (see scoring.score_reading)
+    model_df : pd.DataFrame
+        The model dataframe
+    counter : counter.EdgeCounter
+        Counter filled while scoring the reading
+    kind_values : dict
+        Dictionary assigning Kind Score values
+        Default values found in scoring.kind_dict
+    embedding_match : bool or embedding.EntityIndex
+        Passed to numeric.find_element
+        Default is False
+
+    Returns
+    -------
+    coverage_df : pd.DataFrame
+        The model in BioRECIPE format, with the coverage columns
+    edges_df : pd.DataFrame
+        See edge_coverage
+    """
+    edges_df = edge_coverage(scored_reading_df, model_df, counter)
+    coverage_df = model_df.drop(columns=['Listname']).reset_index(drop=True)
+    coverage_df = pd.concat([coverage_df, element_coverage(scored_reading_df, model_df, kind_values, embedding_match)],
+                            axis=1)
+    # Regulators of each element, as comma-separated variable names like the model regulator lists
+    for label, annotation in _edge_labels.values():
+        supported = edges_df[edges_df[label + ' LEEs'] > 0]
+        regulators = supported.groupby('t_idx')['Regulator'].agg(','.join)
+        coverage_df[annotation + ' Regulators'] = regulators.reindex(coverage_df.index, fill_value='').values
+    return coverage_df, edges_df
+
+
+def output_coverage(scored_reading_df, model_df, counter, file_name, kind_values=kind_dict, embedding_match=False):
+    """
+    Writes the model-coverage report: {file_name}_model_coverage.csv (model annotated in BioRECIPE format)
+    and {file_name}_edge_coverage.csv (one row per corroborated or contradicted model interaction)
+
+    Parameters
+    ----------
+    scored_reading_df : pd.DataFrame
+        The scored reading dataframe (see scoring.score_reading)
+    model_df : pd.DataFrame
+        The model dataframe
+    counter : counter.EdgeCounter
+        Counter filled while scoring the reading
+    file_name : str
+        Directory and filename of the output suffix
+    kind_values : dict
+        Dictionary assigning Kind Score values
+        Default values found in scoring.kind_dict
+    embedding_match : bool or embedding.EntityIndex
+        Passed to numeric.find_element
+        Default is False
+    """
+    coverage_df, edges_df = model_coverage(scored_reading_df, model_df, counter, kind_values, embedding_match)
+    coverage_df.replace('nan', '').to_csv(f'{file_name}_model_coverage.csv', index=False)
+    edges_df.drop(columns=['t_idx', 's_idx']).to_csv(f'{file_name}_edge_coverage.csv', index=False)
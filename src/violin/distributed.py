@@ -0,0 +1,193 @@
+"""
+distributed.py
+
+Handles the partitioning of a reading for scoring on an executor (see scoring.score_reading), and adapters running
+the partitions on a Dask or Ray cluster through the concurrent.futures.Executor interface
+Created October 2026 - MeLoDy Lab
+"""
+
+import concurrent.futures
+import multiprocessing
+import os
+import zlib
+
+import numpy as np
+
+from violin.index import lee_elements
+
+try:
+    from dask.distributed import Client, LocalCluster
+except ImportError:
+    Client = None
+
+try:
+    import ray
+except ImportError:
+    ray = None
+
+
+def partition_lees(reading_df, model_df, partitions, embedding_match=False, elements=None):
+    """
+    Assigns each LEE to a partition by a hash of its source element: the first model row matching the regulator
+    (see index.lee_elements), or the regulator name when it is not in the model. The LEEs of a regulator are then
+    scored together, so the path searches from it (and the classification of duplicate LEEs) stay in one partition
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        The reading dataframe
+    model_df : pd.DataFrame
+        The model dataframe
+    partitions : int
+        Number of partitions
+    embedding_match : bool or embedding.EntityIndex
+        Passed to numeric.find_element
+        Default is False
+    elements : tuple
+        Model rows of the regulator and regulated element of each LEE, when already resolved (see index.lee_elements)
+        Default is None
+
+    Returns
+    -------
+    rows : list
+        Rows of the reading dataframe in each partition, in increasing order; empty partitions are left out
+    """
+    regulators, _ = lee_elements(reading_df, model_df, embedding_match) if elements is None else elements
+    keys = [('row %d' % rows[0]) if len(rows) else 'name ' + str(name).lower()
+            for rows, name in zip(regulators, reading_df['Regulator Name'])]
+    codes = {key: zlib.crc32(key.encode('utf-8')) % partitions for key in set(keys)}
+    assigned = np.array([codes[key] for key in keys], dtype=np.int64)
+    return [rows for rows in (np.flatnonzero(assigned == p) for p in range(partitions)) if len(rows)]
+
+
+def executor_workers(executor):
+    """Number of workers of an executor: its workers attribute, the workers of a ProcessPoolExecutor, or one per CPU"""
+    workers = getattr(executor, 'workers', None) or getattr(executor, '_max_workers', None)
+    return workers or os.cpu_count() or 1
+
+
+def broadcast(executor, obj):
+    """
+    Sends an object to the workers of an executor once, when the executor can (DaskExecutor, RayExecutor);
+    the returned handle is passed to the tasks instead of the object. Other executors send the object with each task
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+    obj :
+        Picklable object, e.g. the compiled model
+
+    Returns
+    -------
+    handle :
+    """
+    if hasattr(executor, 'broadcast'):
+        return executor.broadcast(obj)
+    return obj
+
+
+class DaskExecutor(concurrent.futures.Executor):
+    """
+    Executor running tasks on a Dask cluster, on a local cluster of processes when no scheduler address is given.
+    Requires dask.distributed
+
+    Parameters
+    ----------
+    address : str
+        Address of the Dask scheduler
+        Default is None (a LocalCluster is started, and closed on shutdown)
+    workers : int
+        Number of worker processes of the local cluster
+        Default is None (Dask default)
+    """
+
+    def __init__(self, address=None, workers=None):
+        if Client is None:
+            raise ImportError('The Dask executor requires dask.distributed (pip install "dask[distributed]")')
+        self.cluster = None
+        if address is None:
+            self.cluster = LocalCluster(n_workers=workers, threads_per_worker=1, processes=True)
+            address = self.cluster
+        self.client = Client(address)
+        self.workers = len(self.client.scheduler_info()['workers'])
+        self._executor = self.client.get_executor(pure=False)
+
+    def submit(self, fn, *args, **kwargs):
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def broadcast(self, obj):
+        """Scatters an object to every worker; Dask resolves the returned future in the task arguments"""
+        return self.client.scatter(obj, broadcast=True)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self._executor.shutdown(wait=wait)
+        self.client.close()
+        if self.cluster is not None:
+            self.cluster.close()
+
+
+class RayExecutor(concurrent.futures.Executor):
+    """
+    Executor running tasks as Ray remote functions, on a local Ray instance when no cluster address is given.
+    Requires ray
+
+    Parameters
+    ----------
+    address : str
+        Address of the Ray cluster
+        Default is None (a local instance is started, and shut down on shutdown)
+    workers : int
+        Number of CPUs of the local instance
+        Default is None (all CPUs)
+    """
+
+    def __init__(self, address=None, workers=None):
+        if ray is None:
+            raise ImportError('The Ray executor requires ray (pip install ray)')
+        self.started = not ray.is_initialized()
+        if self.started:
+            ray.init(address=address, num_cpus=workers if address is None else None)
+        self.workers = int(ray.cluster_resources().get('CPU', 1))
+        self._functions = {}
+
+    def submit(self, fn, *args, **kwargs):
+        if fn not in self._functions:
+            self._functions[fn] = ray.remote(fn)
+        return self._functions[fn].remote(*args, **kwargs).future()
+
+    def broadcast(self, obj):
+        """Puts an object in the Ray object store; Ray resolves the returned reference in the task arguments"""
+        return ray.put(obj)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        if self.started:
+            ray.shutdown()
+
+
+def make_executor(backend, workers=None, address=None):
+    """
+    Creates the executor of a scoring backend
+
+    Parameters
+    ----------
+    backend : str
+        'process' (concurrent.futures.ProcessPoolExecutor on this machine), 'dask', or 'ray'
+    workers : int
+        Number of worker processes (of the local cluster for 'dask' and 'ray')
+        Default is None (one per CPU)
+    address : str
+        Address of the Dask scheduler or Ray cluster
+        Default is None (local cluster)
+
+    Returns
+    -------
+    executor : concurrent.futures.Executor
+    """
+    if backend == 'process':
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                      mp_context=multiprocessing.get_context('spawn'))
+    if backend == 'dask':
+        return DaskExecutor(address, workers)
+    if backend == 'ray':
+        return RayExecutor(address, workers)
+    raise ValueError("backend must be 'process', 'dask', or 'ray'")
@@ -0,0 +1,319 @@
+"""
+embedding.py
+
+Handles fuzzy grounding of LEE entities to model elements: model element names and HGNC symbols are embedded
+once as character n-gram TF-IDF vectors in a nearest-neighbor index, and entities missing the exact lookup of
+numeric.find_element are resolved to the most similar model entry with the same numbers
+(used when embedding_match is enabled). IDs are only matched exactly
+Created October 2026 - MeLoDy Lab
+"""
+
+import json
+import os.path
+import re
+import zlib
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# Model columns searched for each search type of numeric.find_element
+entity_cols = {'name': 'Element Name', 'hgnc': 'Element HGNC Symbol', 'id': 'Element IDs'}
+
+# Search types matched fuzzily: database accessions and numeric IDs only match exactly
+fuzzy_types = ['name', 'hgnc']
+
+# Number of nearest entries checked for one with the same numbers as the query
+candidates = 5
+
+# Reading columns resolved for each search type
+reading_entity_cols = {'name': ['Regulator Name', 'Regulated Name'],
+                       'hgnc': ['Regulator HGNC Symbol', 'Regulated HGNC Symbol'],
+                       'id': ['Regulator ID', 'Regulated ID']}
+
+# Suffix of the index saved next to a model file
+index_ext = '.entities.npz'
+
+
+def ngrams(text, sizes=(2, 3)):
+    """
+    Character n-grams of a string, lower-case and without punctuation or whitespace
+    (so that e.g. 'MAPK-1' and 'mapk1' are the same), padded with '#' at both ends
+
+    Parameters
+    ----------
+    text : str
+    sizes : tuple
+        Lengths of the n-grams
+        Default is (2, 3)
+
+    Returns
+    -------
+    ngrams : list
+    """
+    text = '#' + re.sub(r'[\W_]+', '', text.lower()) + '#'
+    return [text[i:i + n] for n in sizes for i in range(max(1, len(text) - n + 1))]
+
+
+def numbers(text):
+    """
+    Numbers in a string, e.g. ['6', '1'] for 'RPS6KB1'; paralogs and family members (AKT1, AKT3) differ by them
+
+    Parameters
+    ----------
+    text : str
+
+    Returns
+    -------
+    numbers : list
+    """
+    return re.findall(r'\d+', text)
+
+
+def _counts(texts, dim):
+    # n-gram counts hashed into dim buckets (crc32 is stable across processes, unlike hash)
+    counts = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for gram in ngrams(text):
+            counts[row, zlib.crc32(gram.encode()) % dim] += 1
+    return counts
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EntityIndex:
+    """
+    Nearest-neighbor index of the model element names and HGNC symbols, embedded as hashed character n-gram
+    TF-IDF vectors. Uses an HNSW index when hnswlib is installed, otherwise an exact cosine search with NumPy.
+    A string only matches an entry with the same numbers (see numbers), so a gene missing from the model is not
+    grounded to a paralog or family of the model (AKT3 to AKT1, AKT2); IDs are never matched fuzzily.
+    Resolved strings are cached, and the strings of a whole reading can be resolved in one batch (see resolve_reading)
+
+    Parameters
+    ----------
+    model_df : pd.DataFrame
+        The model dataframe
+    threshold : float
+        Minimum cosine similarity of a match
+        Default is 0.8
+    dim : int
+        Number of hashed n-gram features
+        Default is 512
+
+    Examples
+    --------
+    >>> entities = EntityIndex(model_df)
+    >>> entities.rows('name', 'mapk-1')     # model rows of the most similar element name, or []
+    >>> scored = score_reading(reading_df, model_df, graph, embedding_match=entities)
+    """
+
+    def __init__(self, model_df=None, threshold=0.8, dim=512):
+        self.threshold = threshold
+        self.dim = dim
+        self.cache = {}
+        self.texts, self.rows_of, self.vectors, self.idf = {}, {}, {}, {}
+        if model_df is None:
+            return
+        for search_type in fuzzy_types:
+            col = entity_cols[search_type]
+            entries = {}
+            for row, cell in enumerate(model_df[col].astype(str)):
+                # HGNC symbols and IDs of families and complexes are comma-separated
+                for text in (cell.split(',') if search_type != 'name' else [cell]):
+                    text = text.strip()
+                    if text not in ['', 'nan']:
+                        entries.setdefault(text, []).append(row)
+            self.texts[search_type] = list(entries)
+            self.rows_of[search_type] = list(entries.values())
+            counts = _counts(self.texts[search_type], dim)
+            self.idf[search_type] = np.log((1 + len(counts)) / (1 + (counts > 0).sum(axis=0))).astype(np.float32) + 1
+            self.vectors[search_type] = _normalize(counts * self.idf[search_type])
+        self._build_ann()
+
+    def _build_ann(self):
+        self.ann = {}
+        if hnswlib is None:
+            return
+        for search_type, vectors in self.vectors.items():
+            if len(vectors):
+                ann = hnswlib.Index(space='cosine', dim=self.dim)
+                ann.init_index(max_elements=len(vectors), ef_construction=200, M=16)
+                ann.add_items(vectors, np.arange(len(vectors)))
+                ann.set_ef(50)
+                self.ann[search_type] = ann
+
+    def embed(self, search_type, strings):
+        """
+        Embeds strings with the n-gram weights of a search type
+
+        Parameters
+        ----------
+        search_type : str
+            'name', 'hgnc', or 'id'
+        strings : list
+
+        Returns
+        -------
+        vectors : np.ndarray
+            Unit vectors, one row per string
+        """
+        return _normalize(_counts(strings, self.dim) * self.idf[search_type])
+
+    def query(self, search_type, strings):
+        """
+        Resolves strings to the most similar model entries, in one batch
+
+        Parameters
+        ----------
+        search_type : str
+            'name', 'hgnc', or 'id'
+        strings : list
+
+        Returns
+        -------
+        matches : list
+            Model rows of the most similar entry of each string with the same numbers, [] when no such entry
+            reaches the threshold (always [] for 'id')
+        """
+        if search_type not in fuzzy_types or not strings or not len(self.vectors.get(search_type, [])):
+            return [[] for _ in strings]
+        queries = self.embed(search_type, strings)
+        k = min(candidates, len(self.vectors[search_type]))
+        if search_type in self.ann:
+            labels, distances = self.ann[search_type].knn_query(queries, k=k)
+            similarities = 1 - distances
+        else:
+            similarities = queries @ self.vectors[search_type].T
+            labels = np.argsort(-similarities, axis=1, kind='stable')[:, :k]
+            similarities = np.take_along_axis(similarities, labels, axis=1)
+        matches = []
+        for string, nearest, similarity in zip(strings, labels, similarities):
+            found = [b for b, s in zip(nearest, similarity)
+                     if s >= self.threshold and numbers(self.texts[search_type][b]) == numbers(string)]
+            matches.append(list(self.rows_of[search_type][found[0]]) if found else [])
+        return matches
+
+    def rows(self, search_type, string):
+        """
+        Model rows of the entry most similar to a string (cached)
+
+        Parameters
+        ----------
+        search_type : str
+            'name', 'hgnc', or 'id'
+        string : str
+
+        Returns
+        -------
+        rows : list
+            [] when no entry reaches the threshold
+        """
+        key = (search_type, string)
+        if key not in self.cache:
+            self.cache[key] = self.query(search_type, [string])[0]
+        return self.cache[key]
+
+    def resolve_reading(self, reading_df, model_df=None):
+        """
+        Resolves the entity strings of a reading not yet in the cache, with one batched query per search type
+
+        Parameters
+        ----------
+        reading_df : pd.DataFrame
+            The reading dataframe
+        model_df : pd.DataFrame
+            The model dataframe; strings found by the exact lookup of numeric.find_element (contained in a model
+            entry) are left out, other strings are resolved when find_element misses them
+            Default is None (every string is resolved)
+        """
+        for search_type in fuzzy_types:
+            strings = set()
+            for col in reading_entity_cols[search_type]:
+                if col in reading_df.columns:
+                    strings.update(reading_df[col].astype(str))
+            strings = [s for s in strings if s != 'nan' and (search_type, s) not in self.cache]
+            if model_df is not None:
+                entries = list(model_df[entity_cols[search_type]].astype(str))
+                strings = [s for s in strings if not any(s in entry for entry in entries)]
+            for string, rows in zip(strings, self.query(search_type, strings)):
+                self.cache[(search_type, string)] = rows
+
+    def save(self, file_name):
+        """
+        Saves the index (the NumPy arrays; the HNSW index is rebuilt when loading)
+
+        Parameters
+        ----------
+        file_name : str
+            Filename of the .npz file
+        """
+        arrays = {'meta': np.array(json.dumps({'threshold': self.threshold, 'dim': self.dim,
+                                               'texts': self.texts, 'rows': self.rows_of}))}
+        for search_type in self.vectors:
+            arrays['vectors_' + search_type] = self.vectors[search_type]
+            arrays['idf_' + search_type] = self.idf[search_type]
+        with open(file_name + '.tmp', 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(file_name + '.tmp', file_name)
+
+    @classmethod
+    def load(cls, file_name):
+        """
+        Loads an index saved by save()
+
+        Parameters
+        ----------
+        file_name : str
+            Filename of the .npz file
+
+        Returns
+        -------
+        index : EntityIndex
+        """
+        with np.load(file_name) as arrays:
+            meta = json.loads(str(arrays['meta']))
+            index = cls(threshold=meta['threshold'], dim=meta['dim'])
+            index.texts, index.rows_of = meta['texts'], meta['rows']
+            for search_type in index.texts:
+                index.vectors[search_type] = arrays['vectors_' + search_type]
+                index.idf[search_type] = arrays['idf_' + search_type]
+        index._build_ann()
+        return index
+
+
+def entity_index(model_df, model_file=None, threshold=0.8):
+    """
+    Returns the EntityIndex of a model, reusing the one saved next to the model file (model_file + '.entities.npz')
+    while it is newer than the model file, otherwise building it (and saving it when model_file is given)
+
+    Parameters
+    ----------
+    model_df : pd.DataFrame
+        The model dataframe
+    model_file : str
+        Directory and filename of the model file
+        Default is None (the index is not saved)
+    threshold : float
+        Minimum cosine similarity of a match
+        Default is 0.8
+
+    Returns
+    -------
+    index : EntityIndex
+    """
+    if model_file is not None and isinstance(model_file, str):
+        file_name = model_file + index_ext
+        if os.path.exists(file_name) and os.path.getmtime(file_name) >= os.path.getmtime(model_file):
+            index = EntityIndex.load(file_name)
+            index.threshold = threshold
+            return index
+        index = EntityIndex(model_df, threshold=threshold)
+        index.save(file_name)
+        return index
+    return EntityIndex(model_df, threshold=threshold)
@@ -10,6 +10,7 @@ import pandas as pd
 pd.options.mode.chained_assignment = None
 import numpy as np
 import os.path
+import functools
 import logging
 import re
 
@@ -24,6 +25,9 @@ _VALID_TYPES = [
 
 _VAR_COL = 'Variable'
 _IDX_COL = '#'
+# model columns which can contain variable names
+_VAR_NAME_COLS = [_VAR_COL, 'Positive Regulator List', 'Negative Regulator List',
+                  'Positive Regulation Rule', 'Negative Regulation Rule']
 required_model = ['Element Name','Element Type','Element IDs','Variable','Positive Regulator List', 'Negative Regulator List']
 
 type_abbr_dict = {
@@ -180,6 +184,36 @@ def add_regulator_names_id(model_df):
                 model_df.at[y,sign+' IDs'] = reg_id
 
     return model_df
+def _literal_pattern(words):
+    """
+    This function creates a regular expression matching any of the words, as a trie so that
+    each position is not tried against every word; the longest word is matched at each position
+
+    Parameters
+    ----------
+    words: iterable
+        Words to match literally
+    Returns
+    -------
+    pattern: str
+        regular expression
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def to_regex(node):
+        branches = [re.escape(char) + to_regex(child) for char, child in node.items() if char != '']
+        if len(branches) == 0:
+            return ''
+        regex = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + regex + ')?' if '' in node else regex
+
+    return to_regex(trie)
+
 def format_variable_names(model: pd.DataFrame):
 
     """
@@ -202,29 +236,32 @@ def format_variable_names(model: pd.DataFrame):
     # remove whitespace in variable names
     model[_VAR_COL] = model[_VAR_COL].str.strip()
 
-    # collect invalid element names in a list so they can be removed everywhere in the model
+    # collect invalid element names so they can be replaced in all the variable name columns
     # find invalid characters in element names and names starting with numbers
-    invalid_names = [
-        x for x in model[_VAR_COL]
-        if re.search(r'(^[0-9]+)',x.strip()) or re.search(r'([^'+_VALID_CHARS+']+)',x.strip())
-        ]
+    invalid = re.compile(r'(^[0-9]+)|([^'+_VALID_CHARS+']+)')
+    invalid_names = [x for x in dict.fromkeys(model[_VAR_COL]) if invalid.search(x.strip())]
 
     if len(invalid_names) > 0:
         logging.info('Formatting variable names: ')
 
-    # remove invalid characters at the start of the variable name
-    replace_names = [re.sub(r'^[^'+_VALID_CHARS+']+','',x) for x in invalid_names]
-    # replace invalid characters elsewhere in variable names
-    replace_names = [re.sub(r'[^'+_VALID_CHARS+']+','_',x) for x in replace_names]
-
-    # add ELE_ at the beginning of names starting with numbers
-    replace_names = [re.sub(r'(^[0-9]+)','ELE_\\1',x) for x in replace_names]
-
-    name_pairs = zip(invalid_names,replace_names)
-
-    for (invalid_name,replace_name) in name_pairs:
-        logging.info('%s -> %s' % (invalid_name,replace_name))
-        model.replace(re.escape(invalid_name),re.escape(replace_name),regex=True,inplace=True)
+    renames = {}
+    for invalid_name in invalid_names:
+        # remove invalid characters at the start of the variable name
+        replace_name = re.sub(r'^[^'+_VALID_CHARS+']+','',invalid_name)
+        # replace invalid characters elsewhere in variable names
+        replace_name = re.sub(r'[^'+_VALID_CHARS+']+','_',replace_name)
+        # add ELE_ at the beginning of names starting with numbers
+        renames[invalid_name] = re.sub(r'(^[0-9]+)','ELE_\\1',replace_name)
+        logging.info('%s -> %s' % (invalid_name,renames[invalid_name]))
+
+    if len(renames) > 0:
+        # a single pass over each column which can contain variable names
+        pattern = re.compile(_literal_pattern(renames))
+        def rename(x):
+            return pattern.sub(lambda m: renames[m.group(0)], x) if isinstance(x, str) else x
+        model[_VAR_COL] = model[_VAR_COL].map(lambda x: renames.get(x, x))
+        for col in [c for c in _VAR_NAME_COLS if c in model.columns and c != _VAR_COL]:
+            model[col] = model[col].map(rename)
 
     return model
 
@@ -257,7 +294,173 @@ def get_type(input_type):
         return 'other'
 
 
-def get_element(reg_rule, layer):
+# characters of a regulator name in a product (e.g. 2*A*B)
+_REG_CHARS = re.compile(r'[a-zA-Z0-9\_!]')
+
+
+def _bracket_matches(reg_rule):
+    # position of the closing bracket of each opening bracket, found in a single pass
+    matches = {}
+    stack = []
+    for index, char in enumerate(reg_rule):
+        if char in '({[':
+            stack.append(index)
+        elif char in ')}]':
+            if len(stack) == 0:
+                raise ValueError('Unbalanced brackets in regulation rule: ' + reg_rule)
+            matches[stack.pop()] = index
+    if len(stack) > 0:
+        raise ValueError('Unbalanced brackets in regulation rule: ' + reg_rule)
+    return matches
+
+
+def _parse_list(reg_rule, start, end, matches):
+    # elements of reg_rule[start:end] separated by ',' or '+' outside of brackets
+    items = []
+    separator = None
+    index = start
+    item_start = start
+    while index < end:
+        char = reg_rule[index]
+        if char in '({[':
+            index = matches[index] + 1
+            continue
+        if char in ',+':
+            items.append(_parse_element(reg_rule, item_start, index, matches))
+            separator = char
+            item_start = index + 1
+        index += 1
+    if separator == '+' and item_start == end:
+        raise ValueError('Regulation rule is not correct')
+    items.append(_parse_element(reg_rule, item_start, end, matches))
+    return separator, tuple(items)
+
+
+def _parse_expression(reg_rule, start, end, matches):
+    # a list of elements: a comma separated list (or), a sum (+), or a single element
+    separator, items = _parse_list(reg_rule, start, end, matches)
+    if len(items) == 1:
+        return items[0]
+    return ('sum' if separator == '+' else 'or', items)
+
+
+def _parse_weighted(reg_rule, start, end, matches):
+    # an expression, with an optional weight: w*expression
+    star = reg_rule.find('*', start, end)
+    if star != -1 and not any(char in '({[' for char in reg_rule[start:star]):
+        return ('weight', reg_rule[start:star], _parse_expression(reg_rule, star + 1, end, matches))
+    return _parse_expression(reg_rule, start, end, matches)
+
+
+def _parse_element(reg_rule, start, end, matches):
+    if start == end:
+        raise ValueError('Empty element in regulation rule: ' + reg_rule)
+    first, last = reg_rule[start], reg_rule[end - 1]
+
+    if first == '{' and matches[start] == end - 1:
+        # weighted element {w*A}
+        node = _parse_weighted(reg_rule, start + 1, end - 1, matches)
+        return node if node[0] == 'weight' else ('weight', None, node)
+
+    elif first == '{' and last == ']' and reg_rule[matches[start] + 1] == '[':
+        # necessary pair {necessary}[enhancer]
+        cutpoint = matches[start]
+        return ('necessary',
+                _parse_weighted(reg_rule, start + 1, cutpoint, matches),
+                _parse_weighted(reg_rule, cutpoint + 2, end - 1, matches))
+
+    elif first == '(' and matches[start] == end - 1:
+        # all of the elements (A,B)
+        separator, items = _parse_list(reg_rule, start + 1, end - 1, matches)
+        return ('and', items) if separator != '+' else ('and', (('sum', items),))
+
+    reg_element = reg_rule[start:end]
+    if ',' in reg_element:
+        raise ValueError('Regulation rule is not correct: ' + reg_rule)
+    return _parse_regulator(reg_element)
+
+
+def _parse_regulator(reg_element):
+    # a single regulator, with its state, delay, or coefficients
+    if reg_element[-1] == '^':
+        return ('regulator', reg_element[0:-1], (('highest', True),))
+    elif '&' in reg_element:
+        return ('regulator', reg_element[1:-1], ())
+    elif '*' in reg_element:
+        factors = []
+        for reg_ in reg_element.split('*'):
+            if '0' <= reg_[:1] <= '9':
+                factors.append(('constant', reg_))
+            elif _REG_CHARS.search(reg_):
+                factors.append(('regulator', reg_, ()))
+        return ('product', tuple(factors))
+    elif reg_element[0] == '!':
+        if '~' in reg_element[1:]:
+            delay, reg_delay = reg_element[1:].split('~')
+            return ('regulator', reg_delay, (('not', True), ('delay', delay)))
+        return ('regulator', reg_element[1:], (('not', True),))
+    elif '=' in reg_element:
+        name, target_state = reg_element.split('=')
+        return ('regulator', target_state, (('state', name),))
+    elif '~' in reg_element:
+        delay, state = reg_element.split('~')
+        return ('regulator', state, (('delay', delay),))
+    return ('regulator', reg_element, ())
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rule(reg_rule):
+    """
+    This function parses a regulation rule into its syntax tree, in a single pass over the rule.
+    Syntax trees are cached, so identical rules are only parsed once
+
+    Parameters
+    ----------
+    reg_rule: str
+        A BioRECIPE Regulation Rule
+    Returns
+    -------
+    tree: tuple
+        Nested tuples, the first item of each is the node type:
+        ('or', elements), ('sum', elements), ('and', elements), ('weight', weight, element),
+        ('necessary', necessary element, enhancer element), ('product', factors),
+        ('constant', value), and ('regulator', name, properties)
+
+    """
+    if '+' in reg_rule and ',' in reg_rule:
+        raise ValueError(
+        'Found mixed commas and plus sign in regulation function'
+        )
+    return _parse_expression(reg_rule, 0, len(reg_rule), _bracket_matches(reg_rule))
+
+
+def _regulators(tree, weight, regulators):
+    # regulator names of the syntax tree in rule order, with the product of their weights (unless weight is None)
+    node_type = tree[0]
+    if node_type == 'regulator':
+        regulators.append((tree[1], weight))
+    elif node_type == 'weight':
+        if weight is not None and tree[1] is not None:
+            weight = weight * float(tree[1])
+        _regulators(tree[2], weight, regulators)
+    elif node_type == 'necessary':
+        _regulators(tree[1], weight, regulators)
+        _regulators(tree[2], weight, regulators)
+    elif node_type == 'product':
+        if weight is not None:
+            for factor in tree[1]:
+                if factor[0] == 'constant':
+                    weight = weight * float(factor[1])
+        for factor in tree[1]:
+            if factor[0] == 'regulator':
+                regulators.append((factor[1], weight))
+    elif node_type != 'constant':
+        for element in tree[1]:
+            _regulators(element, weight, regulators)
+    return regulators
+
+
+def get_element(reg_rule, layer=0):
 
     """
     This function parses the regulation rule and disentangle the symbol operators converting rule to a list of regulators
@@ -268,6 +471,7 @@ def get_element(reg_rule, layer):
         A BioRECIPE Regulation Rule
     layer: str
         counter for recursive time, the default is 0
+        (no longer used, the rule is parsed by parse_rule)
     Returns
     -------
     regulator_list: list
@@ -276,100 +480,95 @@ def get_element(reg_rule, layer):
     """
 
     if reg_rule:
-        regulator_list = []
-
-        if '+' not in reg_rule:
-            reg_list = split_comma_out_parentheses(reg_rule)
-        else:
-            if ',' in reg_rule:
-                raise ValueError(
-                'Found mixed commas and plus sign in regulation function'
-                )
-            elif reg_rule[-1] == '+':
-                raise ValueError(
-                'Regulation rule is not correct'
-                )
-            else:
-                reg_list = reg_rule.split('+')
-
-        for reg_element in reg_list:
-            if reg_element[0] == '{' and reg_element[-1] == '}':
-                assert(layer == 0)
-                if '*' in reg_element:
-                    weight, name = reg_element[1:-1].split('*')
-                    regulator_list = regulator_list + get_element(name, 1)
-                else:
-                    regulator_list = regulator_list + get_element(reg_element, 1)
-
-            elif reg_element[0] == '{' and reg_element[-1] == ']':
-                # This is a necessary pair
-                # check the point between {} and []
-                parentheses = 0
-                cutpoint = 0
-                for index, char in enumerate(reg_element):
-                    if char == '{':
-                        parentheses +=1
-                    elif char =='}':
-                        parentheses -=1
-
-                    if parentheses == 0:
-                        cutpoint = index
-                        break
-
-                necessary_element = reg_element[1: cutpoint]
-                enhence_element = reg_element[cutpoint+2:-1]
-
-                if '*' in necessary_element:
-                    weight, name = necessary_element.split('*')
-                    regulator_list = regulator_list + get_element(name, 1)
-                else:
-                    regulator_list = regulator_list + get_element(necessary_element, 1)
-
-                if '*' in enhence_element:
-                    weight, name = enhence_element.split('*')
-                    regulator_list = regulator_list + get_element(name, 1)
-                else:
-                    regulator_list = regulator_list + get_element(enhence_element, 1)
-
-            elif reg_element[0] == '(' and reg_element[-1] == ')':
-                list = [element for ele_list in split_comma_out_parentheses(reg_element[1:-1])
-                        for element in get_element(ele_list, 1)]
-                regulator_list += list
-            else:
-                #print(f'reg_element: {reg_element}')
-                assert(',' not in reg_element)
-
-                if reg_element[-1] == '^':
-                    regulator_list.append(reg_element[0:-1])
-                elif '&' in reg_element:
-                    regulator_list.append(reg_element[1:-1])
-                elif '*' in reg_element:
-                    multiply_reg_list = reg_element.split('*')
-                    for reg_ in multiply_reg_list:
-                        if re.search(r'^[0-9]', reg_):
-                            pass
-                        elif not re.search(r'[a-zA-Z0-9\_!]+', reg_):
-                            pass
-                        else:
-                            regulator_list.append(reg_)
-                elif reg_element[0] == '!':
-                    if '~' in reg_element[1:]:
-                        delay, reg_delay = reg_element[1:].split('~')
-                        regulator_list.append(reg_delay)
-                    else:
-                        regulator_list.append(reg_element[1:])
-
-                elif '=' in reg_element:
-                    name, target_state = reg_element.split('=')
-                    regulator_list.append(target_state)
-                elif '~' in reg_element:
-                    delay, state = reg_element.split('~')
-                    regulator_list.append(state)
-
-                else:
-                    regulator_list.append(reg_element)
-
-        return regulator_list
+        return [name for name, weight in _regulators(parse_rule(reg_rule), None, [])]
+
+
+def get_weights(reg_rule):
+
+    """
+    This function finds the weight of each regulator of the regulation rule,
+    from weighted elements ({w*A}) and constant factors (w*A)
+
+    Parameters
+    ----------
+    reg_rule: str
+        A BioRECIPE Regulation Rule
+    Returns
+    -------
+    weights: list
+        (regulator, weight) pairs, in the order of get_element; the weight of unweighted regulators is 1
+
+    """
+
+    if not reg_rule:
+        return []
+    tree = parse_rule(reg_rule)
+    try:
+        return _regulators(tree, 1., [])
+    except ValueError:
+        raise ValueError('Weights of the regulation rule are not numbers: ' + reg_rule)
+
+
+def get_necessary_pairs(reg_rule):
+
+    """
+    This function finds the necessary pairs ({necessary}[enhancer]) of the regulation rule
+
+    Parameters
+    ----------
+    reg_rule: str
+        A BioRECIPE Regulation Rule
+    Returns
+    -------
+    pairs: list
+        (necessary regulators, enhancer regulators) pairs of lists
+
+    """
+
+    pairs = []
+    stack = [parse_rule(reg_rule)] if reg_rule else []
+    while stack:
+        tree = stack.pop()
+        if tree[0] == 'necessary':
+            pairs.append(([name for name, weight in _regulators(tree[1], None, [])],
+                          [name for name, weight in _regulators(tree[2], None, [])]))
+        elif tree[0] in ['or', 'sum', 'and']:
+            stack.extend(reversed(tree[1]))
+        elif tree[0] == 'weight':
+            stack.append(tree[2])
+    return pairs
+
+
+def rule_regulator_lists(model_df):
+    """
+    This function fills the empty regulator lists of a model from its regulation rules,
+    converting the variable names of the rules to list-names
+
+    Parameters
+    ----------
+    model_df : pd.DataFrame
+        The model dataframe (in BioRECIPE format), with the Listname column
+    Returns
+    -------
+    model_df : pd.DataFrame
+        The model dataframe; regulator lists are only filled for a sign whose
+        regulator list column is empty and regulation rule column is not
+
+    """
+    empty = ['', 'Nan', 'nan']
+    listnames = dict(zip(model_df[_VAR_COL], model_df['Listname']))
+    for sign in ['Positive', 'Negative']:
+        rule_col = sign + ' Regulation Rule'
+        list_col = sign + ' Regulator List'
+        if rule_col not in model_df.columns:
+            continue
+        rules = model_df[rule_col].astype(str).str.strip()
+        if not model_df[list_col].astype(str).str.strip().isin(empty).all() or rules.isin(empty).all():
+            continue
+        model_df[list_col] = ['nan' if rule in empty
+                              else ','.join(listnames.get(name, name) for name in dict.fromkeys(get_element(rule)))
+                              for rule in rules]
+    return model_df
 
 
 def split_comma_out_parentheses(reg_rule):
@@ -0,0 +1,361 @@
+"""
+grounding.py
+
+Handles the offline normalization of reading entities: synonyms and identifiers from local HGNC, UniProt, and ChEBI
+dumps are compiled once into a memory-mapped hash table, which canonicalizes the LEE elements (HGNC symbol, database,
+and ID) before they are searched for in the model, without network access
+Created October 2026 - MeLoDy Lab
+
+Usage:
+    python -m violin.grounding synonyms/ hgnc_complete_set.txt uniprot_human.tsv chebi_compounds.tsv chebi_names.tsv
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Identifier prefixes recognized in reading IDs and Database columns
+id_prefixes = ['uniprot', 'hgnc', 'chebi']
+
+# Fields of a canonical record
+record_fields = ['symbol', 'name', 'database', 'id']
+
+
+def _string_table(strings):
+    # One UTF-8 buffer with the offsets of each string
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _hash(key):
+    # 64-bit key hash, stable across processes; 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+
+def normalize_key(value, database=None):
+    """
+    Lookup key of an entity string: lower-case and stripped, identifiers as 'prefix:value'
+    (e.g. 'HGNC:3373', 'hgnc:3373', and '3373' from the HGNC database all give 'hgnc:3373')
+
+    Parameters
+    ----------
+    value : str
+        Name, symbol, or identifier
+    database : str
+        Database of an identifier without prefix
+        Default is None
+
+    Returns
+    -------
+    key : str
+        '' for missing values
+    """
+    value = str(value).strip().lower()
+    if value in ['', 'nan', 'none']:
+        return ''
+    prefix, _, rest = value.partition(':')
+    if rest and prefix in id_prefixes:
+        # ChEBI and HGNC accessions repeat the prefix, as in 'chebi:chebi:15422'
+        while rest.startswith(prefix + ':'):
+            rest = rest[len(prefix) + 1:]
+        return prefix + ':' + rest.strip()
+    database = str(database).strip().lower()
+    if database in id_prefixes:
+        return database + ':' + value
+    return value
+
+
+def _split(cell, sep='|'):
+    cell = str(cell).strip().strip('"')
+    return [x.strip() for x in cell.split(sep) if x.strip() and x.strip().lower() != 'nan'] if cell else []
+
+
+def read_source(file_name):
+    """
+    Reads a synonym/ID cross-reference dump, recognized by its columns:
+    HGNC complete set (hgnc_id, symbol, alias_symbol, prev_symbol, uniprot_ids),
+    UniProt (Entry, Gene Names, and optionally Entry Name),
+    ChEBI compounds (ID or CHEBI_ACCESSION, NAME), or ChEBI names (COMPOUND_ID, NAME)
+
+    Parameters
+    ----------
+    file_name : str
+        Tab-separated file
+
+    Returns
+    -------
+    entries : list
+        (record, primary keys, alias keys) tuples; a record is a (symbol, name, database, id) tuple,
+        primary keys are identifiers and official symbols, alias keys are synonyms
+    """
+    df = pd.read_csv(file_name, sep='\t', dtype=str, keep_default_na=False, quoting=3)
+    cols = set(df.columns)
+    entries = []
+    if {'hgnc_id', 'symbol'} <= cols:
+        for row in df.to_dict('records'):
+            uniprot = _split(row.get('uniprot_ids', ''))
+            hgnc_id = normalize_key(row['hgnc_id'], 'hgnc')
+            # Model elements are identified by UniProt accessions
+            record = (row['symbol'], '', 'uniprot', uniprot[0]) if uniprot else \
+                (row['symbol'], '', 'hgnc', hgnc_id.split(':', 1)[1])
+            primary = [hgnc_id, row['symbol']] + ['uniprot:' + acc for acc in uniprot]
+            aliases = _split(row.get('alias_symbol', '')) + _split(row.get('prev_symbol', ''))
+            entries.append((record, primary, aliases))
+    elif {'Entry', 'Gene Names'} <= cols:
+        for row in df.to_dict('records'):
+            genes = _split(row['Gene Names'], ' ')
+            record = (genes[0] if genes else '', '', 'uniprot', row['Entry'])
+            entries.append((record, ['uniprot:' + row['Entry']], genes + _split(row.get('Entry Name', ''))))
+    elif {'COMPOUND_ID', 'NAME'} <= cols:
+        for row in df.to_dict('records'):
+            chebi_id = normalize_key(row['COMPOUND_ID'], 'chebi').split(':', 1)[1]
+            entries.append((('', row['NAME'], 'chebi', chebi_id), ['chebi:' + chebi_id], [row['NAME']]))
+    elif 'NAME' in cols and ({'ID', 'CHEBI_ACCESSION'} & cols):
+        id_col = 'CHEBI_ACCESSION' if 'CHEBI_ACCESSION' in cols else 'ID'
+        for row in df.to_dict('records'):
+            chebi_id = normalize_key(row[id_col], 'chebi').split(':', 1)[1]
+            entries.append((('', row['NAME'], 'chebi', chebi_id), ['chebi:' + chebi_id], [row['NAME']]))
+    else:
+        raise ValueError('Unrecognized synonym file: ' + str(file_name) + '\n' +
+                         'Accepted files are HGNC, UniProt, and ChEBI tab-separated dumps')
+    return entries
+
+
+def build_synonyms(sources, path):
+    """
+    Compiles synonym/ID dumps (see read_source) into the hash table of a SynonymTable.
+    Identifiers and official symbols map to their record, the first source listing them wins;
+    synonyms map to their record unless they are an identifier or official symbol of another record,
+    and ambiguous synonyms (of records with different symbols) are left out.
+    Records with the same database and ID are merged, the first non-empty symbol and name are kept
+
+    Parameters
+    ----------
+    sources : list
+        Filenames of the dumps, in order of priority
+    path : str
+        Directory of the table
+
+    Returns
+    -------
+    table : SynonymTable
+    """
+    records, primary, aliases = {}, {}, {}
+    for file_name in sources:
+        for (symbol, name, database, id_), keys, synonyms in read_source(file_name):
+            rid = (database, id_.lower())
+            if rid not in records:
+                records[rid] = [symbol, name]
+            else:
+                records[rid] = [records[rid][0] or symbol, records[rid][1] or name]
+            for key in keys:
+                primary.setdefault(normalize_key(key), rid)
+            for key in synonyms:
+                aliases.setdefault(normalize_key(key), []).append(rid)
+
+    rids = list(records)
+    number = {rid: n for n, rid in enumerate(rids)}
+    mapping = {key: number[rid] for key, rid in primary.items() if key}
+    for key, candidates in aliases.items():
+        if key and key not in mapping and len(set(records[rid][0] or rid for rid in candidates)) == 1:
+            mapping[key] = number[candidates[0]]
+
+    # Open addressing with linear probing, at most half full; each slot keeps the key number, so that keys
+    # with the same hash are told apart
+    size = 1 << max(4, (2*len(mapping)).bit_length())
+    slot_hash = np.zeros(size, dtype=np.uint64)
+    slot_record = np.full(size, -1, dtype=np.int32)
+    slot_key = np.full(size, -1, dtype=np.int32)
+    for k, (key, record) in enumerate(mapping.items()):
+        h = _hash(key)
+        slot = h & (size - 1)
+        while slot_hash[slot] != 0:
+            slot = (slot + 1) & (size - 1)
+        slot_hash[slot] = h
+        slot_record[slot] = record
+        slot_key[slot] = k
+
+    # Record fields and keys, as UTF-8 buffers with the offsets of each string
+    strings, offsets = _string_table([str(s).lower() for rid in rids for s in records[rid] + list(rid)])
+    keys, key_offsets = _string_table(list(mapping))
+    os.makedirs(path, exist_ok=True)
+    arrays = {'slot_hash': slot_hash, 'slot_record': slot_record, 'slot_key': slot_key, 'offsets': offsets,
+              'strings': strings, 'key_offsets': key_offsets, 'keys': keys}
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), array)
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'records': len(rids), 'keys': len(mapping), 'sources': [os.path.basename(s) for s in sources]}, f)
+    return SynonymTable(path)
+
+
+class SynonymTable:
+    """
+    Read-only hash table compiled by build_synonyms, from entity keys (see normalize_key) to canonical records.
+    The arrays are memory-mapped, so worker processes share the same pages; a pickled table only holds its path
+
+    Parameters
+    ----------
+    path : str
+        Directory of the table
+
+    Examples
+    --------
+    >>> synonyms = SynonymTable('synonyms/')
+    >>> synonyms.lookup('hgnc:1097')       # {'symbol': 'braf', 'name': '', 'database': 'uniprot', 'id': 'p15056'}
+    >>> reading_df = preprocessing_reading('reading.xlsx', synonyms=synonyms)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if not os.path.exists(os.path.join(path, 'slot_key.npy')):
+            raise ValueError('The synonym table in ' + str(path) + ' has no keys, it must be built again '
+                             'with build_synonyms')
+        self.arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+                       for name in ['slot_hash', 'slot_record', 'slot_key', 'offsets', 'strings',
+                                    'key_offsets', 'keys']}
+        self._mask = len(self.arrays['slot_hash']) - 1
+        self._cache = {}
+
+    def __len__(self):
+        return self.meta['keys']
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def _field(self, n):
+        offsets = self.arrays['offsets']
+        return bytes(self.arrays['strings'][offsets[n]:offsets[n + 1]]).decode()
+
+    def _key(self, k):
+        offsets = self.arrays['key_offsets']
+        return bytes(self.arrays['keys'][offsets[k]:offsets[k + 1]])
+
+    def lookup(self, key):
+        """
+        Canonical record of a key
+
+        Parameters
+        ----------
+        key : str
+            Normalized key (see normalize_key)
+
+        Returns
+        -------
+        record : dict
+            symbol, name, database, and id of the record ('' when unknown), None if the key is not in the table
+        """
+        if key in self._cache:
+            return self._cache[key]
+        record = None
+        if key:
+            h = _hash(key)
+            encoded = key.encode()
+            slot_hash, slot = self.arrays['slot_hash'], h & self._mask
+            while slot_hash[slot] != 0:
+                # The hash only selects candidate slots, the key itself must match
+                if slot_hash[slot] == h and self._key(int(self.arrays['slot_key'][slot])) == encoded:
+                    n = int(self.arrays['slot_record'][slot])
+                    record = {field: self._field(4*n + i) for i, field in enumerate(record_fields)}
+                    break
+                slot = (slot + 1) & self._mask
+        self._cache[key] = record
+        return record
+
+    def resolve(self, name='nan', symbol='nan', database='nan', id_='nan'):
+        """
+        Canonical record of a reading element, looked up by its identifier, then HGNC symbol, then name
+
+        Parameters
+        ----------
+        name, symbol, database, id_ : str
+            Name, HGNC symbol, database, and ID of the element
+
+        Returns
+        -------
+        record : dict
+            See lookup(), None if the element is not in the table
+        """
+        for key in [normalize_key(id_, database), normalize_key(symbol, 'nan'), normalize_key(name, 'nan')]:
+            record = self.lookup(key)
+            if record is not None:
+                return record
+        return None
+
+
+def canonicalize_reading(reading_df, synonyms):
+    """
+    Canonicalizes the regulator and regulated elements of a reading: the HGNC Symbol, Database, and ID of an element
+    found in the synonym table are replaced by those of its record, and a missing Name is filled with the record name.
+    Each distinct element is looked up once
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        Machine reading output in BioRECIPE format
+    synonyms : SynonymTable or str
+        The synonym table, or its directory
+
+    Returns
+    -------
+    reading_df : pd.DataFrame
+        Canonicalized copy of the reading; the number of canonicalized elements is kept in attrs['grounded']
+    """
+    if not isinstance(synonyms, SynonymTable):
+        synonyms = SynonymTable(synonyms)
+    reading_df = reading_df.copy()
+    grounded = 0
+    for role in ['Regulator', 'Regulated']:
+        cols = {field: role + ' ' + col for field, col in
+                [('name', 'Name'), ('symbol', 'HGNC Symbol'), ('database', 'Database'), ('id', 'ID')]}
+        present = {field: col for field, col in cols.items() if col in reading_df.columns}
+        values = pd.DataFrame({field: reading_df[col].astype(str) if field in present else 'nan'
+                               for field, col in cols.items()}, index=reading_df.index)
+        # Identifiers with a prefix, such as 'HGNC:3373', also come in a separate column
+        if role + ' HGNC ID' in reading_df.columns:
+            hgnc_id = reading_df[role + ' HGNC ID'].astype(str)
+            missing = values['id'].str.lower().isin(['nan', ''])
+            values.loc[missing, 'id'] = hgnc_id[missing]
+        resolved = {}
+        for key in values.drop_duplicates().itertuples(index=False):
+            resolved[tuple(key)] = synonyms.resolve(key.name, key.symbol, key.database, key.id)
+        records = [resolved[tuple(key)] for key in values.itertuples(index=False)]
+        found = np.array([record is not None for record in records], dtype=bool)
+        grounded += int(found.sum())
+        if not found.any():
+            continue
+        for field, col in present.items():
+            new = [record[field] if record is not None else None for record in records]
+            old = reading_df[col].astype(str)
+            if field == 'name':
+                # Names are kept, only missing names are filled
+                keep = ~old.str.lower().isin(['nan', '']) | pd.Series([not v for v in new], index=reading_df.index)
+            else:
+                keep = pd.Series([not v for v in new], index=reading_df.index)
+            reading_df[col] = old.where(keep, pd.Series(new, index=reading_df.index))
+    reading_df.attrs['grounded'] = grounded
+    return reading_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile HGNC, UniProt, and ChEBI dumps into a VIOLIN synonym table')
+    parser.add_argument('path', type=str, help='directory of the synonym table')
+    parser.add_argument('sources', type=str, nargs='+',
+                        help='tab-separated HGNC, UniProt, or ChEBI dumps, in order of priority')
+    args = parser.parse_args()
+    table = build_synonyms(args.sources, args.path)
+    print('{} keys, {} records'.format(len(table), table.meta['records']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+histogram.py
+
+Handles the score histograms of a scoring run: the number of LEEs per Kind Score, Evidence Score, Match Score, and
+Total Score, accumulated while scoring, from which visualize_violin plots in time independent of the number of LEEs
+Created October 2026 - MeLoDy Lab
+"""
+
+import json
+
+import pandas as pd
+
+from violin.progress import categories
+
+# Score columns of a histogram bin, after the Kind Score
+bin_cols = ['Kind Score', 'Evidence Score', 'Match Score', 'Total Score']
+
+
+def _number(value):
+    # Scores as they are read back from the output files
+    try:
+        value = float(value)
+    except ValueError:
+        return value
+    return int(value) if value.is_integer() else value
+
+
+def _kind_order(kind):
+    # Kind Scores in numeric order, any non-numeric Kind Score after them
+    return (0, kind, '') if isinstance(kind, (int, float)) else (1, 0, str(kind))
+
+
+class ScoreHistogram:
+    """
+    Number of scored LEEs per (Kind Score, Evidence Score, Match Score, Total Score) bin.
+    A histogram is updated chunk by chunk (see scoring.score_reading), or built from a scored reading dataframe
+    or output file, and holds one count per distinct combination of scores
+
+    Parameters
+    ----------
+    counts : dict
+        (Kind Score, Evidence Score, Match Score, Total Score) -> number of LEEs
+        Default is None (empty histogram)
+    """
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts) if counts is not None else {}
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def update(self, scored_reading_df):
+        """
+        Adds scored LEEs
+
+        Parameters
+        ----------
+        scored_reading_df : pd.DataFrame
+            Scored LEEs, with the Kind, Evidence, Match, and Total Score columns
+        """
+        if scored_reading_df.shape[0] == 0:
+            return
+        scores = scored_reading_df[bin_cols].astype(str)
+        for key, count in scores.groupby(bin_cols, sort=False).size().items():
+            key = tuple(_number(value) for value in key)
+            self.counts[key] = self.counts.get(key, 0) + int(count)
+
+    @classmethod
+    def from_scored(cls, scored_reading_df):
+        """Histogram of a scored reading dataframe or an output file read back"""
+        histogram = cls()
+        histogram.update(scored_reading_df)
+        return histogram
+
+    def merge(self, other):
+        """Adds the counts of another histogram, in place"""
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def kinds(self, kind_values, category):
+        """
+        Histogram of the LEEs of a category
+
+        Parameters
+        ----------
+        kind_values : dict
+            Dictionary assigning Kind Score values
+        category : str
+            'corroborations', 'extensions', 'contradictions', or 'flagged'
+
+        Returns
+        -------
+        histogram : ScoreHistogram
+        """
+        values = set(kind_values[kind] for kind in categories[category] if kind in kind_values)
+        return ScoreHistogram({key: count for key, count in self.counts.items() if key[0] in values})
+
+    def select(self, values):
+        """Histogram of the LEEs whose Kind Score is in values"""
+        values = set(values)
+        return ScoreHistogram({key: count for key, count in self.counts.items() if key[0] in values})
+
+    def filter(self, filter_type, filter_value):
+        """
+        Histogram of the LEEs kept by a filtering option, as visualize_violin.visualize filters the output
+
+        Parameters
+        ----------
+        filter_type, filter_value :
+            Parsed filtering option, see scoring.parse_filter_opt: the top filter_value fraction of the LEEs
+            by Total Score ('%'), or a minimum Total Score ('St') or Evidence Score ('Se').
+            The histogram has no reading order, so for '%' the LEEs tied at the cut are kept by increasing
+            (numeric) Kind Score, Evidence Score, then Match Score; this is by design, and the kept LEEs can
+            differ from the first rows of the output files, where ties are kept in reading order
+
+        Returns
+        -------
+        histogram : ScoreHistogram
+        """
+        if filter_type == 'St':
+            return ScoreHistogram({key: count for key, count in self.counts.items() if key[3] >= filter_value})
+        if filter_type == 'Se':
+            return ScoreHistogram({key: count for key, count in self.counts.items() if key[1] >= filter_value})
+        remaining = int(len(self)*filter_value)
+        kept = {}
+        for key in sorted(self.counts, key=lambda key: (-key[3], _kind_order(key[0]), key[1], key[2])):
+            if remaining <= 0:
+                break
+            kept[key] = min(self.counts[key], remaining)
+            remaining -= kept[key]
+        return ScoreHistogram(kept)
+
+    def score_counts(self, col):
+        """
+        Number of LEEs per value of a score
+
+        Parameters
+        ----------
+        col : str
+            'Kind Score', 'Evidence Score', 'Match Score', or 'Total Score'
+
+        Returns
+        -------
+        counts : pd.Series
+            Number of LEEs indexed by score value, in increasing order
+        """
+        position = bin_cols.index(col)
+        counts = {}
+        for key, count in self.counts.items():
+            counts[key[position]] = counts.get(key[position], 0) + count
+        return pd.Series(counts, dtype='int64').sort_index() if counts else pd.Series(dtype='int64')
+
+    def save(self, file_name):
+        """Writes the histogram to a JSON file"""
+        with open(file_name, 'w') as f:
+            json.dump({'columns': bin_cols, 'bins': [list(key) + [count] for key, count in self.counts.items()]}, f)
+
+    @classmethod
+    def load(cls, file_name):
+        """Reads a histogram written by save"""
+        with open(file_name) as f:
+            bins = json.load(f)['bins']
+        return cls({tuple(row[:-1]): row[-1] for row in bins})
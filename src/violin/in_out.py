@@ -7,13 +7,23 @@ Created November 2019 - Casey Hansen MeLoDy Lab
 
 import pandas as pd
 import os.path
+import shutil
 import numpy as np
 import warnings
-from violin.formatting import add_regulator_names_id, evidence_score, get_element, format_variable_names, wrap_list_to_str, get_listname
+from violin.formatting import add_regulator_names_id, evidence_score, get_element, format_variable_names, wrap_list_to_str, get_listname, rule_regulator_lists
 from violin.network import node_edge_list
+from violin.xlsx import read_excel
+from violin.grounding import canonicalize_reading
+from violin.progress import category_values
 import warnings
 import re
 
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+
 # Default Kind Score values
 kind_dict = {"strong corroboration": 2,
              "empty attribute": 1,
@@ -51,13 +61,48 @@ BioRECIPE_reading_col = ["Regulator Name", "Regulator Type", "Regulator Subtype"
                         "Sign", "Connection Type", "Mechanism", "Site",
                         "Cell Line", "Cell Type", "Tissue Type", "Organism",
                         "Score", "Source", "Statements", "Paper IDs"]
+
+# Reading columns holding one value per merged LEE (see formatting.evidence_score)
+list_cols = ['Score', 'Source', 'Statements', 'Paper IDs']
+
+score_cols = ['Evidence Score', 'Match Score', 'Kind Score', 'Epistemic Value', 'Total Score']
+def read_table(table):
+    """
+    This function uploads a model or reading file as a dataframe, based on the file extension.
+    .xlsx files are read with xlsx.read_excel (cached columnar copy, or calamine when available).
+    Tables already in memory (dataframes, or Arrow tables) are copied instead of read
+
+    Parameters
+    ----------
+    table : str, pd.DataFrame, or pyarrow.Table
+        Directory and filename of the file (.txt, .csv, .tsv, .xlsx, .parquet), or the table itself
+
+    Returns
+    -------
+    table_df : pd.DataFrame
+        Table with a default index, and the missing values filled as 'nan'
+    """
+    if isinstance(table, pd.DataFrame): return table.reset_index(drop=True).fillna('nan')
+    # Arrow tables (and other tables convertible to pandas)
+    elif hasattr(table, 'to_pandas'): return table.to_pandas().fillna('nan')
+
+    table_ext = os.path.splitext(table)[1]
+    if table_ext == '.txt': table_df = pd.read_csv(table, sep='\t', index_col=None)
+    elif table_ext == '.csv': table_df = pd.read_csv(table, sep=',', index_col=None)
+    elif table_ext == '.xlsx': table_df = read_excel(table)
+    elif table_ext == '.tsv': table_df = pd.read_csv(table, sep='\t', index_col=None)
+    elif table_ext == '.parquet': table_df = pd.read_parquet(table)
+    else: raise ValueError("The accepted file extensions are .txt, .csv, .xlsx, .tsv, and .parquet")
+    return table_df.fillna('nan')
+
+
 def preprocessing_model(model, model_cols=model_columns):
     """
     This function check if your model is correct or necessary columns are missing or not
     Parameters
     ----------
-    model : str
-        model filename
+    model : str, pd.DataFrame, or pyarrow.Table
+        model filename (.txt, .csv, .tsv, .xlsx), or the model table in BioRECIPE format
     model_cols : list
         A list of model column names
     Returns
@@ -65,47 +110,18 @@ def preprocessing_model(model, model_cols=model_columns):
     new_model : pd.DataFrame
         Formatted model dataframe
     """
-    # Upload the model and reading files as dataframes based on the file extension
-    model_ext = os.path.splitext(model)[1]
-
-    if model_ext == '.txt': model_df = pd.read_csv(model, sep='\t', index_col=None).fillna("nan")
-    elif model_ext == '.csv': model_df = pd.read_csv(model, sep=',', index_col=None).fillna("nan")
-    elif model_ext == '.xlsx': model_df = pd.read_excel(model, index_col=None).fillna("nan")
-    elif model_ext == '.tsv': model_df = pd.read_csv(model, sep='\t',index_col=None).fillna("nan")
-    else: raise ValueError("The accepted file extensions are .txt, .csv, .xslx, and .tsv")
+    # Upload the model file (or take the model table) as a dataframe
+    model_df = read_table(model)
 
-    model_index = model_df.index
     model_df = format_variable_names(model_df)
 
     if {(set(model_cols).issubset(set(model_df.columns))) and
         (set(required_model).issubset(set(model_cols)))}:
 
-    # FIXME: this block for getting list from regulation rule will be deprecated
-
-    #     # Check if the model has the regulator information
-    #     pos_regulator = all(x in ['', 'Nan', 'nan'] for x in model_df['Positive Regulator List'])
-    #     neg_regulator = all(x in ['', 'Nan', 'nan'] for x in model_df['Negative Regulator List'])
-    #     pos_regulation = all(x in ['', 'Nan', 'nan'] for x in model_df[f'Positive Regulation Rule'])
-    #     neg_regulation = all(x in ['', 'Nan', 'nan'] for x in model_df[f'Negative Regulation Rule'])
-    #
-    #     if (pos_regulator and pos_regulation and neg_regulator and neg_regulation):
-    #         raise ValueError(
-    #             "The regulation rule and list columns are both empty, please fill at least one column out")
-    #     elif (not pos_regulator) or (not neg_regulator):
-    #         pass
-    #     # Get regulator list from regulation rule if regulator list is empty
-    #     else:
-    #         for row in range(len(model_df)):
-    #             index = model_index[row]
-    #             for sign in ['Positive', 'Negative']:
-    #                 if model_df.loc[index, f'{sign} Regulation Rule'] == '':
-    #                     model_df.loc[index, f'{sign} Regulator List'] = ''
-    #                 else:
-    #                     model_df.loc[index, f'{sign} Regulator List'] = ','.join(
-    #                         list(get_element(model_df.loc[index, f'{sign} Regulation Rule'], 0)))
-
         # Create a column for list-name
         model_df['Listname'] = [get_listname(idx, model_df) for idx in range(len(model_df))]
+        # Get the regulator lists from the regulation rules, if the model only has regulation rules
+        model_df = rule_regulator_lists(model_df)
         # Normalize element type
         model_df['Element Type'] = model_df['Element Type'].str.replace(' ', '')
         # Covert regulator variable name lists to common names
@@ -125,34 +141,55 @@ def preprocessing_model(model, model_cols=model_columns):
     return new_model
 
 
-def preprocessing_reading(reading, evidence_score_cols=evidence_score_def, atts=[]):
+def preprocessing_reading(reading, evidence_score_cols=evidence_score_def, atts=[], synonyms=None):
     """
     This function import the reading file and check if the reading format is correct
 
     Parameters
     ----------
-    reading : str
+    reading : str, pd.DataFrame, or pyarrow.Table
         Directory and filename of the machine reading spreadsheet output, in BioRECIPE format
         Accepted file: .txt, .csv, .tsv, .xlsx
+        or the machine reading table itself
     evidence_score_cols : list
         Column headings used to identify identical interactions in the machine reading output
     atts : list
         a List of additional attributes which are available in LEE output
         Default is none
+    synonyms : grounding.SynonymTable or str
+        Synonym table (or its directory) canonicalizing the LEE elements before duplicates are merged,
+        see grounding.canonicalize_reading
+        Default is None (no canonicalization)
+
+    Returns
+    -------
+    new_reading : pd.dataframe
+        formatted reading dataframe, including evidence count and list of PMCIDs
+    """
+    #Upload the reading file (or take the reading table) as a dataframe
+    reading_df = read_table(reading)
+    if synonyms is not None:
+        reading_df = canonicalize_reading(reading_df, synonyms)
+    return format_reading(reading_df, evidence_score_cols)
+
+
+def format_reading(reading_df, evidence_score_cols=evidence_score_def):
+    """
+    This function normalizes the element types and connection types of a reading dataframe,
+    and merges duplicate interactions into the Evidence Score
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        Machine reading output in BioRECIPE format, with missing values filled as 'nan'
+    evidence_score_cols : list
+        Column headings used to identify identical interactions in the machine reading output
 
     Returns
     -------
     new_reading : pd.dataframe
         formatted reading dataframe, including evidence count and list of PMCIDs
     """
-    #Upload the model and reading files as dataframes based on the file extension
-    reading_ext = os.path.splitext(reading)[1]
-
-    if reading_ext == '.txt': reading_df = pd.read_csv(reading, sep='\t',index_col=None).fillna('nan')
-    elif reading_ext == '.csv': reading_df = pd.read_csv(reading, sep=',',index_col=None).fillna('nan')
-    elif reading_ext == '.xlsx': reading_df = pd.read_excel(reading,index_col=None).fillna('nan')
-    elif reading_ext == '.tsv': reading_df = pd.read_csv(reading, sep='\t',index_col=None).fillna('nan')
-    else: raise ValueError("The accepted file extensions are .txt, .csv, .xlsx, and .tsv")
     reading_df = reading_df.astype(str)
     for row in range(len(reading_df)):
         reading_df.loc[row, 'Regulator Type'] = ''.join(re.findall(r'[A-z]+', reading_df.loc[row, 'Regulator Type'].lower())) \
@@ -174,7 +211,7 @@ def preprocessing_reading(reading, evidence_score_cols=evidence_score_def, atts=
     else: raise ValueError("The columns you chose for calculating the Evidence Score are not in youe LEE input file:"+str(evidence_score_cols))
     return new_reading
 
-def output(reading_df, file_name, kind_values=kind_dict):
+def output(reading_df, file_name, kind_values=kind_dict, output_format='csv'):
     """
     This function outputs the scored reading interactions.
     This writes output files, there are no return variables
@@ -188,16 +225,26 @@ def output(reading_df, file_name, kind_values=kind_dict):
     kind_values : dict
         Dictionary containing the numerical values for the Kind Score classifications
         Default values are found in kind_dict
+    output_format : str
+        'csv' (the output and score files of each category) or 'parquet' (a single dataset partitioned
+        by category, see output_parquet)
+        Default is 'csv'
     """
     global BioRECIPE_reading_col
 
+    if output_format == 'parquet':
+        output_parquet(reading_df, file_name, kind_values=kind_values)
+        return
+    elif output_format != 'csv':
+        raise ValueError("output_format must be 'csv' or 'parquet'")
+
     #reading_df.reset_index(inplace=True)
     reading_df = reading_df.replace('nan', '')
     reading_df = wrap_list_to_str(reading_df, ['Score', 'Source', 'Statements', 'Paper IDs'])
     reading_df[BioRECIPE_reading_col] = reading_df[BioRECIPE_reading_col].astype(str)
 
-    #Output with all reading interactions, sorted by highest Total Score
-    outputdf = reading_df.sort_values(by='Total Score', ascending=False)
+    #Output with all reading interactions, sorted by highest Total Score (ties in reading order, as in scoring.score_top)
+    outputdf = reading_df.sort_values(by='Total Score', ascending=False, kind='mergesort')
     outputdf.to_csv(f'{file_name}_outputDF.csv', index=False)
     output_file = file_name+'_scoreDF.csv'
     outputdf = outputdf[['Evidence Score', 'Match Score', 'Kind Score', 'Epistemic Value', 'Total Score']]
@@ -209,7 +256,7 @@ def output(reading_df, file_name, kind_values=kind_dict):
                       (reading_df['Kind Score'] == kind_values['indirect interaction']) |
                       (reading_df['Kind Score'] == kind_values['path corroboration']) |
                       (reading_df['Kind Score'] == kind_values['specification'])]
-    corr = corr.sort_values(by='Total Score', ascending=False).reset_index()
+    corr = corr.sort_values(by='Total Score', ascending=False, kind='mergesort').reset_index()
     corr.to_csv(f'{file_name}_corroborations.csv', index=False)
     output_file = file_name + '_corroborations_score.csv'
     corr = corr[['Evidence Score', 'Match Score', 'Kind Score', 'Epistemic Value', 'Total Score']]
@@ -219,7 +266,7 @@ def output(reading_df, file_name, kind_values=kind_dict):
     ext = reading_df[(reading_df['Kind Score'] == kind_values['hanging extension']) |
                      (reading_df['Kind Score'] == kind_values['full extension']) |
                      (reading_df['Kind Score'] == kind_values['internal extension'])]
-    ext = ext.sort_values(by='Total Score', ascending=False).reset_index()
+    ext = ext.sort_values(by='Total Score', ascending=False, kind='mergesort').reset_index()
     ext.to_csv(f'{file_name}_extensions.csv', index=False)
     output_file = file_name + '_extensions_score.csv'
     ext = ext[['Evidence Score', 'Match Score', 'Kind Score', 'Epistemic Value', 'Total Score']]
@@ -229,7 +276,7 @@ def output(reading_df, file_name, kind_values=kind_dict):
     cont = reading_df[(reading_df['Kind Score'] == kind_values['dir contradiction']) |
                       (reading_df['Kind Score'] == kind_values['sign contradiction']) |
                       (reading_df['Kind Score'] == kind_values['att contradiction'])]
-    cont = cont.sort_values(by='Total Score', ascending=False).reset_index()
+    cont = cont.sort_values(by='Total Score', ascending=False, kind='mergesort').reset_index()
     cont.to_csv(f'{file_name}_contradictions.csv', index=False)
     output_file = file_name + '_contradictions_score.csv'
     cont = cont[['Evidence Score', 'Match Score', 'Kind Score', 'Epistemic Value', 'Total Score']]
@@ -248,7 +295,7 @@ def output(reading_df, file_name, kind_values=kind_dict):
                         (reading_df['Kind Score'] == kind_values['path mismatch']) |
                         (reading_df['Kind Score'] == kind_values['self-regulation'])]
 
-    que = que.sort_values(by='Total Score', ascending=False).reset_index()
+    que = que.sort_values(by='Total Score', ascending=False, kind='mergesort').reset_index()
     que.to_csv(f'{file_name}_flagged.csv', index=False)
     output_file = file_name + '_flagged_score.csv'
     cont = cont[['Evidence Score', 'Match Score', 'Kind Score', 'Epistemic Value', 'Total Score']]
@@ -256,6 +303,110 @@ def output(reading_df, file_name, kind_values=kind_dict):
     return
 
 
+def output_parquet(reading_df, file_name, kind_values=kind_dict, compression='zstd'):
+    """
+    Writes the scored reading interactions as a Parquet dataset (file_name + '_output.parquet' directory),
+    partitioned by category (Category=corroborations, extensions, contradictions, flagged, or unclassified).
+    Paper IDs, Statements, Source, and Score are list columns instead of comma-joined strings.
+    The 'LEE' column is the row of the LEE in the scored reading dataframe and 'Output Row' its row in the
+    _outputDF.csv file (sorted by Total Score); see read_output
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        The scored reading dataframe
+    file_name : str
+        Directory and filename of the output suffix
+    kind_values : dict
+        Dictionary containing the numerical values for the Kind Score classifications
+        Default values are found in kind_dict
+    compression : str
+        Parquet compression codec
+        Default is 'zstd'
+
+    Returns
+    -------
+    path : str
+        Directory of the dataset
+    """
+    if pa is None:
+        raise ValueError('Parquet output requires pyarrow')
+
+    # Replaced before resetting the index, so that Total Score ties are sorted as in output
+    reading_df = reading_df.replace('nan', '').reset_index(drop=True)
+    out_df = pd.DataFrame({'LEE': np.arange(reading_df.shape[0])})
+    output_row = np.empty(reading_df.shape[0], dtype=np.int64)
+    order = reading_df[['Total Score']].sort_values(by='Total Score', ascending=False, kind='mergesort')
+    output_row[order.index] = np.arange(reading_df.shape[0])
+    out_df['Output Row'] = output_row
+    for col in reading_df.columns:
+        if col in list_cols:
+            out_df[col] = [[str(value) for value in values] if isinstance(values, (list, tuple, np.ndarray))
+                           else [str(values)] if values != '' else [] for values in reading_df[col]]
+        elif col in score_cols:
+            out_df[col] = pd.to_numeric(reading_df[col])
+        elif reading_df[col].dtype == object:
+            out_df[col] = reading_df[col].astype(str)
+        else:
+            out_df[col] = reading_df[col]
+    value_category = category_values(kind_values)
+    out_df['Category'] = [value_category.get(kind, 'unclassified') for kind in reading_df['Kind Score']]
+
+    path = file_name + '_output.parquet'
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    table = pa.Table.from_pandas(out_df.sort_values(by='Output Row'), preserve_index=False)
+    ds.write_dataset(table, path, format='parquet', partitioning=['Category'], partitioning_flavor='hive',
+                     file_options=ds.ParquetFileFormat().make_write_options(compression=compression))
+    return path
+
+
+def read_output(file_name, columns=None, category=None, lees=None):
+    """
+    Reads a Parquet dataset written by output_parquet, only loading the requested columns and partitions
+
+    Parameters
+    ----------
+    file_name : str
+        Directory of the dataset
+    columns : list
+        Columns to read
+        Default is None (all columns)
+    category : str or list
+        Categories to read ('corroborations', 'extensions', 'contradictions', 'flagged', or 'unclassified')
+        Default is None (all categories)
+    lees : array-like
+        LEE ids (rows of the scored reading dataframe) to read
+        Default is None (all LEEs)
+
+    Returns
+    -------
+    output_df : pd.DataFrame
+        The LEEs sorted as in the _outputDF.csv file (by Total Score), with lists in the list columns
+    """
+    if pa is None:
+        raise ValueError('Parquet output requires pyarrow')
+
+    dataset = ds.dataset(file_name, format='parquet', partitioning='hive')
+    expression = None
+    if category is not None:
+        expression = ds.field('Category').isin([category] if isinstance(category, str) else list(category))
+    if lees is not None:
+        selected = ds.field('LEE').isin([int(lee) for lee in lees])
+        expression = selected if expression is None else expression & selected
+    read_cols = None if columns is None else list(dict.fromkeys(list(columns) + ['Output Row']))
+    output_df = dataset.to_table(columns=read_cols, filter=expression).to_pandas()
+    output_df = output_df.sort_values(by='Output Row').reset_index(drop=True)
+    for col in output_df.columns:
+        if col in list_cols:
+            output_df[col] = [list(values) for values in output_df[col]]
+        elif col == 'Category':
+            output_df[col] = output_df[col].astype(str)
+    if columns is not None:
+        output_df = output_df[list(columns)]
+    return output_df
+
+
 # FIXME: This function will be deprecated
 # def violin_to_biorecipe(VIOLIN_reading=None, VIOLIN_reading_df=None):
 #     # FIXME: problematic right now, the classified output of VIOLIN is hard to be translated
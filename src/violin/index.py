@@ -0,0 +1,281 @@
+"""
+index.py
+
+Handles the inverted index from model elements to the scored LEEs which involve them, so that model-centric queries
+(e.g. all contradictions involving MAPK1) are answered without loading the whole output
+Created October 2026 - MeLoDy Lab
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from violin.numeric import find_element
+from violin.in_out import read_output
+from violin.progress import categories, category_values
+
+# Category codes stored in the index, -1 for LEEs without a category
+category_names = list(categories)
+
+# Priority of the element searches, as in scoring.kind_score
+_searches = [('hgnc', ' HGNC Symbol'), ('name', ' Name'), ('id', ' ID')]
+
+
+def lee_elements(reading_df, model_df, embedding_match=False):
+    """
+    Finds the model rows matching the regulator and the regulated element of each LEE,
+    searching by HGNC symbol, then name, then ID, as scoring.kind_score does
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        The (scored) reading dataframe
+    model_df : pd.DataFrame
+        The model dataframe
+    embedding_match : bool or embedding.EntityIndex
+        Passed to numeric.find_element
+        Default is False
+
+    Returns
+    -------
+    regulators, regulated : list
+        Model rows of the regulator (and regulated element) of each LEE; empty lists when not found
+    """
+    cache = {}
+
+    def rows(role, x):
+        key = tuple(reading_df.at[x, role + col] for _, col in _searches) + (reading_df.at[x, role + ' Type'],)
+        if key not in cache:
+            found = -1
+            for (search_type, _), value in zip(_searches, key):
+                found = find_element(search_type, value, key[-1], model_df, embedding_match)
+                if found != -1:
+                    break
+            cache[key] = found if found != -1 else []
+        return cache[key]
+
+    index = list(reading_df.index)
+    return [rows('Regulator', x) for x in index], [rows('Regulated', x) for x in index]
+
+
+def _postings(lee_rows, n_model):
+    # CSR arrays: LEEs of model row i are lees[ptr[i]:ptr[i+1]], in increasing order
+    model_rows = np.fromiter((r for rows in lee_rows for r in rows), dtype=np.int64)
+    lees = np.fromiter((x for x, rows in enumerate(lee_rows) for _ in rows), dtype=np.int64)
+    order = np.argsort(model_rows, kind='stable')
+    ptr = np.zeros(n_model + 1, dtype=np.int64)
+    np.cumsum(np.bincount(model_rows, minlength=n_model), out=ptr[1:])
+    return ptr, lees[order].astype(np.int32)
+
+
+def build_index(scored_reading_df, model_df, path, kind_values, embedding_match=False):
+    """
+    Writes the inverted index of a scored reading: for each model row, the LEEs whose regulator
+    (or regulated element) matches it, with the category and Total Score of each LEE
+
+    Parameters
+    ----------
+    scored_reading_df : pd.DataFrame
+        The scored reading dataframe (see scoring.score_reading); LEE ids are its row positions
+    model_df : pd.DataFrame
+        The model dataframe
+    path : str
+        Directory of the index
+    kind_values : dict
+        Dictionary assigning Kind Score values, used for the categories
+    embedding_match : bool or embedding.EntityIndex
+        Passed to numeric.find_element
+        Default is False
+
+    Returns
+    -------
+    index : ViolinIndex
+    """
+    os.makedirs(path, exist_ok=True)
+    n = scored_reading_df.shape[0]
+    n_model = model_df.shape[0]
+    scored = scored_reading_df.reset_index(drop=True)
+    regulators, regulated = lee_elements(scored, model_df, embedding_match)
+
+    codes = {name: code for code, name in enumerate(category_names)}
+    value_category = category_values(kind_values)
+    category = np.array([codes.get(value_category.get(kind), -1) for kind in scored['Kind Score']], dtype=np.int8)
+    # Row of each LEE in the _outputDF.csv file, sorted by Total Score as in in_out.output
+    output_row = np.empty(n, dtype=np.int64)
+    order = scored[['Total Score']].replace('nan', '').sort_values(by='Total Score', ascending=False, kind='mergesort')
+    output_row[order.index] = np.arange(n)
+
+    arrays = {'category': category,
+              'total_score': scored['Total Score'].astype(float).values,
+              'output_row': output_row}
+    for role, lee_rows in [('regulator', regulators), ('regulated', regulated)]:
+        arrays[role + '_ptr'], arrays[role + '_lees'] = _postings(lee_rows, n_model)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), array)
+
+    meta = {'n_lees': n,
+            'categories': category_names,
+            'elements': {col: model_df[col].astype(str).str.lower().tolist()
+                         for col in ['Listname', 'Element Name', 'Element HGNC Symbol', 'Variable']
+                         if col in model_df.columns}}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return ViolinIndex(path)
+
+
+class ViolinIndex:
+    """
+    Queries an index written by build_index. The arrays are memory-mapped, so only the postings
+    of the queried elements are read
+
+    Parameters
+    ----------
+    path : str
+        Directory of the index
+
+    Examples
+    --------
+    >>> index = ViolinIndex('output/RA2_index')
+    >>> index.lees('mapk1', category='contradictions')    # LEE ids
+    >>> index.edge('braf', 'mapk1')                       # LEEs from BRAF to MAPK1
+    >>> index.summary(index.lees('mapk1'))                # category, Total Score, and output row of the LEEs
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.arrays = {name[:-4]: np.load(os.path.join(path, name), mmap_mode='r')
+                       for name in os.listdir(path) if name.endswith('.npy')}
+        self._lookup = {}
+        for names in self.meta['elements'].values():
+            for row, name in enumerate(names):
+                # HGNC symbols of a family or complex are comma-separated
+                for key in set([name] + [x.strip() for x in name.split(',')]):
+                    self._lookup.setdefault(key, set()).add(row)
+
+    def rows(self, element):
+        """
+        Model rows of an element
+
+        Parameters
+        ----------
+        element : str or int
+            Element name, HGNC symbol, list-name, or variable name (case-insensitive), or a model row
+
+        Returns
+        -------
+        rows : list
+        """
+        if isinstance(element, (int, np.integer)):
+            return [int(element)]
+        return sorted(self._lookup.get(str(element).lower(), []))
+
+    def _role_lees(self, rows, role):
+        ptr, lees = self.arrays[role + '_ptr'], self.arrays[role + '_lees']
+        found = [lees[ptr[row]:ptr[row + 1]] for row in rows]
+        return np.unique(np.concatenate(found)) if found else np.array([], dtype=np.int32)
+
+    def _filter(self, lees, category):
+        if category is None:
+            return lees
+        if category not in category_names:
+            raise ValueError("Unknown category: {}, options are: {}".format(category, ', '.join(category_names)))
+        return lees[self.arrays['category'][lees] == category_names.index(category)]
+
+    def lees(self, element, role='any', category=None):
+        """
+        LEEs involving an element
+
+        Parameters
+        ----------
+        element : str or int
+            See rows()
+        role : str
+            'regulator', 'regulated', or 'any'
+            Default is 'any'
+        category : str
+            Only LEEs of this category ('corroborations', 'extensions', 'contradictions', or 'flagged')
+            Default is None (all categories)
+
+        Returns
+        -------
+        lees : np.ndarray
+            LEE ids (rows of the scored reading dataframe), in increasing order
+        """
+        rows = self.rows(element)
+        if role == 'any':
+            lees = np.union1d(self._role_lees(rows, 'regulator'), self._role_lees(rows, 'regulated'))
+        elif role in ['regulator', 'regulated']:
+            lees = self._role_lees(rows, role)
+        else:
+            raise ValueError("role must be 'regulator', 'regulated', or 'any'")
+        return self._filter(lees, category)
+
+    def edge(self, regulator, regulated, category=None):
+        """
+        LEEs from one element to another
+
+        Parameters
+        ----------
+        regulator, regulated : str or int
+            See rows()
+        category : str
+            Only LEEs of this category
+            Default is None (all categories)
+
+        Returns
+        -------
+        lees : np.ndarray
+            LEE ids, in increasing order
+        """
+        lees = np.intersect1d(self._role_lees(self.rows(regulator), 'regulator'),
+                              self._role_lees(self.rows(regulated), 'regulated'))
+        return self._filter(lees, category)
+
+    def summary(self, lees):
+        """
+        Category, Total Score, and row in the _outputDF.csv file of LEEs
+
+        Parameters
+        ----------
+        lees : array-like
+            LEE ids
+
+        Returns
+        -------
+        summary_df : pd.DataFrame
+        """
+        lees = np.asarray(lees, dtype=np.int64)
+        codes = self.arrays['category'][lees]
+        return pd.DataFrame({'LEE': lees,
+                             'Category': [category_names[c] if c >= 0 else None for c in codes],
+                             'Total Score': self.arrays['total_score'][lees],
+                             'Output Row': self.arrays['output_row'][lees]})
+
+    def read_output(self, lees, file_name, columns=None):
+        """
+        Reads the rows of LEEs from an _outputDF.csv file, skipping all other rows,
+        or from a Parquet output dataset, reading only the row groups holding them
+
+        Parameters
+        ----------
+        lees : array-like
+            LEE ids
+        file_name : str
+            The _outputDF.csv file or _output.parquet dataset written by in_out.output with the indexed scored reading
+        columns : list
+            Columns to read
+            Default is None (all columns)
+
+        Returns
+        -------
+        output_df : pd.DataFrame
+            Rows of the LEEs, in the order of the output file
+        """
+        if os.path.isdir(file_name) or file_name.endswith('.parquet'):
+            return read_output(file_name, columns=columns, lees=lees)
+        keep = set(int(row) + 1 for row in self.arrays['output_row'][np.asarray(lees, dtype=np.int64)])
+        keep.add(0)
+        return pd.read_csv(file_name, index_col=None, usecols=columns, skiprows=lambda line: line not in keep)
@@ -0,0 +1,498 @@
+"""
+kernels.py
+
+Handles the accelerated Kind Score classification: the attribute comparisons, connection-type resolution, and priority
+reduction of scoring.kind_score run over all the (LEE, model pair) candidates of a batch of LEEs at once, on
+integer-coded arrays, in Numba kernels when numba is installed and in NumPy otherwise
+Created October 2026 - MeLoDy Lab
+"""
+
+import numpy as np
+
+from violin.numeric import find_element, get_attributes
+from violin.network import path_finding
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Kind labels checked by scoring.kind_score when an LEE matches several model pairs, in order of priority
+priority_labels = ['strong corroboration', 'empty attribute', 'indirect interaction', 'path corroboration',
+                   'specification', 'dir contradiction', 'sign contradiction', 'att contradiction',
+                   'hanging extension', 'internal extension', 'full extension',
+                   'dir mismatch', 'path mismatch', 'self-regulation']
+
+# Labels of the model pairs recorded in the counter
+corroboration_labels = ['strong corroboration', 'empty attribute', 'indirect interaction', 'specification']
+contradiction_labels = ['dir contradiction', 'sign contradiction', 'att contradiction']
+
+# Labels of the decision table (see pair_table), then the flagged labels of scheme '3'
+table_labels = priority_labels + ['flagged4', 'flagged5']
+
+# Relation of a (regulated, regulator) model pair to the LEE
+REL_SIGN, REL_OPP_SIGN, REL_REVERSED, REL_REVERSED_OPP, REL_NONE = range(5)
+
+# Connection type codes of the LEEs and the model interactions
+CXN_D, CXN_I, CXN_OTHER = range(3)
+
+# Rank of the pairs whose kind is not among priority_labels
+_no_rank = len(priority_labels)
+
+
+def _cxn_code(cxn_type):
+    return CXN_I if cxn_type == 'i' else CXN_D if cxn_type == 'd' else CXN_OTHER
+
+
+def pair_table(scheme):
+    """
+    Decision table of the kind of a model pair, as in scoring.kind_score
+
+    Parameters
+    ----------
+    scheme : str
+        The scheme of the classification ('1', '2', or '3')
+
+    Returns
+    -------
+    table : np.ndarray
+        Index in table_labels of the kind, by relation (REL_SIGN to REL_REVERSED_OPP), LEE connection type,
+        model connection type (CXN_D, CXN_I, CXN_OTHER), and attribute comparison (see compare_codes);
+        -1 when kind_score adds no kind for the pair
+    """
+    if scheme not in ['1', '2', '3']:
+        raise ValueError('Enter a right scheme number (1, 2, or 3).')
+    table = np.full((4, 3, 3, 4), -1, dtype=np.int8)
+    for lee in range(3):
+        for mi in range(3):
+            for outcome in range(4):
+                compatible = outcome in [0, 1, 2]
+                kinds = [None]*4
+                # Same direction, same sign
+                if (lee == CXN_I and mi == CXN_I) or (lee == CXN_D and mi != CXN_I):
+                    kinds[REL_SIGN] = ['strong corroboration', 'empty attribute', 'specification',
+                                       'att contradiction'][outcome]
+                elif lee == CXN_D and mi == CXN_I:
+                    kinds[REL_SIGN] = 'specification' if compatible else 'att contradiction'
+                elif lee == CXN_I and mi == CXN_D:
+                    kinds[REL_SIGN] = 'indirect interaction' if compatible else 'att contradiction'
+                # Same direction, opposite sign
+                if lee == CXN_I and mi != CXN_I and scheme == '3':
+                    kinds[REL_OPP_SIGN] = 'flagged5'
+                else:
+                    kinds[REL_OPP_SIGN] = 'sign contradiction'
+                # Opposite direction, same sign
+                if lee == CXN_I and mi == CXN_I:
+                    kinds[REL_REVERSED] = 'dir contradiction'
+                elif lee == CXN_D and mi != CXN_I:
+                    kinds[REL_REVERSED] = 'dir contradiction' if scheme == '3' or not compatible else 'dir mismatch'
+                elif lee == CXN_I and mi != CXN_I:
+                    if scheme == '3':
+                        kinds[REL_REVERSED] = 'dir contradiction' if compatible else 'flagged4'
+                    else:
+                        kinds[REL_REVERSED] = 'dir mismatch' if compatible else 'dir contradiction'
+                elif lee == CXN_D and mi == CXN_I:
+                    kinds[REL_REVERSED] = 'dir contradiction'
+                # Opposite direction, opposite sign
+                if lee == CXN_D and mi != CXN_I:
+                    if scheme == '3':
+                        kinds[REL_REVERSED_OPP] = 'dir contradiction' if compatible else 'dir mismatch'
+                    else:
+                        kinds[REL_REVERSED_OPP] = 'dir mismatch' if compatible else 'dir contradiction'
+                elif lee == CXN_D and mi == CXN_I:
+                    kinds[REL_REVERSED_OPP] = 'dir contradiction'
+                elif lee == CXN_I and mi != CXN_I:
+                    kinds[REL_REVERSED_OPP] = 'dir mismatch' if compatible else \
+                        'flagged5' if scheme == '3' else 'dir contradiction'
+                elif lee == CXN_I and mi == CXN_I:
+                    kinds[REL_REVERSED_OPP] = 'dir contradiction'
+                for rel, label in enumerate(kinds):
+                    if label is not None:
+                        table[rel, lee, mi, outcome] = table_labels.index(label)
+    return table
+
+
+def _compare_numpy(model, reading, groups):
+    outcomes = np.where(model == reading, 0, np.where(reading == 0, 1, np.where(model == 0, 2, 3)))
+    # A compartment matching by name or by ID matches
+    for group in [1, 2]:
+        cols = groups == group
+        if cols.any():
+            matched = (outcomes[:, cols] == 0).any(axis=1)
+            outcomes[:, cols] = np.where(matched[:, None], 0, outcomes[:, cols])
+    seen = np.bitwise_or.reduce(1 << outcomes, axis=1) if outcomes.shape[1] else np.zeros(len(outcomes), dtype=int)
+    return np.where(seen & 8, 3, np.where(seen == 1, 0, np.where((seen == 2) | (seen == 3), 1, 2))).astype(np.int8)
+
+
+def _compare_loop(model, reading, groups):
+    n, n_atts = model.shape
+    values = np.empty(n, dtype=np.int8)
+    outcomes = np.empty(n_atts, dtype=np.int64)
+    for row in range(n):
+        for a in range(n_atts):
+            if model[row, a] == reading[row, a]:
+                outcomes[a] = 0
+            elif reading[row, a] == 0:
+                outcomes[a] = 1
+            elif model[row, a] == 0:
+                outcomes[a] = 2
+            else:
+                outcomes[a] = 3
+        for group in range(1, 3):
+            matched = False
+            for a in range(n_atts):
+                if groups[a] == group and outcomes[a] == 0:
+                    matched = True
+            if matched:
+                for a in range(n_atts):
+                    if groups[a] == group:
+                        outcomes[a] = 0
+        seen = 0
+        for a in range(n_atts):
+            seen |= 1 << outcomes[a]
+        if seen & 8:
+            values[row] = 3
+        elif seen == 1:
+            values[row] = 0
+        elif seen == 2 or seen == 3:
+            values[row] = 1
+        else:
+            values[row] = 2
+    return values
+
+
+def _reduce_numpy(ranks, ptr):
+    segments = np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))
+    order = np.lexsort((np.arange(len(ranks)), ranks, segments))
+    first = order[ptr[:-1]]
+    return ranks[first], first - ptr[:-1]
+
+
+def _reduce_loop(ranks, ptr):
+    n = len(ptr) - 1
+    best = np.empty(n, dtype=ranks.dtype)
+    position = np.empty(n, dtype=np.int64)
+    for segment in range(n):
+        best[segment] = ranks[ptr[segment]]
+        position[segment] = 0
+        for i in range(ptr[segment] + 1, ptr[segment + 1]):
+            if ranks[i] < best[segment]:
+                best[segment] = ranks[i]
+                position[segment] = i - ptr[segment]
+    return best, position
+
+
+if numba is not None:
+    _compare_numba = numba.njit(cache=True, nogil=True)(_compare_loop)
+    _reduce_numba = numba.njit(cache=True, nogil=True)(_reduce_loop)
+
+
+def compare_codes(model, reading, groups, backend=None):
+    """
+    Attribute comparison of numeric.compare, for many (model, LEE) attribute sets at once
+
+    Parameters
+    ----------
+    model, reading : np.ndarray
+        Attribute codes (one row per comparison, one column per attribute), equal for equal values, 0 for 'nan'
+    groups : np.ndarray
+        Group of each attribute: 1 for the regulator compartment (name and ID), 2 for the regulated compartment,
+        0 otherwise
+    backend : str
+        'numba' or 'numpy'
+        Default is None ('numba' when numba is installed)
+
+    Returns
+    -------
+    values : np.ndarray
+        Comparison outcome of each row (0 to 3, see numeric.compare)
+    """
+    model = np.ascontiguousarray(model, dtype=np.int64)
+    reading = np.ascontiguousarray(reading, dtype=np.int64)
+    groups = np.ascontiguousarray(groups, dtype=np.int64)
+    if _backend(backend) == 'numba':
+        return _compare_numba(model, reading, groups)
+    return _compare_numpy(model, reading, groups)
+
+
+def reduce_kinds(ranks, ptr, backend=None):
+    """
+    Priority reduction of the kinds of the model pairs of each LEE
+
+    Parameters
+    ----------
+    ranks : np.ndarray
+        Priority rank of the kind of each pair (lower is chosen first), the pairs of LEE i are ranks[ptr[i]:ptr[i+1]]
+    ptr : np.ndarray
+        Segment boundaries; every segment must have at least one pair
+    backend : str
+        'numba' or 'numpy'
+        Default is None ('numba' when numba is installed)
+
+    Returns
+    -------
+    best : np.ndarray
+        Smallest rank of each LEE
+    position : np.ndarray
+        Position of the first pair with that rank, within the pairs of the LEE
+    """
+    ranks = np.ascontiguousarray(ranks, dtype=np.int64)
+    ptr = np.ascontiguousarray(ptr, dtype=np.int64)
+    if _backend(backend) == 'numba':
+        return _reduce_numba(ranks, ptr)
+    return _reduce_numpy(ranks, ptr)
+
+
+def _backend(backend):
+    if backend is None:
+        return 'numba' if numba is not None else 'numpy'
+    if backend not in ['numba', 'numpy']:
+        raise ValueError("backend must be 'numba' or 'numpy'")
+    if backend == 'numba' and numba is None:
+        raise ValueError('The numba backend requires numba to be installed')
+    return backend
+
+
+class KindClassifier:
+    """
+    Classifies batches of LEEs with the same results (Kind Score and counter entries) as scoring.kind_score.
+    The model regulator lists are compiled once, element searches are memoized, and the attribute comparisons,
+    connection-type resolution, and priority reduction run on integer-coded arrays over all the model pairs of the
+    batch (see compare_codes, pair_table, and reduce_kinds). The rare LEEs whose classification depends on the
+    order of kind_score branches (self-regulation pairs, pairs without a kind, string kinds of path_finding in
+    scheme '2', or flagged kinds only) are classified by kind_score itself
+
+    Parameters
+    ----------
+    model_df : pd.DataFrame
+        The model dataframe
+    reading_df : pd.DataFrame
+        The reading dataframe
+    graph : nx.DiGraph
+        directed graph of the model, used by network.path_finding
+    embedding_match : bool or embedding.EntityIndex
+        Passed to numeric.find_element
+    kind_values : dict
+        Dictionary assigning Kind Score values
+    attributes : list
+        List of attributes compared between the model and the LEEs; completed with the compartment names or IDs
+        as kind_score does
+    classify_scheme : str
+        The scheme of the classification ('1', '2', or '3')
+    mi_cxn : str
+        Connection type of the model interactions without one ('d' or 'i')
+    paths : network.SignedReachability, network.BoundedPaths, or network.ParityReachability
+        Passed to network.path_finding
+        Default is None
+    backend : str
+        'numba' or 'numpy'
+        Default is None ('numba' when numba is installed)
+    """
+
+    def __init__(self, model_df, reading_df, graph, embedding_match, kind_values, attributes, classify_scheme,
+                 mi_cxn='d', paths=None, backend=None):
+        self.model_df, self.reading_df, self.graph = model_df, reading_df, graph
+        self.embedding_match, self.kind_values = embedding_match, kind_values
+        self.classify_scheme, self.mi_cxn, self.paths = classify_scheme, mi_cxn, paths
+        self.backend = _backend(backend)
+        _complete_compartments(attributes)
+        self.attributes = attributes
+        self.groups = np.array([1 if att.startswith('Regulator Compartment') else
+                                2 if att.startswith('Regulated Compartment') else 0 for att in attributes], dtype=np.int64)
+        self.table = pair_table(classify_scheme)
+        # Value and rank of each table label; the rank of a value is that of the first label with this value
+        self.label_values = [kind_values.get(label) for label in table_labels]
+        self.value_rank = {}
+        for rank, label in enumerate(priority_labels):
+            self.value_rank.setdefault(kind_values[label], rank)
+        self.label_ranks = np.array([self.value_rank.get(value, _no_rank) for value in self.label_values],
+                                    dtype=np.int64)
+        self.corroboration_values = [kind_values[label] for label in corroboration_labels]
+        self.contradiction_values = [kind_values[label] for label in contradiction_labels]
+
+        self.listnames = list(model_df['Listname'])
+        self.columns = model_df.columns.values.tolist()
+        self._lists, self._cxn, self._model_atts, self._elements = {}, {}, {}, {}
+        self.vocabulary = {'nan': 0}
+
+    def _code(self, value):
+        return self.vocabulary.setdefault(value, len(self.vocabulary))
+
+    def _regulators(self, row, sign):
+        # Regulator list of a model row, None when empty
+        key = (row, sign)
+        if key not in self._lists:
+            cell = self.model_df.loc[row, sign + ' Regulator List']
+            self._lists[key] = None if str(cell) == 'nan' else cell.split(',')
+        return self._lists[key]
+
+    def _mi_cxn(self, row, check_sign, sign, position):
+        # Connection type of a model interaction, as kind_score finds it
+        key = (row, check_sign, sign, position)
+        if key not in self._cxn:
+            if (check_sign + ' Connection Type List') in self.columns and \
+                    all(cxn_type.lower().strip() in ['i', 'd'] for cxn_type in
+                        self.model_df.loc[row, sign + ' Connection Type List'].split(',')):
+                self._cxn[key] = self.model_df.loc[row, sign + ' Connection Type List'].split(',')[position]
+            else:
+                self._cxn[key] = self.mi_cxn
+        return self._cxn[key]
+
+    def _atts(self, a_idx, b_idx, sign):
+        key = (a_idx, b_idx, sign)
+        if key not in self._model_atts:
+            model_atts = get_attributes(a_idx, b_idx, sign, self.model_df, self.attributes)
+            self._model_atts[key] = [self._code(value) for value in model_atts.values()]
+        return self._model_atts[key]
+
+    def _find(self, search_type, value, element_type):
+        key = (search_type, value, element_type)
+        if key not in self._elements:
+            self._elements[key] = find_element(search_type, value, element_type, self.model_df, self.embedding_match)
+        return self._elements[key]
+
+    def _rows(self, x, role):
+        # Model rows of an LEE element, by priority HGNC > Name > ID, or -1 (and whether any search found it)
+        element_type = self.reading_df.loc[x, role + ' Type']
+        found = {search_type: self._find(search_type, self.reading_df.loc[x, role + col], element_type)
+                 for search_type, col in [('name', ' Name'), ('hgnc', ' HGNC Symbol'), ('id', ' ID')]}
+        for search_type in ['hgnc', 'name', 'id']:
+            if found[search_type] != -1:
+                return found[search_type]
+        return -1
+
+    def classify(self, lees):
+        """
+        Classifies LEEs
+
+        Parameters
+        ----------
+        lees : list
+            LEE ids (rows of the reading dataframe)
+
+        Returns
+        -------
+        results : dict
+            LEE id -> (kind, counter entry), the counter entry being ('corroboration' or 'contradiction', t_idx, s_idx)
+            or None; None instead of the tuple for the LEEs to be classified by scoring.kind_score
+        """
+        reading_df, model_df = self.reading_df, self.model_df
+        results = {}
+        batch = []
+        rel, lee_cxn, mi_cxn, model_codes, reading_codes, paths = [], [], [], [], [], {}
+        ptr = [0]
+        for x in lees:
+            sources, targets = self._rows(x, 'Regulator'), self._rows(x, 'Regulated')
+            if sources == -1 or targets == -1:
+                label = 'full extension' if sources == -1 and targets == -1 else 'hanging extension'
+                results[x] = (self.kind_values[label], None)
+                continue
+            reg_sign = 'Positive' if reading_df.loc[x, 'Sign'].lower() in ['activate', 'positive', 'increase'] \
+                else 'Negative'
+            opp_sign = 'Negative' if reg_sign == 'Positive' else 'Positive'
+            cxn_type = reading_df.loc[x, 'Connection Type'] if 'Connection Type' in reading_df.columns else 'i'
+            reading_atts = {att: reading_df.loc[x, att] for att in self.attributes}
+            lee_codes = [self._code(value) for value in reading_atts.values()]
+            fallback = False
+            for t_idx in targets:
+                for s_idx in sources:
+                    source, target = self.listnames[s_idx], self.listnames[t_idx]
+                    atts = [0]*len(self.attributes)
+                    if source in (self._regulators(t_idx, reg_sign) or []):
+                        position = self._regulators(t_idx, reg_sign).index(source)
+                        relation, mi = REL_SIGN, self._mi_cxn(t_idx, reg_sign, reg_sign, position)
+                        atts = self._atts(t_idx, s_idx, reg_sign)
+                    elif source in (self._regulators(t_idx, opp_sign) or []):
+                        position = self._regulators(t_idx, opp_sign).index(source)
+                        relation, mi = REL_OPP_SIGN, self._mi_cxn(t_idx, reg_sign, opp_sign, position)
+                    elif target in (self._regulators(s_idx, reg_sign) or []):
+                        position = self._regulators(s_idx, reg_sign).index(target)
+                        relation, mi = REL_REVERSED, self._mi_cxn(s_idx, reg_sign, reg_sign, position)
+                        atts = self._atts(s_idx, t_idx, reg_sign)
+                    elif target in (self._regulators(s_idx, opp_sign) or []):
+                        position = self._regulators(s_idx, opp_sign).index(target)
+                        relation, mi = REL_REVERSED_OPP, self._mi_cxn(s_idx, opp_sign, opp_sign, position)
+                        atts = self._atts(s_idx, t_idx, opp_sign)
+                    elif t_idx == s_idx:
+                        # Self-regulation does not add a kind in kind_score
+                        fallback = True
+                        break
+                    else:
+                        relation, mi = REL_NONE, 'd'
+                        kind = path_finding(source, target, reg_sign, model_df, self.graph, self.kind_values,
+                                            cxn_type, reading_atts, self.attributes, self.classify_scheme, self.paths)
+                        if isinstance(kind, str):
+                            fallback = True
+                            break
+                        paths[len(rel)] = kind
+                    rel.append(relation)
+                    lee_cxn.append(_cxn_code(cxn_type))
+                    mi_cxn.append(_cxn_code(mi))
+                    model_codes.append(atts)
+                    reading_codes.append(lee_codes)
+                if fallback:
+                    break
+            if fallback:
+                # Drop the pairs of the LEE
+                del rel[ptr[-1]:], lee_cxn[ptr[-1]:], mi_cxn[ptr[-1]:], model_codes[ptr[-1]:], reading_codes[ptr[-1]:]
+                paths = {i: kind for i, kind in paths.items() if i < ptr[-1]}
+                results[x] = None
+                continue
+            batch.append((x, targets, sources))
+            ptr.append(len(rel))
+        if not batch:
+            return results
+
+        rel = np.array(rel, dtype=np.int64)
+        n_atts = len(self.attributes)
+        outcomes = compare_codes(np.array(model_codes, dtype=np.int64).reshape(len(rel), n_atts),
+                                 np.array(reading_codes, dtype=np.int64).reshape(len(rel), n_atts),
+                                 self.groups, self.backend)
+        labels = np.full(len(rel), -1, dtype=np.int64)
+        direct = rel != REL_NONE
+        labels[direct] = self.table[rel[direct], np.array(lee_cxn)[direct], np.array(mi_cxn)[direct],
+                                    outcomes[direct]]
+        ranks = np.where(labels >= 0, self.label_ranks[labels], _no_rank)
+        for i, kind in paths.items():
+            ranks[i] = self.value_rank.get(kind, _no_rank)
+        ptr = np.array(ptr, dtype=np.int64)
+        best, position = reduce_kinds(ranks, ptr, self.backend)
+
+        for n, (x, targets, sources) in enumerate(batch):
+            first, size = ptr[n], ptr[n + 1] - ptr[n]
+            if ((labels[first:first + size] == -1) & direct[first:first + size]).any():
+                # A pair without a kind shifts the positions of the kinds in kind_score
+                results[x] = None
+                continue
+            if size == 1:
+                kind = paths[first] if first in paths else self.label_values[labels[first]]
+                if kind in self.corroboration_values:
+                    category = 'corroboration'
+                elif int(kind) in self.contradiction_values:
+                    category = 'contradiction'
+                else:
+                    category = None
+            elif best[n] == _no_rank:
+                results[x] = None
+                continue
+            else:
+                label = priority_labels[best[n]]
+                kind = self.kind_values[label]
+                category = 'corroboration' if label in corroboration_labels else \
+                    'contradiction' if label in contradiction_labels else None
+            entry = None
+            if category is not None:
+                pair = position[n] if size > 1 else 0
+                entry = (category, targets[pair // len(sources)], sources[pair % len(sources)])
+            results[x] = (kind, entry)
+        return results
+
+
+def _complete_compartments(attributes):
+    # Compartment names and IDs are compared together, as in scoring.kind_score (the list is completed in place)
+    for role in ['Regulated', 'Regulator']:
+        name, id_ = role + ' Compartment', role + ' Compartment ID'
+        if name in attributes and id_ not in attributes:
+            attributes.insert(attributes.index(name) + 1, id_)
+        elif id_ in attributes and name not in attributes:
+            attributes.insert(attributes.index(id_), name)
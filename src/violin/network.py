@@ -5,11 +5,18 @@ Handles the functions necessary for finding paths within the model for VIOLIN
 Created November 2019 - Casey Hansen MeLoDy Lab
 """
 
+import hashlib
+
 import pandas as pd
 import numpy as np
 import networkx as nx
 from violin.numeric import get_attributes, compare
 
+try:
+    import scipy.sparse as sp
+except ImportError:
+    sp = None
+
 def node_edge_list(model_df):
     """
     This function converts the model from the BioRECIPES format into a node-edge list for use with NetworkX
@@ -66,6 +73,414 @@ def node_edge_list(model_df):
     return node_edge_list
 
 
+def network_digest(graph):
+    """
+    Digest of the model network: its nodes, in order, and its edges with their weights, so that any change of the
+    network (e.g. an edge sign, or one edge replaced by another) changes the digest
+
+    Parameters
+    ----------
+    graph : nx.DiGraph
+        directed graph of the model (see node_edge_list)
+
+    Returns
+    -------
+    digest : str
+    """
+    digest = hashlib.sha256()
+    for node in graph.nodes:
+        digest.update(repr(node).encode() + b'\0')
+    digest.update(b'\1')
+    for edge in graph.edges(data='weight'):
+        digest.update(repr(edge).encode() + b'\0')
+    return digest.hexdigest()
+
+
+def signed_adjacency(graph):
+    """
+    Converts the model network into sparse adjacency matrices of its positive and negative edges.
+    Requires SciPy
+
+    Parameters
+    ----------
+    graph : nx.DiGraph
+        directed graph of the model (see node_edge_list), with edge weights 0 (positive) and 1 (negative)
+
+    Returns
+    -------
+    nodes : list
+        Node names, in the order of the matrix rows and columns
+    positive, negative : scipy.sparse.csr_matrix
+        Adjacency matrices (regulator row, regulated column) of the positive and negative edges
+    """
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = [(index[u], index[v], w) for u, v, w in graph.edges(data='weight')]
+    matrices = []
+    for weight in [0, 1]:
+        rows = [u for u, v, w in edges if w == weight]
+        cols = [v for u, v, w in edges if w == weight]
+        matrices.append(sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(nodes), len(nodes))))
+    return nodes, matrices[0], matrices[1]
+
+
+def _step(rows, cols, adjacency, shape):
+    # (source, node) pairs one edge of adjacency away from the (source, node) pairs of the frontier
+    frontier = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+    return (frontier @ adjacency).nonzero()
+
+
+class SignedReachability:
+    """
+    Reachability and path sign from the query sources to all nodes of the model network, computed at once by a
+    level-synchronous 0-1 BFS over the sparse positive and negative adjacency matrices, from all sources together.
+    For every (source, target) pair, the distance is the smallest number of negative edges on a path of at least one
+    edge, the parity of which is the sign of the shortest weighted path found by path_finding.
+    The distances take one row per source, so only the sources of a reading should be given (see
+    scoring.path_sources); a query from another node adds its row first (see add_sources). Requires SciPy
+
+    Parameters
+    ----------
+    graph : nx.DiGraph
+        directed graph of the model (see node_edge_list)
+    sources : list
+        Source nodes of the queries
+        Default is None (every node)
+    """
+
+    def __init__(self, graph, sources=None):
+        nodes, self.positive, self.negative = signed_adjacency(graph)
+        self.index = {node: i for i, node in enumerate(nodes)}
+        self.sources = {}
+        self.distances = np.zeros((0, len(nodes)), dtype=np.int32)
+        self.add_sources(nodes if sources is None else sources)
+
+    @classmethod
+    def from_distances(cls, nodes, sources, distances, positive=None, negative=None):
+        """
+        SignedReachability of precomputed distances, e.g. memory-mapped arrays shared by worker processes
+        (see shared.SharedModel)
+
+        Parameters
+        ----------
+        nodes : list
+            Node names, in the order of the distance columns
+        sources : list
+            Source nodes, in the order of the distance rows
+        distances : np.ndarray
+            Smallest number of negative edges from each source to each node, -1 for unreachable nodes
+        positive, negative : scipy.sparse.csr_matrix
+            Adjacency matrices of the network (see signed_adjacency), to add sources
+            Default is None (no other source can be added)
+        """
+        paths = cls.__new__(cls)
+        paths.positive, paths.negative = positive, negative
+        paths.index = {node: i for i, node in enumerate(nodes)}
+        paths.sources = {source: i for i, source in enumerate(sources)}
+        paths.distances = distances
+        return paths
+
+    def add_sources(self, sources):
+        """
+        Computes the distances from the sources which do not have them yet, in one BFS
+
+        Parameters
+        ----------
+        sources : list
+            Source nodes; nodes which are not in the network are left out
+        """
+        new = [s for s in dict.fromkeys(sources) if s in self.index and s not in self.sources]
+        if not new:
+            return
+        if self.positive is None:
+            raise ValueError('The adjacency matrices were not kept, sources cannot be added')
+        distances = self._bfs([self.index[source] for source in new])
+        self.sources.update({source: len(self.sources) + i for i, source in enumerate(new)})
+        self.distances = np.concatenate([self.distances, distances]) if len(self.distances) else distances
+
+    def _bfs(self, sources):
+        shape = (len(sources), len(self.index))
+        # -1 for unreachable targets
+        distances = np.full(shape, -1, dtype=np.int32)
+        flat = distances.ravel()
+        seeds = (np.arange(len(sources)), np.array(sources, dtype=np.int64))
+        current = _step(*seeds, self.positive, shape)
+        pending = [_step(*seeds, self.negative, shape)]
+        level = 0
+        while len(current[0]) or any(len(rows) for rows, _ in pending):
+            # Nodes reached through positive edges only are at the same distance
+            carried = []
+            frontier = current
+            while len(frontier[0]):
+                keys = np.unique(frontier[0].astype(np.int64)*shape[1] + frontier[1])
+                keys = keys[flat[keys] == -1]
+                rows, cols = keys // shape[1], keys % shape[1]
+                flat[keys] = level
+                carried.append(_step(rows, cols, self.negative, shape))
+                frontier = _step(rows, cols, self.positive, shape)
+            pending += carried
+            current = (np.concatenate([rows for rows, _ in pending]), np.concatenate([cols for _, cols in pending]))
+            pending = []
+            level += 1
+        return distances
+
+    def weight(self, source, target):
+        """
+        Smallest number of negative edges on a path from source to target
+
+        Parameters
+        ----------
+        source, target : str
+            Node names
+
+        Returns
+        -------
+        weight : int
+            None if there is no path of at least one edge, or if source and target are the same node
+        """
+        if source == target or source not in self.index or target not in self.index:
+            return None
+        if source not in self.sources:
+            self.add_sources([source])
+        weight = self.distances[self.sources[source], self.index[target]]
+        return int(weight) if weight >= 0 else None
+
+
+def signed_reachability(graph, sources=None):
+    """
+    Returns the SignedReachability of the model network from the given sources, or None when SciPy is not installed.
+    It is kept in graph.graph with the digest of the network (see network_digest), and later calls on the same network
+    only add the rows of the sources it does not have yet; it is computed again when the network changed
+
+    Parameters
+    ----------
+    graph : nx.DiGraph
+        directed graph of the model (see node_edge_list)
+    sources : list
+        Source nodes of the queries, e.g. the model elements of a reading (see scoring.path_sources)
+        Default is None (every node)
+
+    Returns
+    -------
+    paths : SignedReachability
+    """
+    if sp is None:
+        return None
+    digest = network_digest(graph)
+    cached = graph.graph.get('signed_reachability')
+    if cached is None or cached[0] != digest:
+        cached = (digest, SignedReachability(graph, sources))
+        graph.graph['signed_reachability'] = cached
+    else:
+        cached[1].add_sources(graph.nodes if sources is None else sources)
+    return cached[1]
+
+
+def _bounded_costs(graph, start, depth, reverse=False):
+    # Smallest number of negative edges on a path of at most depth edges from start to each node it reaches
+    # (from each node to start, if reverse); only the nodes improved at the previous depth are expanded
+    costs = {start: 0}
+    frontier = {start: 0}
+    for _ in range(depth):
+        improved = {}
+        for u, cost in frontier.items():
+            edges = graph.in_edges(u, data='weight') if reverse else graph.out_edges(u, data='weight')
+            for a, b, weight in edges:
+                v = a if reverse else b
+                if cost + weight < min(costs.get(v, np.inf), improved.get(v, np.inf)):
+                    improved[v] = cost + weight
+        if not improved:
+            break
+        costs.update(improved)
+        frontier = improved
+    return costs
+
+
+def bounded_path_weight(graph, source, target, max_length):
+    """
+    Smallest number of negative edges on a path of at most max_length edges from source to target,
+    found by a bidirectional search: a forward search from the source and a backward search from the target,
+    each stopping at half of max_length, meet at the nodes they both reach
+
+    Parameters
+    ----------
+    graph : nx.DiGraph
+        directed graph of the model (see node_edge_list)
+    source, target : str
+        Node names
+    max_length : int
+        Maximum number of edges of a path
+
+    Returns
+    -------
+    weight : int
+        None if there is no such path, or if source and target are the same node
+    """
+    if source == target or source not in graph or target not in graph:
+        return None
+    forward = _bounded_costs(graph, source, (max_length + 1) // 2)
+    backward = _bounded_costs(graph, target, max_length // 2, reverse=True)
+    if len(forward) > len(backward):
+        forward, backward = backward, forward
+    costs = [cost + backward[node] for node, cost in forward.items() if node in backward]
+    return min(costs) if costs else None
+
+
+class BoundedPaths:
+    """
+    Reachability and path sign between nodes of the model network through paths of at most max_length edges,
+    with the same weight() queries as SignedReachability; each pair is searched once (see bounded_path_weight)
+
+    Parameters
+    ----------
+    graph : nx.DiGraph
+        directed graph of the model (see node_edge_list)
+    max_length : int
+        Maximum number of edges of a path
+    """
+
+    def __init__(self, graph, max_length):
+        if max_length < 1:
+            raise ValueError('The maximum path length must be at least 1')
+        self.graph = graph
+        self.max_length = max_length
+        self._weights = {}
+
+    def weight(self, source, target):
+        """
+        Smallest number of negative edges on a path of at most max_length edges from source to target
+
+        Parameters
+        ----------
+        source, target : str
+            Node names
+
+        Returns
+        -------
+        weight : int
+            None if there is no such path, or if source and target are the same node
+        """
+        if (source, target) not in self._weights:
+            self._weights[(source, target)] = bounded_path_weight(self.graph, source, target, self.max_length)
+        return self._weights[(source, target)]
+
+
+class ParityReachability:
+    """
+    Reachability of each node through paths of each sign, by a BFS from one source over the doubled network
+    of (node, parity) states, where a negative edge flips the parity of the number of negative edges.
+    Each BFS answers the queries from its source to every target, and is kept for later queries from the same source
+    (as in the parity of the shortest weighted paths, paths may go around a cycle of the network)
+
+    Parameters
+    ----------
+    graph : nx.DiGraph
+        directed graph of the model (see node_edge_list)
+    max_length : int
+        Maximum number of edges of a path
+        Default is None (no maximum)
+    witnesses : bool
+        Whether the BFS keeps the parent of each state, so that a path of each sign can be reported (see witness)
+        Default is False
+
+    Examples
+    --------
+    >>> parities = ParityReachability(graph, witnesses=True)
+    >>> parities.reachable('braf', 'mapk1', 1)     # whether a path with an odd number of negative edges exists
+    >>> parities.witness('braf', 'mapk1', 1)       # one of the shortest such paths, as a list of nodes
+    """
+
+    def __init__(self, graph, max_length=None, witnesses=False):
+        self.nodes = list(graph.nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.max_length = max_length
+        self.witnesses = witnesses
+        edges = sorted((self.index[u], self.index[v], int(w)) for u, v, w in graph.edges(data='weight'))
+        sources = np.array([u for u, _, _ in edges], dtype=np.int64)
+        self.indices = np.array([v for _, v, _ in edges], dtype=np.int64)
+        self.weights = np.array([w % 2 for _, _, w in edges], dtype=np.int64)
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(self.nodes)), out=self.indptr[1:])
+        self._searches = {}
+
+    def _bfs(self, source):
+        # Number of edges of the shortest path to each (node, parity) state, state = 2*node + parity; -1 if unreachable
+        distances = np.full(2*len(self.nodes), -1, dtype=np.int32)
+        parents = np.full(2*len(self.nodes), -1, dtype=np.int64) if self.witnesses else None
+        frontier = np.array([2*self.index[source]], dtype=np.int64)
+        distances[frontier] = 0
+        level = 0
+        while len(frontier) and (self.max_length is None or level < self.max_length):
+            level += 1
+            nodes, parity = frontier >> 1, frontier & 1
+            starts = self.indptr[nodes]
+            counts = self.indptr[nodes + 1] - starts
+            origin = np.repeat(np.arange(len(frontier)), counts)
+            edges = starts[origin] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            states = 2*self.indices[edges] + (parity[origin] ^ self.weights[edges])
+            new = distances[states] == -1
+            frontier, first = np.unique(states[new], return_index=True)
+            distances[frontier] = level
+            if parents is not None:
+                parents[frontier] = 2*nodes[origin[new][first]] + parity[origin[new][first]]
+        return distances, parents
+
+    def _search(self, source):
+        if source not in self._searches:
+            self._searches[source] = self._bfs(source)
+        return self._searches[source]
+
+    def reachable(self, source, target, parity=None):
+        """
+        Whether a path of at least one edge leads from source to target
+
+        Parameters
+        ----------
+        source, target : str
+            Node names
+        parity : int
+            0 for paths with an even number of negative edges (positive), 1 for an odd number (negative)
+            Default is None (either)
+
+        Returns
+        -------
+        reachable : bool
+            False if source and target are the same node
+        """
+        if source == target or source not in self.index or target not in self.index:
+            return False
+        distances = self._search(source)[0]
+        parities = [0, 1] if parity is None else [int(parity)]
+        return any(distances[2*self.index[target] + p] > 0 for p in parities)
+
+    def witness(self, source, target, parity):
+        """
+        One of the shortest paths from source to target with a given parity of negative edges
+
+        Parameters
+        ----------
+        source, target : str
+            Node names
+        parity : int
+            0 (positive) or 1 (negative)
+
+        Returns
+        -------
+        path : list
+            Nodes of the path, None if there is no such path
+        """
+        if not self.witnesses:
+            raise ValueError('Witness paths require ParityReachability(..., witnesses=True)')
+        if not self.reachable(source, target, parity):
+            return None
+        parents = self._search(source)[1]
+        state, path = 2*self.index[target] + int(parity), []
+        while state != -1:
+            path.append(self.nodes[state >> 1])
+            state = parents[state]
+        return path[::-1]
+
+
 def path_finding(regulator,
                  regulated,
                  sign,
@@ -75,7 +490,10 @@ def path_finding(regulator,
                  reading_cxn_type,
                  reading_atts,
                  attributes,
-                 scheme='1'):
+                 scheme='1',
+                 paths=None,
+                 max_path_length=None,
+                 path_sign='shortest'):
     """
     This function searches for a path between the reading regulator and regulated in the model,
     and calculates the kind score based on the results
@@ -98,6 +516,17 @@ def path_finding(regulator,
         Connection Type of interaction from reading - 'i' for indirect, 'd' for direct
     scheme: str
         The scheme of classification, i.e. '1', '2', or '3'
+    paths : SignedReachability or BoundedPaths
+        Precomputed reachability and path signs of the model network (see signed_reachability)
+        Default is None (paths are searched with NetworkX)
+    max_path_length : int
+        Maximum number of edges of a path, used when paths is None (see BoundedPaths)
+        Default is None (no maximum)
+    path_sign : str
+        Which path sign is compared to the LEE sign: 'shortest' (the sign of the path with the fewest negative edges)
+        or 'any' (an LEE is corroborated by a path of its sign, if any; see ParityReachability);
+        'any' is also used when paths is a ParityReachability
+        Default is 'shortest'
     Returns
     -------
     kind : int
@@ -113,10 +542,26 @@ def path_finding(regulator,
 
     # Have to make sure regulator and regulated are in the directed graph representation of the model
     # Some nodes may be in the model, but aren't regulated/regulators anywhere
+    if path_sign not in ['shortest', 'any']:
+        raise ValueError("path_sign must be 'shortest' or 'any'")
+    if paths is None and path_sign == 'any':
+        paths = ParityReachability(graph, max_path_length)
+    elif paths is None and max_path_length is not None:
+        paths = BoundedPaths(graph, max_path_length)
+    any_sign = isinstance(paths, ParityReachability)
     if (regulator in graph) and (regulated in graph):
+        if any_sign:
+            forward = paths.reachable(regulator, regulated)
+            # Parity of a path of the LEE sign when there is one
+            path_wgt = sign if paths.reachable(regulator, regulated, sign) else 1 - sign
+        elif paths is not None:
+            path_wgt = paths.weight(regulator, regulated)
+            forward = path_wgt is not None
+        else:
+            forward = nx.has_path(graph, regulator, regulated) and len(
+                nx.shortest_path(graph, source=regulator, target=regulated)) > 1
         # If there is a path of the same direction and LEE = D: internal extension
-        if nx.has_path(graph, regulator, regulated) and len(
-                nx.shortest_path(graph, source=regulator, target=regulated)) > 1 and reading_cxn_type == "d":
+        if forward and reading_cxn_type == "d":
             if scheme in ['1', '3']:
                 kind = kind_values['internal extension']
             elif scheme == '2':
@@ -124,8 +569,7 @@ def path_finding(regulator,
             else:
                 raise ValueError('Enter a right scheme (1, 2, 3).')
         # If there is a path of the same direction and LEE = I: check sign and attributes
-        elif nx.has_path(graph, regulator, regulated) and len(
-                nx.shortest_path(graph, source=regulator, target=regulated)) > 1 and reading_cxn_type == "i":
+        elif forward and reading_cxn_type == "i":
             # Finding atts of beginning and end of path
             s_idx = list(model_df['Listname']).index(regulator)
             t_idx = list(model_df['Listname']).index(regulated)
@@ -134,15 +578,16 @@ def path_finding(regulator,
             compare_atts = compare(model_atts, reading_atts)
 
             # Finding Path sign
-            # path list
-            path = nx.shortest_path(graph, source=regulator, target=regulated, weight='weight')
-            # Check path sign
-            path_wgt = 0
-            idx = 0
-            # Sum the edge weights to determine the overall effect
-            while idx < len(path) - 1:
-                path_wgt += graph[path[idx]][path[idx + 1]]['weight']
-                idx += 1
+            if paths is None:
+                # path list
+                path = nx.shortest_path(graph, source=regulator, target=regulated, weight='weight')
+                # Check path sign
+                path_wgt = 0
+                idx = 0
+                # Sum the edge weights to determine the overall effect
+                while idx < len(path) - 1:
+                    path_wgt += graph[path[idx]][path[idx + 1]]['weight']
+                    idx += 1
             # if %2 = 0, then positive regulation, if %2 = 1, then negative regulation
             # Weak corroboration - regulation matches reading
             if path_wgt % 2 == sign and compare_atts in [0, 1, 2]:
@@ -162,8 +607,10 @@ def path_finding(regulator,
                     kind = str(kind_values['sign contradiction'])
 
         # If there is a path of the opposite direction - Flagged
-        elif nx.has_path(graph, regulated, regulator) and len(
-                nx.shortest_path(graph, source=regulated, target=regulator)) > 1:
+        elif paths.reachable(regulated, regulator) if any_sign else \
+                (paths.weight(regulated, regulator) is not None) if paths is not None else \
+                (nx.has_path(graph, regulated, regulator) and len(
+                    nx.shortest_path(graph, source=regulated, target=regulator)) > 1):
             if scheme in ['1', '3']:
                 kind = kind_values['path mismatch']
             elif scheme == '2':
@@ -7,6 +7,7 @@ Created November 2019 - Casey Hansen MeLoDy Lab
 
 import pandas as pd
 from violin.formatting import get_listname
+from violin.embedding import EntityIndex
 import requests
 
 
@@ -105,6 +106,9 @@ def find_element(search_type,
         The type of element searched for ('protein', 'protein family', etc.)
     model_df: pd.DataFrame
         The model dataframe
+    embedding_match: bool or embedding.EntityIndex
+        If an EntityIndex, an element not found by name (or ID) is searched for
+        among the most similar model entries (see embedding.EntityIndex.rows)
 
     Returns
     -------
@@ -134,6 +138,14 @@ def find_element(search_type,
                 element_type in model_df.loc[idx, "Element Type"]):
             indices_list.append(idx)
 
+    # Searching for the most similar element, if not found
+    if len(indices_list) == 0 and isinstance(embedding_match, EntityIndex) and element_name != 'nan':
+        for idx in embedding_match.rows(search_type, element_name):
+            if (model_df.loc[idx, "Element Type"] == element_type or
+                    model_df.loc[idx, "Element Type"] in element_type or
+                    element_type in model_df.loc[idx, "Element Type"]):
+                indices_list.append(idx)
+
     # If element has been found, return a list of its locations within the model
     if len(indices_list) > 0:
         return indices_list
@@ -0,0 +1,155 @@
+"""
+progress.py
+
+Handles progress reporting (LEEs processed, throughput, estimated time remaining, and category tally)
+for long VIOLIN scoring runs
+Created October 2026 - MeLoDy Lab
+"""
+
+import sys
+import time
+
+# Kind Score classifications in each output category, in the order used by in_out.output
+categories = {'corroborations': ['strong corroboration', 'empty attribute', 'indirect interaction',
+                                 'path corroboration', 'specification'],
+              'extensions': ['hanging extension', 'full extension', 'internal extension'],
+              'contradictions': ['dir contradiction', 'sign contradiction', 'att contradiction'],
+              'flagged': ['dir mismatch', 'path mismatch', 'self-regulation', 'flagged4', 'flagged5']}
+
+
+def category_values(kind_values):
+    """
+    Maps each Kind Score value to its output category
+    (corroborations, extensions, contradictions, or flagged)
+
+    Parameters
+    ----------
+    kind_values : dict
+        Dictionary assigning Kind Score values
+
+    Returns
+    -------
+    value_category : dict
+        Kind Score value -> category name; when a value is shared by classifications
+        of different categories, the first category in the output order is used
+    """
+    value_category = {}
+    for category, kinds in categories.items():
+        for kind in kinds:
+            if kind in kind_values:
+                value_category.setdefault(kind_values[kind], category)
+                value_category.setdefault(str(kind_values[kind]), category)
+    return value_category
+
+
+class ProgressTracker:
+    """
+    Keeps the running totals of a scoring run, and calls the progress callback
+    once per scored chunk with a report dictionary:
+
+        processed : number of LEEs scored so far
+        total : number of LEEs in the reading
+        elapsed : seconds since the start of the run
+        throughput : LEEs scored per second
+        eta : estimated seconds remaining
+        categories : running tally of LEEs per category (corroborations, extensions, contradictions, flagged)
+
+    Parameters
+    ----------
+    total : int
+        Number of LEEs to be scored
+    kind_values : dict
+        Dictionary assigning Kind Score values, used for the category tally
+    callback : callable
+        Function called with the report dictionary
+    processed : int
+        Number of LEEs already scored (e.g. when resuming a run)
+        Default is 0
+    """
+
+    def __init__(self, total, kind_values, callback, processed=0):
+        self.total = total
+        self.callback = callback
+        self.value_category = category_values(kind_values)
+        self.tally = {category: 0 for category in categories}
+        self.processed = processed
+        self.start_processed = processed
+        self.start = time.perf_counter()
+
+    def update(self, kind_scores):
+        """
+        Adds a scored chunk to the running totals and reports the progress
+
+        Parameters
+        ----------
+        kind_scores : pd.Series
+            Kind Scores of the LEEs in the chunk
+        """
+        for kind, count in kind_scores.value_counts().items():
+            category = self.value_category.get(kind)
+            if category is not None:
+                self.tally[category] += int(count)
+        self.processed += len(kind_scores)
+
+        elapsed = time.perf_counter() - self.start
+        throughput = (self.processed - self.start_processed) / elapsed if elapsed > 0 else 0.
+        eta = (self.total - self.processed) / throughput if throughput > 0 else float('nan')
+        self.callback({'processed': self.processed,
+                       'total': self.total,
+                       'elapsed': elapsed,
+                       'throughput': throughput,
+                       'eta': eta,
+                       'categories': dict(self.tally)})
+
+
+def print_progress(report, file=sys.stderr):
+    """
+    Progress callback that prints a single status line per report
+
+    Parameters
+    ----------
+    report : dict
+        Progress report, see ProgressTracker
+    file : file object
+        Where the status line is written
+        Default is sys.stderr
+    """
+    tally = ', '.join('{}: {}'.format(k, v) for k, v in report['categories'].items())
+    print('{}/{} LEEs ({:.1f} LEEs/s, ETA {:.0f}s) - {}'.format(
+        report['processed'], report['total'], report['throughput'], report['eta'], tally),
+        file=file)
+
+
+def tqdm_progress(**tqdm_kwargs):
+    """
+    Creates a progress callback that drives a tqdm progress bar, with the category tally as postfix.
+    Requires the optional tqdm package
+
+    Parameters
+    ----------
+    tqdm_kwargs : dict
+        Additional arguments for tqdm (e.g. desc, position)
+
+    Returns
+    -------
+    callback : callable
+        Progress callback for scoring.score_reading; the bar is closed once all LEEs are scored
+    """
+    try:
+        from tqdm.auto import tqdm
+    except ImportError:
+        raise ImportError('tqdm_progress requires the tqdm package: pip install tqdm')
+
+    bar = {}
+
+    def callback(report):
+        if 'bar' not in bar:
+            bar['bar'] = tqdm(total=report['total'], unit='LEE', **tqdm_kwargs)
+            bar['n'] = 0
+        bar['bar'].update(report['processed'] - bar['n'])
+        bar['n'] = report['processed']
+        bar['bar'].set_postfix(report['categories'], refresh=False)
+        if report['processed'] >= report['total']:
+            bar['bar'].close()
+
+    return callback
@@ -5,10 +5,23 @@ Handles the Match Score, Kind Score, and Epistemic Value functions for VIOLIN
 Created November 2019 - Casey Hansen MeLoDy Lab
 """
 
+import concurrent.futures
+import heapq
+import logging
+import time
+import numpy as np
 import pandas as pd
 from violin.numeric import get_attributes, find_element, compare
-from violin.network import path_finding
+from violin.network import path_finding, signed_reachability, BoundedPaths, ParityReachability
 from violin.formatting import get_listname
+from violin.progress import ProgressTracker
+from violin.checkpoint import checkpoint_key, checkpoint_path, save_chunk, load_chunks, score_cols
+from violin.counter import count, counter_size, counter_since, merge_counter, EdgeCounter, counter_categories
+from violin.embedding import EntityIndex
+from violin.kernels import KindClassifier, numba
+from violin.distributed import partition_lees, broadcast, executor_workers
+from violin.shared import SharedModel
+from violin.index import lee_elements
 
 kind_dict = {"strong corroboration" : 2, 
                 "empty attribute" : 1,
@@ -32,6 +45,11 @@ match_dict = {"source present" : 1,
 # Default attributes list is empty
 atts_list = []
 
+# Reading columns used by match_score and kind_score, besides the attributes
+classify_cols = ['Regulator Name', 'Regulator Type', 'Regulator HGNC Symbol', 'Regulator ID',
+                 'Regulated Name', 'Regulated Type', 'Regulated HGNC Symbol', 'Regulated ID',
+                 'Sign', 'Connection Type']
+
 def match_score(x, reading_df, model_df, embedding_match, match_values = match_dict):
     """
     This function calculates the Match Score for an interaction from the reading
@@ -106,6 +124,11 @@ def match_score(x, reading_df, model_df, embedding_match, match_values = match_d
     return match
 
 
+def _count(counter, category, i, model_t_indices, model_s_indices, x):
+    # kinds holds one Kind Score per (t_idx, s_idx) pair, in t_idx-major order
+    count(counter, category, model_t_indices[i // len(model_s_indices)], model_s_indices[i % len(model_s_indices)], x)
+
+
 def kind_score(x,
                model_df,
                reading_df,
@@ -115,7 +138,8 @@ def kind_score(x,
                kind_values = kind_dict,
                attributes = atts_list,
                classify_scheme = '1',
-               mi_cxn = 'd'):
+               mi_cxn = 'd',
+               paths = None):
     """
     This function calculates the Kind Score for an interaction in the reading
 
@@ -129,8 +153,9 @@ def kind_score(x,
         The reading dataframe
     graph : nx.DiGraph
         directed graph of the model,used when function calls path_finding module
-    counter: dict
-        A dictionary to record the interactions that are identified as corroborated or contradicted interaction in model
+    counter: counter.EdgeCounter or dict
+        Records the model interactions that are identified as corroborated or contradicted interaction,
+        see counter.EdgeCounter (a dictionary of 't_idx+s_idx' string lists is also accepted)
         default value is None
     kind_values : dict
         Dictionary assigning Kind Score values
@@ -145,6 +170,9 @@ def kind_score(x,
         What connection type should be assigned to model interactions if not available
         Accepted values are "d" (direct) or "i" (indirect)
         Deafult is "d"
+    paths : network.SignedReachability, network.BoundedPaths, or network.ParityReachability
+        Precomputed reachability and path signs of the model network, used by network.path_finding
+        Default is None (paths are searched with NetworkX)
 
     Returns
     -------
@@ -441,7 +469,7 @@ def kind_score(x,
                         kind = kind_values['self-regulation']
                     # If model does not contain interaction - check for path
                     else:
-                        kinds.append(path_finding(source_listname,target_listname,reg_sign,model_df,graph,kind_values,lee_cxn_type,reading_atts,attributes,classify_scheme))
+                        kinds.append(path_finding(source_listname,target_listname,reg_sign,model_df,graph,kind_values,lee_cxn_type,reading_atts,attributes,classify_scheme,paths))
 
         if len(kinds) == 1:
             kind = kinds[0]
@@ -453,10 +481,7 @@ def kind_score(x,
                             kind_values['empty attribute'],
                             kind_values['indirect interaction'],
                             kind_values['specification']]:
-                    counter['corroboration'].append('{}+{}'.format(
-                        model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                        model_s_indices[kinds.index(kind) % len(model_s_indices)])
-                    )
+                    _count(counter, 'corroboration', kinds.index(kind), model_t_indices, model_s_indices, x)
 
                 elif int(kind) in [kind_values['dir contradiction'],
                             kind_values['sign contradiction'],
@@ -465,15 +490,9 @@ def kind_score(x,
                         if type(kind) == str:
                             kind = int(kind)
                         else:
-                            counter['contradiction'].append('{}+{}'.format(
-                        model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                            model_s_indices[kinds.index(kind) % len(model_s_indices)])
-                        )
+                            _count(counter, 'contradiction', kinds.index(kind), model_t_indices, model_s_indices, x)
                     else:
-                        counter['contradiction'].append('{}+{}'.format(
-                            model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                            model_s_indices[kinds.index(kind) % len(model_s_indices)])
-                        )
+                        _count(counter, 'contradiction', kinds.index(kind), model_t_indices, model_s_indices, x)
                 else:
                     pass
 
@@ -484,10 +503,7 @@ def kind_score(x,
                 pass
             # Track every matched interaction that is classified as corroborated interaction or contradicted interaction
             else:
-                counter['corroboration'].append('{}+{}'.format(
-                    model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                    model_s_indices[kinds.index(kind) % len(model_s_indices)])
-                )
+                _count(counter, 'corroboration', kinds.index(kind), model_t_indices, model_s_indices, x)
 
         # Weak Corroboration
         elif kind_values['empty attribute'] in kinds:
@@ -496,20 +512,14 @@ def kind_score(x,
                 pass
             # Track every matched interaction that is classified as corroborated interaction or contradicted interaction
             else:
-                counter['corroboration'].append('{}+{}'.format(
-                    model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                    model_s_indices[kinds.index(kind) % len(model_s_indices)])
-                )
+                _count(counter, 'corroboration', kinds.index(kind), model_t_indices, model_s_indices, x)
         elif kind_values['indirect interaction'] in kinds:
             kind = kind_values['indirect interaction']
             if counter is None:
                 pass
             # Track every matched interaction that is classified as corroborated interaction or contradicted interaction
             else:
-                counter['corroboration'].append('{}+{}'.format(
-                    model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                    model_s_indices[kinds.index(kind) % len(model_s_indices)])
-                )
+                _count(counter, 'corroboration', kinds.index(kind), model_t_indices, model_s_indices, x)
         elif kind_values['path corroboration'] in kinds:
             kind = kind_values['path corroboration']
         elif kind_values['specification'] in kinds:
@@ -518,10 +528,7 @@ def kind_score(x,
                 pass
             # Track every matched interaction that is classified as corroborated interaction or contradicted interaction
             else:
-                counter['corroboration'].append('{}+{}'.format(
-                    model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                    model_s_indices[kinds.index(kind) % len(model_s_indices)])
-                )
+                _count(counter, 'corroboration', kinds.index(kind), model_t_indices, model_s_indices, x)
 
         # Contradiction
         elif kind_values['dir contradiction'] in kinds or str(kind_values['dir contradiction']) in kinds:
@@ -537,14 +544,10 @@ def kind_score(x,
                         if type(_) == str:
                             pass
                         else:
-                            counter['contradiction'].append('{}+{}'.format(
-                                model_t_indices[kinds.index(_) // len(model_s_indices)],
-                                model_s_indices[kinds.index(_) % len(model_s_indices)]))
+                            _count(counter, 'contradiction', kinds.index(_), model_t_indices, model_s_indices, x)
                             break
                 else:
-                    counter['contradiction'].append('{}+{}'.format(
-                        model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                        model_s_indices[kinds.index(kind) % len(model_s_indices)]))
+                    _count(counter, 'contradiction', kinds.index(kind), model_t_indices, model_s_indices, x)
 
         elif kind_values['sign contradiction'] in kinds or str(kind_values['sign contradiction']) in kinds:
             kind = kind_values['sign contradiction']
@@ -559,14 +562,10 @@ def kind_score(x,
                         if type(_) == str:
                             pass
                         else:
-                            counter['contradiction'].append('{}+{}'.format(
-                                model_t_indices[kinds.index(_) // len(model_s_indices)],
-                                model_s_indices[kinds.index(_) % len(model_s_indices)]))
+                            _count(counter, 'contradiction', kinds.index(_), model_t_indices, model_s_indices, x)
                             break
                 else:
-                    counter['contradiction'].append('{}+{}'.format(
-                        model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                        model_s_indices[kinds.index(kind) % len(model_s_indices)]))
+                    _count(counter, 'contradiction', kinds.index(kind), model_t_indices, model_s_indices, x)
         elif kind_values['att contradiction'] in kinds or str(kind_values['att contradiction']) in kinds:
             kind = kind_values['att contradiction']
             if counter is None:
@@ -579,14 +578,10 @@ def kind_score(x,
                         if type(_) == str:
                             pass
                         else:
-                            counter['contradiction'].append('{}+{}'.format(
-                                model_t_indices[kinds.index(_) // len(model_s_indices)],
-                                model_s_indices[kinds.index(_) % len(model_s_indices)]))
+                            _count(counter, 'contradiction', kinds.index(_), model_t_indices, model_s_indices, x)
                             break
                 else:
-                    counter['contradiction'].append('{}+{}'.format(
-                        model_t_indices[kinds.index(kind) // len(model_s_indices)],
-                        model_s_indices[kinds.index(kind) % len(model_s_indices)]))
+                    _count(counter, 'contradiction', kinds.index(kind), model_t_indices, model_s_indices, x)
         # Extensions
         elif kind_values['hanging extension'] in kinds:
             kind = kind_values['hanging extension']
@@ -644,10 +639,121 @@ def epistemic_value(x,reading_df):
     return e_value
 
 
+def path_sources(reading_df, model_df, embedding_match=False):
+    """
+    Finds the model elements from which the paths of a reading are searched: the model rows matching the regulators
+    and regulated elements of the LEEs (see index.lee_elements), as path_finding also searches paths back from the
+    regulated element
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        The reading dataframe
+    model_df : pd.DataFrame
+        The model dataframe
+    embedding_match : bool or embedding.EntityIndex
+        Passed to numeric.find_element
+        Default is False
+
+    Returns
+    -------
+    sources : list
+        Listnames of the model elements
+    """
+    regulators, regulated = lee_elements(reading_df, model_df, embedding_match)
+    return _element_sources(model_df, regulators + regulated)
+
+
+def _element_sources(model_df, elements):
+    # Listnames of the model rows matching the elements, in their order
+    rows = dict.fromkeys(row for found in elements for row in found)
+    return list(dict.fromkeys(model_df.loc[row, 'Listname'] for row in rows))
+
+
+def _path_index(graph, path_search, max_path_length=None, path_sign='shortest', reading_df=None, model_df=None,
+                embedding_match=False):
+    if path_search not in ['sparse', 'networkx']:
+        raise ValueError("path_search must be 'sparse' or 'networkx'")
+    if path_sign not in ['shortest', 'any']:
+        raise ValueError("path_sign must be 'shortest' or 'any'")
+    if path_sign == 'any':
+        return ParityReachability(graph, max_path_length)
+    if max_path_length is not None:
+        return BoundedPaths(graph, max_path_length)
+    if path_search == 'networkx':
+        return None
+    # Only the rows of the model elements of the reading are computed
+    sources = path_sources(reading_df, model_df, embedding_match) if reading_df is not None else None
+    return signed_reachability(graph, sources)
+
+
+def _entity_index(embedding_match, model_df, reading_df):
+    # Builds the entity index when embedding_match is True, and resolves the reading entities in one batch
+    if embedding_match is True:
+        embedding_match = EntityIndex(model_df)
+    if isinstance(embedding_match, EntityIndex):
+        embedding_match.resolve_reading(reading_df, model_df)
+    return embedding_match
+
+
+def classification_cols(reading_df, attributes = atts_list):
+    """
+    Finds the reading columns which influence the Match Score and Kind Score of an LEE:
+    the regulator and regulated element, sign, connection type, and the compared attributes
+    (with both compartment columns of an element, as in kind_score).
+    Other columns (e.g. Mechanism, Site, or Cell Line when not compared) do not change the classification
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        The reading dataframe
+    attributes : list
+        List of attributes compared between the model and the machine reading output
+        Default is None
+
+    Returns
+    -------
+    cols : list
+    """
+    cols = list(classify_cols)
+    for att in attributes:
+        cols.append(att)
+        for element in ['Regulator', 'Regulated']:
+            if att in [element + ' Compartment', element + ' Compartment ID']:
+                cols += [element + ' Compartment', element + ' Compartment ID']
+    return [col for col in dict.fromkeys(cols) if col in reading_df.columns]
+
+
+def classification_groups(reading_df, attributes = atts_list):
+    """
+    Groups the LEEs which have the same values in every column influencing their classification
+    (see classification_cols), so each group only needs to be classified once
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        The reading dataframe
+    attributes : list
+        List of attributes compared between the model and the machine reading output
+        Default is None
+
+    Returns
+    -------
+    groups : np.ndarray
+        Group number of each row, numbered in order of first appearance
+    """
+    cols = classification_cols(reading_df, attributes)
+    return reading_df[cols].astype(str).groupby(cols, sort=False).ngroup().values
+
+
 def score_reading(reading_df, model_df, graph,
                   embedding_match=False, counter=None,
                   kind_values = kind_dict, match_values = match_dict,
-                  attributes = atts_list, classify_scheme = '1', mi_cxn = 'd'):
+                  attributes = atts_list, classify_scheme = '1', mi_cxn = 'd',
+                  progress = None, chunk_size = 1000,
+                  checkpoint_dir = None, checkpoint_interval = 10, resume = False, dedup = True,
+                  path_search = 'sparse', max_path_length = None, path_sign = 'shortest', kernels = None,
+                  histogram = None, executor = None, partitions = None, shared_model = None):
     """
     Creates new columns for the Match Score, Kind Score, Epistemic Value, and Total Score.
     Calls scoring functions and stores the values in the approriate column.
@@ -660,8 +766,12 @@ def score_reading(reading_df, model_df, graph,
         The model dataframe
     graph : nx.DiGraph
         directed graph of the model, necessary for calling kind_score module
-    counter: dict
-        A dictionary for counting the corrobrated and contradicted interaction
+    embedding_match : bool or embedding.EntityIndex
+        Whether LEE elements not found in the model are matched to the most similar model element
+        (see embedding.EntityIndex); True builds the index of the model
+        Default is False
+    counter: counter.EdgeCounter or dict
+        Records the corrobrated and contradicted model interactions, see counter.EdgeCounter
         defulat value is None
     kind_values : dict
         Dictionary assigning Kind Score values
@@ -675,24 +785,452 @@ def score_reading(reading_df, model_df, graph,
     classify_scheme: str
         The scheme of the classification
         Default value is '1'
+    progress : callable
+        Function called after each scored chunk with a progress report
+        (LEEs processed, throughput, estimated time remaining, category tally), see progress.ProgressTracker;
+        progress.print_progress and progress.tqdm_progress() can be used here
+        Default is None (no progress reporting)
+    chunk_size : int
+        Number of LEEs scored between progress reports
+        Default is 1000
+    checkpoint_dir : str
+        Directory where scored chunks and the counter state are saved, keyed by the model and reading contents
+        and the scoring settings
+        Default is None (no checkpoints)
+    checkpoint_interval : int
+        Number of chunks scored between checkpoints
+        Default is 10
+    resume : bool
+        Whether to restore the chunks saved in checkpoint_dir by an interrupted identical run and
+        only score the remaining LEEs; the output is identical to that of an uninterrupted run
+        Default is False
+    dedup : bool
+        Whether LEEs with the same values in the columns influencing the classification (see classification_groups)
+        are classified once, the Match Score, Kind Score, and counter entries of the first being reused for the others;
+        the output is identical. The dedup factor and estimated time saved are logged and kept in scored.attrs['dedup']
+        Default is True
+    path_search : str
+        How paths between model elements are searched: 'sparse' (reachability and path signs of the whole model
+        network computed at once from its sparse adjacency matrices, see network.signed_reachability; NetworkX
+        searches are used when SciPy is not installed) or 'networkx' (one search per LEE)
+        Default is 'sparse'
+    max_path_length : int
+        Maximum number of edges of the model paths corroborating or flagging an LEE; longer paths are ignored,
+        and LEEs only connected by them are internal extensions. Paths are then searched by bidirectional
+        depth-bounded searches, once per pair of elements, whatever path_search (see network.BoundedPaths)
+        Default is None (no maximum)
+    path_sign : str
+        Which model path sign is compared to the sign of an indirect LEE: 'shortest' (the sign of the path with the
+        fewest negative edges) or 'any' (the LEE is a path corroboration if any path has its sign; reachability
+        by sign is then found by one BFS per regulator over (element, parity) states, see network.ParityReachability)
+        Default is 'shortest'
+    kernels : bool
+        Whether the Kind Scores of each chunk are computed together on integer-coded arrays
+        (see kernels.KindClassifier); the output is identical
+        Default is None (when numba is installed)
+    histogram : histogram.ScoreHistogram
+        Score histogram updated with the scores of each chunk (and of the restored chunks), from which
+        visualize_violin plots without reading the output back
+        Default is None (no histogram)
+    executor : concurrent.futures.Executor
+        Executor scoring partitions of the reading (see distributed.partition_lees) in its workers, e.g. a
+        ProcessPoolExecutor, or a distributed.DaskExecutor or distributed.RayExecutor on a cluster. The model is
+        sent once per worker when the executor can broadcast it (see distributed.broadcast), and the partitions are
+        gathered in the order of the reading, so the output is identical; checkpoints are not available
+        Default is None (scored in this process)
+    partitions : int
+        Number of partitions scored on the executor
+        Default is None (one per worker of the executor)
+    shared_model : shared.SharedModel or str
+        Compiled model (or its directory, see shared.compile_model) which the workers of executor memory-map,
+        instead of receiving model_df and graph; the workers must see the same filesystem
+        Default is None (model_df and graph are sent to the workers)
     Returns
     -------
     scored = reading_df : pd.DataFrame
         reading dataframe with added scores
     """
 
+    if executor is not None:
+        if checkpoint_dir is not None:
+            raise ValueError('Checkpoints are not available when scoring on an executor')
+        settings = {'kind_values': kind_values, 'match_values': match_values, 'attributes': attributes,
+                    'classify_scheme': classify_scheme, 'mi_cxn': mi_cxn, 'chunk_size': chunk_size, 'dedup': dedup,
+                    'path_search': path_search, 'max_path_length': max_path_length, 'path_sign': path_sign,
+                    'kernels': kernels}
+        return _score_distributed(reading_df, model_df, graph, embedding_match, counter, progress, histogram,
+                                  executor, partitions, settings, shared_model)
+
+    embedding_match = _entity_index(embedding_match, model_df, reading_df)
+    paths = _path_index(graph, path_search, max_path_length, path_sign, reading_df, model_df, embedding_match)
+    if kernels is None:
+        kernels = numba is not None
+    classifier = KindClassifier(model_df, reading_df, graph, embedding_match, kind_values, attributes,
+                                classify_scheme, mi_cxn, paths) if kernels else None
+
     #Create new DF columns for score calculations
     scored_reading_df = reading_df.copy()
     scored_reading_df['Match Score'] = pd.Series()
     scored_reading_df['Kind Score'] = pd.Series()
     scored_reading_df['Epistemic Value'] = pd.Series()
     scored_reading_df['Total Score'] = pd.Series()
-    print(reading_df.shape[0])
-    #Calculate scores
-    for x in range(reading_df.shape[0]):
-        scored_reading_df.at[x,'Match Score'] = match_score(x,reading_df,model_df,embedding_match, match_values)
-        scored_reading_df.at[x,'Kind Score'] = kind_score(x,model_df,reading_df,graph,embedding_match, counter,kind_values,attributes,classify_scheme,mi_cxn)
-        scored_reading_df.at[x,'Epistemic Value'] = epistemic_value(x,reading_df)
-        scored_reading_df.at[x,'Total Score'] =  ((scored_reading_df.at[x,'Evidence Score']*scored_reading_df.at[x,'Match Score'])+scored_reading_df.at[x,'Kind Score'])*scored_reading_df.at[x,'Epistemic Value']
+    logging.debug('Scoring %d LEEs' % reading_df.shape[0])
+
+    # Restore the scored chunks of an interrupted run
+    first = 0
+    if checkpoint_dir is not None:
+        key = checkpoint_key(model_df, reading_df, kind_values=kind_values, match_values=match_values,
+                             embedding_match=getattr(embedding_match, 'threshold', embedding_match),
+                             attributes=attributes, classify_scheme=classify_scheme, mi_cxn=mi_cxn,
+                             max_path_length=max_path_length, path_sign=path_sign,
+                             # The chunks of a run without a counter do not hold its entries
+                             counter=None if counter is None else type(counter).__name__)
+        path = checkpoint_path(checkpoint_dir, key, resume)
+        for chunk in (load_chunks(path) if resume else []):
+            for x, scores in zip(range(chunk['start'], chunk['stop']), chunk['scores']):
+                for col, score in zip(score_cols, scores):
+                    scored_reading_df.at[x, col] = score
+            if counter is not None and chunk['counter'] is not None:
+                merge_counter(counter, chunk['counter'])
+            first = chunk['stop']
+        if histogram is not None:
+            histogram.update(scored_reading_df.iloc[:first])
+        last_saved = first
+        counter_saved = counter_size(counter) if counter is not None else None
+
+    if progress is not None:
+        tracker = ProgressTracker(reading_df.shape[0], kind_values, progress, processed=first)
+    # Group number -> (Match Score, Kind Score, counter entries, classification time) of the classified groups
+    groups = classification_groups(reading_df, attributes) if dedup else None
+    classified = {}
+    reused, saved = 0, 0.
+    #Calculate scores, one chunk at a time
+    for start in range(first, reading_df.shape[0], chunk_size):
+        stop = min(start + chunk_size, reading_df.shape[0])
+        if classifier is not None:
+            # Classify the LEEs of the chunk which are not duplicates together
+            tic = time.perf_counter()
+            batch, seen = [], set(classified)
+            for x in range(start, stop):
+                if not dedup or groups[x] not in seen:
+                    batch.append(x)
+                    if dedup:
+                        seen.add(groups[x])
+            results = classifier.classify(batch)
+            share = (time.perf_counter() - tic) / max(len(batch), 1)
+        for x in range(start, stop):
+            if dedup and groups[x] in classified:
+                match, kind, delta, seconds = classified[groups[x]]
+                if counter is not None:
+                    merge_counter(counter, delta, lee=x)
+                reused += 1
+                saved += seconds
+            else:
+                tic = time.perf_counter()
+                size = counter_size(counter) if counter is not None and dedup else None
+                match = match_score(x,reading_df,model_df,embedding_match, match_values)
+                if classifier is not None and results.get(x) is not None:
+                    kind, entry = results[x]
+                    if counter is not None and entry is not None:
+                        count(counter, entry[0], entry[1], entry[2], x)
+                else:
+                    kind = kind_score(x,model_df,reading_df,graph,embedding_match, counter,kind_values,attributes,classify_scheme,mi_cxn,paths)
+                if dedup:
+                    delta = counter_since(counter, size) if counter is not None else None
+                    classified[groups[x]] = (match, kind, delta, time.perf_counter() - tic +
+                                             (share if classifier is not None else 0.))
+            scored_reading_df.at[x,'Match Score'] = match
+            scored_reading_df.at[x,'Kind Score'] = kind
+            scored_reading_df.at[x,'Epistemic Value'] = epistemic_value(x,reading_df)
+            scored_reading_df.at[x,'Total Score'] =  ((scored_reading_df.at[x,'Evidence Score']*scored_reading_df.at[x,'Match Score'])+scored_reading_df.at[x,'Kind Score'])*scored_reading_df.at[x,'Epistemic Value']
+        if progress is not None:
+            tracker.update(scored_reading_df['Kind Score'].iloc[start:stop])
+        if histogram is not None:
+            histogram.update(scored_reading_df.iloc[start:stop])
+        # Save the chunks scored since the last checkpoint
+        if checkpoint_dir is not None and \
+                (stop == reading_df.shape[0] or (stop - first) // chunk_size % checkpoint_interval == 0):
+            counter_delta = counter_since(counter, counter_saved) if counter is not None else None
+            save_chunk(path, last_saved, stop, scored_reading_df, counter_delta)
+            last_saved = stop
+            counter_saved = counter_size(counter) if counter is not None else None
+
+    if dedup:
+        scored = reading_df.shape[0] - first
+        scored_reading_df.attrs['dedup'] = {'lees': scored,
+                                            'classified': scored - reused,
+                                            'factor': scored / (scored - reused) if scored > reused else 1.,
+                                            'seconds_saved': saved}
+        logging.info('Classified %d unique LEEs for %d LEEs (dedup factor %.2f, about %.1f s saved)'
+                     % (scored - reused, scored, scored_reading_df.attrs['dedup']['factor'], saved))
+    return scored_reading_df
 
+
+def _score_partition(model, reading_df, settings, sources=None):
+    # Scores a partition of the reading in a worker of an executor, recording its counter entries separately.
+    # The path searches only start from the sources of the partition, resolved by the caller
+    model_df, graph, embedding_match = model
+    if isinstance(model_df, SharedModel):
+        model_df, graph = model_df.model_df, model_df.graph
+    if sources is not None and settings['path_search'] == 'sparse' and settings['max_path_length'] is None and \
+            settings['path_sign'] == 'shortest':
+        signed_reachability(graph, sources)
+    settings = dict(settings)
+    counter = settings.pop('counter', None)
+    if counter == 'edges':
+        counter = EdgeCounter()
+    elif counter == 'dict':
+        counter = {category: [] for category in counter_categories}
+    scored = score_reading(reading_df, model_df, graph, embedding_match=embedding_match, counter=counter, **settings)
+    return scored[score_cols], counter, scored.attrs.get('dedup')
+
+
+def _score_distributed(reading_df, model_df, graph, embedding_match, counter, progress, histogram,
+                       executor, partitions, settings, shared_model=None):
+    # Scores the partitions of the reading on an executor (see score_reading), and gathers them in the reading order
+    embedding_match = _entity_index(embedding_match, model_df, reading_df)
+    if partitions is None:
+        partitions = executor_workers(executor)
+    regulators, regulated = lee_elements(reading_df, model_df, embedding_match)
+    parts = partition_lees(reading_df, model_df, partitions, embedding_match, elements=(regulators, regulated))
+    if counter is not None:
+        settings = dict(settings, counter='edges' if isinstance(counter, EdgeCounter) else 'dict')
+    if shared_model is not None:
+        # The workers attach to the compiled model by its path
+        model = (SharedModel(shared_model) if isinstance(shared_model, str) else shared_model, None, embedding_match)
+    else:
+        model = broadcast(executor, (model_df, graph, embedding_match))
+    futures = {executor.submit(_score_partition, model, reading_df.iloc[rows].reset_index(drop=True), settings,
+                               _element_sources(model_df, [regulators[r] for r in rows] +
+                                                [regulated[r] for r in rows])): i
+               for i, rows in enumerate(parts)}
+
+    if progress is not None:
+        tracker = ProgressTracker(reading_df.shape[0], kind_values=settings['kind_values'], callback=progress)
+    results = [None]*len(parts)
+    for future in concurrent.futures.as_completed(futures):
+        results[futures[future]] = future.result()
+        if progress is not None:
+            tracker.update(results[futures[future]][0]['Kind Score'])
+
+    scored_reading_df = reading_df.copy()
+    scores = pd.concat([result[0] for result in results], ignore_index=True) if parts else \
+        pd.DataFrame(columns=score_cols)
+    order = np.argsort(np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64), kind='stable')
+    for col in score_cols:
+        scored_reading_df[col] = scores[col].values[order]
+    if histogram is not None:
+        histogram.update(scored_reading_df)
+
+    if isinstance(counter, EdgeCounter):
+        # Entries in the order of the LEEs, as scored in this process
+        records = [result[1].records.copy() for result in results]
+        for rows, part in zip(parts, records):
+            part['lee'] = rows[part['lee']]
+        records = np.concatenate(records) if records else EdgeCounter().records
+        counter.extend(records[np.argsort(records['lee'], kind='stable')])
+    elif counter is not None:
+        for result in results:
+            merge_counter(counter, result[1])
+
+    stats = [result[2] for result in results if result[2] is not None]
+    if stats:
+        scored = sum(stat['lees'] for stat in stats)
+        classified = sum(stat['classified'] for stat in stats)
+        scored_reading_df.attrs['dedup'] = {'lees': scored,
+                                            'classified': classified,
+                                            'factor': scored / classified if classified else 1.,
+                                            'seconds_saved': sum(stat['seconds_saved'] for stat in stats)}
     return scored_reading_df
+
+
+def parse_filter_opt(filter_opt):
+    """
+    Parses the filtering option used to select VIOLIN output
+
+    Parameters
+    ----------
+    filter_opt : str
+        Accepted options are 'X%','Se>Y', or 'St>Z', where X, Y, and Z, are values:
+        top X% of LEEs by Total Score, LEEs with an Evidence Score of at least Y,
+        or LEEs with a Total Score of at least Z
+
+    Returns
+    -------
+    filter_type : str
+        '%', 'Se', or 'St'
+    filter_value : float
+        Fraction of LEEs kept (for '%'), or score threshold
+    """
+    if '%' in filter_opt:
+        return '%', int(filter_opt.replace('%',''))/100
+    elif 'St>' in filter_opt:
+        return 'St', int(filter_opt.replace('St>',''))
+    elif 'Se>' in filter_opt:
+        return 'Se', int(filter_opt.replace('Se>',''))
+    else:
+        raise ValueError('Filter value not accepted'+'\n'+
+        'Accepted options are \'X%\',\'Se>Y\', or \'St>Z\','+'\n'+
+        'where X, Y, and Z, are numerical values')
+
+
+def score_top(reading_df, model_df, graph, filter_opt = None, top_k = None,
+              embedding_match=False, counter=None,
+              kind_values = kind_dict, match_values = match_dict,
+              attributes = atts_list, classify_scheme = '1', mi_cxn = 'd', path_search = 'sparse',
+              max_path_length = None, path_sign = 'shortest'):
+    """
+    Scores only the LEEs which can be in the top-K by Total Score, or above a Total Score or Evidence Score threshold.
+    The Total Score of each LEE is bounded before classification, using the Evidence Score and Epistemic Value with the
+    Match Score and Kind Score values giving the largest Total Score (the smallest ones when the Epistemic Value is
+    negative); the Match Score is then calculated, and kind_score (including path searches)
+    is only called for LEEs whose bound can still reach the requested subset.
+
+    Parameters
+    ----------
+    reading_df : pd.DataFrame
+        The reading dataframe
+    model_df : pd.DataFrame
+        The model dataframe
+    graph : nx.DiGraph
+        directed graph of the model, necessary for calling kind_score module
+    filter_opt : str
+        Filtering option, as for visualize_violin.visualize: 'X%','Se>Y', or 'St>Z'
+        Default is None
+    top_k : int
+        Number of LEEs with the highest Total Score to be returned, used when filter_opt is None
+        Default is None
+    embedding_match : bool or embedding.EntityIndex
+        Whether LEE elements not found in the model are matched to the most similar model element
+        (see embedding.EntityIndex); True builds the index of the model
+        Default is False
+    counter: counter.EdgeCounter or dict
+        Records the corrobrated and contradicted model interactions, see counter.EdgeCounter;
+        only the scored LEEs are counted
+        defulat value is None
+    kind_values : dict
+        Dictionary assigning Kind Score values
+        Default values found in kind_dict
+    match_values : dict
+        Dictionary assigning Match Score values
+        Default values found in match_dict
+    attributes : list
+        List of attributes compared between the model and the machine reading output
+        Default is None
+    classify_scheme: str
+        The scheme of the classification
+        Default value is '1'
+    path_search : str
+        How paths between model elements are searched: 'sparse' (reachability and path signs of the whole model
+        network computed at once from its sparse adjacency matrices, see network.signed_reachability; NetworkX
+        searches are used when SciPy is not installed) or 'networkx' (one search per LEE)
+        Default is 'sparse'
+    max_path_length : int
+        Maximum number of edges of the model paths corroborating or flagging an LEE; longer paths are ignored,
+        and LEEs only connected by them are internal extensions. Paths are then searched by bidirectional
+        depth-bounded searches, once per pair of elements, whatever path_search (see network.BoundedPaths)
+        Default is None (no maximum)
+    path_sign : str
+        Which model path sign is compared to the sign of an indirect LEE: 'shortest' (the sign of the path with the
+        fewest negative edges) or 'any' (the LEE is a path corroboration if any path has its sign; reachability
+        by sign is then found by one BFS per regulator over (element, parity) states, see network.ParityReachability)
+        Default is 'shortest'
+
+    Returns
+    -------
+    scored : pd.DataFrame
+        The selected LEEs with added scores, sorted by descending Total Score (ties in reading order);
+        the same LEEs that score_reading followed by the filtering of filter_opt would give, which are the first
+        rows of the _outputDF.csv file of in_out.output, as it also keeps ties in reading order
+    """
+    n = reading_df.shape[0]
+    embedding_match = _entity_index(embedding_match, model_df, reading_df)
+    paths = _path_index(graph, path_search, max_path_length, path_sign, reading_df, model_df, embedding_match)
+    if filter_opt is not None:
+        filter_type, filter_value = parse_filter_opt(filter_opt)
+        if filter_type == '%':
+            top_k = int(n*filter_value)
+    elif top_k is None:
+        raise ValueError('Either filter_opt or top_k is required')
+    else:
+        filter_type = 'K'
+
+    # Bounds of the Kind Score and Match Score
+    kinds = [float(k) for k in kind_values.values()]
+    max_kind, min_kind = max(kinds), min(kinds)
+    matches = (min(match_values.values()), max(match_values.values()))
+
+    def bounds(evidence, match, e_value):
+        # Upper bound of the Total Score ((Se*Sm)+Sk)*Sb over the possible Match Scores and Kind Scores; it is linear
+        # in each, so the largest value is at a corner, e.g. at the smallest Match Score when Sb is negative
+        return max((evidence*m + k)*e_value for m in match for k in (min_kind, max_kind))
+
+    scored = {}
+    def score(x):
+        match = match_score(x, reading_df, model_df, embedding_match, match_values)
+        scored[x] = match
+        return match
+
+    def classify(x):
+        match = scored[x]
+        kind = kind_score(x, model_df, reading_df, graph, embedding_match, counter, kind_values, attributes,
+                          classify_scheme, mi_cxn, paths)
+        e_value = epistemic_value(x, reading_df)
+        total = ((reading_df.at[x, 'Evidence Score']*match)+kind)*e_value
+        scored[x] = (match, kind, e_value, total)
+        return total
+
+    if filter_type == 'Se':
+        # Evidence Scores are known before scoring, no bound needed
+        selected = [x for x in range(n) if reading_df.at[x, 'Evidence Score'] >= filter_value]
+        for x in selected:
+            score(x)
+            classify(x)
+    elif filter_type == 'St':
+        selected = []
+        for x in range(n):
+            e_value = epistemic_value(x, reading_df)
+            evidence = reading_df.at[x, 'Evidence Score']
+            if bounds(evidence, matches, e_value) < filter_value:
+                continue
+            match = score(x)
+            if bounds(evidence, (match, match), e_value) < filter_value:
+                continue
+            if classify(x) >= filter_value:
+                selected.append(x)
+    else:
+        # Visit LEEs from the largest bound, keeping the K largest Total Scores in a heap;
+        # stop when no remaining LEE can reach the K-th Total Score
+        order = sorted(range(n), key=lambda x: -bounds(reading_df.at[x, 'Evidence Score'], matches,
+                                                       epistemic_value(x, reading_df)))
+        heap = []
+        for x in order:
+            if top_k == 0:
+                break
+            e_value = epistemic_value(x, reading_df)
+            evidence = reading_df.at[x, 'Evidence Score']
+            if len(heap) == top_k and bounds(evidence, matches, e_value) < heap[0]:
+                break
+            match = score(x)
+            if len(heap) == top_k and bounds(evidence, (match, match), e_value) < heap[0]:
+                continue
+            total = classify(x)
+            if len(heap) < top_k:
+                heapq.heappush(heap, total)
+            elif total >= heap[0]:
+                heapq.heappushpop(heap, total)
+        selected = [x for x in scored if isinstance(scored[x], tuple)]
+
+    selected = [x for x in selected if isinstance(scored[x], tuple)]
+    logging.info('Classified %d of %d LEEs' % (len(selected), n))
+
+    # Same columns as score_reading, sorted by Total Score; stable sort keeps ties in reading order
+    scored_reading_df = reading_df.loc[sorted(selected)].copy()
+    for col, idx in zip(['Match Score', 'Kind Score', 'Epistemic Value', 'Total Score'], range(4)):
+        scored_reading_df[col] = pd.Series([scored[x][idx] for x in scored_reading_df.index],
+                                           index=scored_reading_df.index, dtype=object)
+    scored_reading_df = scored_reading_df.sort_values(by='Total Score', ascending=False, kind='mergesort')
+    if filter_type in ['%', 'K']:
+        scored_reading_df = scored_reading_df.head(top_k)
+
+    return scored_reading_df.reset_index(drop=True)
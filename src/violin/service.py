@@ -0,0 +1,427 @@
+"""
+service.py
+
+Local asyncio HTTP/JSON scoring service, keeping compiled models in memory so small LEE batches
+are classified without re-reading the model files
+Created October 2026 - MeLoDy Lab
+
+Usage:
+    python -m violin.service --model SkMel133=examples/input/models/SkMel133_biorecipe.xlsx --port 8765
+
+Endpoints:
+    POST /score/<model>    body: {"lees": [{<BioRECIPE reading columns>}, ...]} or a JSON list of LEEs
+    GET  /models           names of the loaded models
+    GET  /metrics          request latency histograms (overall and per model)
+    GET  /health
+"""
+
+import argparse
+import asyncio
+import bisect
+import concurrent.futures
+import json
+import math
+import multiprocessing
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from violin.in_out import preprocessing_model, format_reading, BioRECIPE_reading_col, evidence_score_def
+from violin.network import node_edge_list
+from violin.scoring import score_reading, kind_dict, match_dict
+from violin.progress import category_values
+
+# Upper bounds (in ms) of the latency histogram buckets
+latency_buckets = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+# Compiled models of a worker process: name -> (model_df, graph)
+_worker_models = {}
+
+
+def compile_model(model_file):
+    """
+    Preprocesses a model file and builds its network, once, for repeated scoring
+
+    Parameters
+    ----------
+    model_file : str
+        Directory and filename of the model file in BioRECIPE format
+
+    Returns
+    -------
+    model : tuple
+        (model_df, graph)
+    """
+    model_df = preprocessing_model(model_file)
+    return model_df, node_edge_list(model_df)
+
+
+def _init_worker(models):
+    # Each worker process receives the compiled models once, at startup
+    warnings.simplefilter('ignore')
+    _worker_models.update(models)
+
+
+def score_batches(model_name, batches, settings, models=None):
+    """
+    Scores several LEE batches against a compiled model in a single scoring call.
+    Each batch is preprocessed separately, so that duplicates are only merged within a batch
+
+    Parameters
+    ----------
+    model_name : str
+        Name of the compiled model
+    batches : list
+        LEE batches, each a list of dictionaries with BioRECIPE reading columns
+    settings : dict
+        Scoring parameters: kind_values, match_values, attributes, classify_scheme, evidence_score_cols
+    models : dict
+        Compiled models, name -> (model_df, graph)
+        Default is None (the models of the worker process)
+
+    Returns
+    -------
+    results : list
+        Scored LEEs of each batch, as lists of dictionaries with the added scores and 'Category'
+    """
+    model_df, graph = (models or _worker_models)[model_name]
+    readings = []
+    for idx, records in enumerate(batches):
+        reading_df = pd.DataFrame.from_records(records)
+        for col in BioRECIPE_reading_col:
+            if col not in reading_df.columns:
+                reading_df[col] = 'nan'
+        reading_df = format_reading(reading_df.fillna('nan').reset_index(drop=True),
+                                    settings['evidence_score_cols'])
+        reading_df['_batch'] = idx
+        readings.append(reading_df)
+    reading_df = pd.concat(readings, ignore_index=True)
+
+    scored = score_reading(reading_df.drop(columns='_batch'), model_df, graph,
+                           kind_values=settings['kind_values'],
+                           match_values=settings['match_values'],
+                           attributes=list(settings['attributes']),
+                           classify_scheme=settings['classify_scheme'])
+    value_category = category_values(settings['kind_values'])
+    scored['Category'] = scored['Kind Score'].map(value_category)
+
+    return [scored[reading_df['_batch'] == idx].to_dict('records') for idx in range(len(batches))]
+
+
+class LatencyHistogram:
+    """
+    Counts request latencies in fixed buckets (see latency_buckets)
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(latency_buckets) + 1)
+        self.count = 0
+        self.total = 0.
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(latency_buckets, ms)] += 1
+        self.count += 1
+        self.total += ms
+
+    def to_dict(self):
+        return {'buckets_ms': latency_buckets + ['inf'],
+                'counts': self.counts,
+                'count': self.count,
+                'mean_ms': self.total / self.count if self.count else None}
+
+
+def _json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    elif isinstance(value, np.floating):
+        return None if math.isnan(value) else float(value)
+    elif isinstance(value, (np.ndarray, tuple, set)):
+        return list(value)
+    return str(value)
+
+
+class ScoringService:
+    """
+    Scores LEE batches against models kept in memory, through a pool of worker processes.
+    Requests for the same model that arrive within batch_window are scored together (up to max_batch LEEs),
+    and at most max_concurrency batches per model are scored at the same time
+
+    Parameters
+    ----------
+    models : dict
+        Model name -> directory and filename of the model file, or compiled model (model_df, graph)
+    workers : int
+        Number of worker processes; 0 scores in threads of the service process
+        Default is 2
+    max_concurrency : int
+        Maximum number of batches of the same model scored at the same time
+        Default is 2
+    batch_window : float
+        Seconds to wait for more requests before scoring a batch
+        Default is 0.005
+    max_batch : int
+        Maximum number of LEEs in a batch
+        Default is 500
+    kind_values : dict
+        Dictionary assigning Kind Score values
+        Default values found in scoring.kind_dict
+    match_values : dict
+        Dictionary assigning Match Score values
+        Default values found in scoring.match_dict
+    attributes : list
+        List of attributes compared between the model and the LEEs
+        Default is none
+    classify_scheme : str
+        The scheme of the classification
+        Default is '1'
+    evidence_score_cols : list
+        Column headings used to identify identical interactions in a batch
+        Default values found in in_out.evidence_score_def
+    """
+
+    def __init__(self, models, workers=2, max_concurrency=2, batch_window=0.005, max_batch=500,
+                 kind_values=kind_dict, match_values=match_dict, attributes=[], classify_scheme='1',
+                 evidence_score_cols=evidence_score_def):
+        self.models = {name: compile_model(model) if isinstance(model, str) else model
+                       for name, model in models.items()}
+        self.settings = {'kind_values': kind_values,
+                         'match_values': match_values,
+                         'attributes': list(attributes),
+                         'classify_scheme': classify_scheme,
+                         'evidence_score_cols': evidence_score_cols}
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.latency = LatencyHistogram()
+        self.model_latency = {name: LatencyHistogram() for name in self.models}
+        self.executor = None
+
+    def _start_workers(self):
+        if self.workers > 0:
+            # Workers are spawned rather than forked, since the service process already runs threads
+            self.executor = concurrent.futures.ProcessPoolExecutor(self.workers,
+                                                                   mp_context=multiprocessing.get_context('spawn'),
+                                                                   initializer=_init_worker, initargs=(self.models,))
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max(1, self.max_concurrency * len(self.models)))
+        self.queues = {name: asyncio.Queue() for name in self.models}
+        self.semaphores = {name: asyncio.Semaphore(self.max_concurrency) for name in self.models}
+        self.batchers = [asyncio.create_task(self._batcher(name)) for name in self.models]
+
+    async def score(self, model_name, records):
+        """
+        Scores a batch of LEEs against a loaded model
+
+        Parameters
+        ----------
+        model_name : str
+            Name of the loaded model
+        records : list
+            LEEs, as dictionaries with BioRECIPE reading columns
+
+        Returns
+        -------
+        scored : list
+            Scored LEEs (duplicates merged), with Evidence, Match, Kind, and Total Scores and 'Category'
+        """
+        if model_name not in self.models:
+            raise KeyError(model_name)
+        future = asyncio.get_running_loop().create_future()
+        await self.queues[model_name].put((records, future))
+        return await future
+
+    async def _batcher(self, model_name):
+        # Collects the requests of a model into batches, and scores them within the concurrency limit
+        loop = asyncio.get_running_loop()
+        queue = self.queues[model_name]
+        semaphore = self.semaphores[model_name]
+        while True:
+            batch = [await queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.batch_window
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            await semaphore.acquire()
+            task = asyncio.create_task(self._run(model_name, batch))
+            task.add_done_callback(lambda _: semaphore.release())
+
+    async def _run(self, model_name, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            if self.workers > 0:
+                results = await loop.run_in_executor(self.executor, score_batches, model_name,
+                                                     [records for records, _ in batch], self.settings)
+            else:
+                results = await loop.run_in_executor(self.executor, score_batches, model_name,
+                                                     [records for records, _ in batch], self.settings, self.models)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _handle(self, method, path, body):
+        # Returns (status, response) of an HTTP request
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        elif method == 'GET' and path == '/models':
+            return 200, {'models': list(self.models)}
+        elif method == 'GET' and path == '/metrics':
+            return 200, {'latency': self.latency.to_dict(),
+                         'models': {name: h.to_dict() for name, h in self.model_latency.items()}}
+        elif method == 'POST' and path.startswith('/score/'):
+            model_name = path[len('/score/'):]
+            if model_name not in self.models:
+                return 404, {'error': 'Unknown model: ' + model_name}
+            try:
+                request = json.loads(body or b'null')
+                records = request['lees'] if isinstance(request, dict) else request
+                if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                    raise ValueError('Expected a list of LEEs')
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {'error': 'Bad request: ' + str(e)}
+            if len(records) == 0:
+                return 200, {'model': model_name, 'lees': []}
+            start = time.perf_counter()
+            try:
+                scored = await self.score(model_name, records)
+            except Exception as e:
+                return 500, {'error': '{}: {}'.format(type(e).__name__, e)}
+            ms = (time.perf_counter() - start) * 1000
+            self.latency.add(ms)
+            self.model_latency[model_name].add(ms)
+            return 200, {'model': model_name, 'lees': scored}
+        return 404, {'error': 'Not found: {} {}'.format(method, path)}
+
+    async def _connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive: one request after the other on the same connection
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = line.decode('latin-1').split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, response = await self._handle(method, path, body)
+                payload = json.dumps(response, default=_json_default).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n'
+                             'Connection: {}\r\n\r\n'.format(status, reasons[status], len(payload),
+                                                             'keep-alive' if keep_alive else 'close').encode())
+                writer.write(payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765, unix_socket=None):
+        """
+        Starts the worker pool and the HTTP server
+
+        Parameters
+        ----------
+        host : str
+            Address the server listens on
+            Default is '127.0.0.1' (local only)
+        port : int
+            Port the server listens on
+            Default is 8765
+        unix_socket : str
+            Path of a Unix socket to listen on instead of host and port
+            Default is None
+
+        Returns
+        -------
+        server : asyncio.Server
+        """
+        self._start_workers()
+        if unix_socket is not None:
+            self.server = await asyncio.start_unix_server(self._connection, path=unix_socket)
+        else:
+            self.server = await asyncio.start_server(self._connection, host, port)
+        return self.server
+
+    async def stop(self):
+        """
+        Stops the HTTP server, the batchers and the worker pool
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        for batcher in self.batchers:
+            batcher.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _serve(service, host, port, unix_socket):
+    server = await service.start(host, port, unix_socket)
+    print('VIOLIN scoring service: models {} on {}'.format(
+        list(service.models), unix_socket or '{}:{}'.format(host, port)))
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VIOLIN scoring service')
+    parser.add_argument('--model', action='append', required=True,
+                        help='model to load, as name=file (BioRECIPE .txt, .csv, .tsv, or .xlsx); can be repeated')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', type=str, default=None,
+                        help='(optional) listen on a Unix socket instead of host and port')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='number of worker processes, 0 to score in threads')
+    parser.add_argument('--max-concurrency', type=int, default=2,
+                        help='maximum number of batches of the same model scored at the same time')
+    parser.add_argument('--batch-window', type=float, default=0.005,
+                        help='seconds to wait for more requests before scoring a batch')
+    parser.add_argument('--max-batch', type=int, default=500,
+                        help='maximum number of LEEs in a batch')
+    parser.add_argument('--attributes', type=str, default='',
+                        help='comma-separated attributes compared between the model and the LEEs')
+    parser.add_argument('--approach', type=str, choices=['1', '2', '3'], default='1',
+                        help='classify scheme, default is 1')
+    args = parser.parse_args()
+
+    models = {}
+    for model in args.model:
+        if '=' not in model:
+            parser.error('--model must be given as name=file')
+        name, model_file = model.split('=', 1)
+        models[name] = model_file
+
+    warnings.simplefilter('ignore')
+    service = ScoringService(models, workers=args.workers, max_concurrency=args.max_concurrency,
+                             batch_window=args.batch_window, max_batch=args.max_batch,
+                             attributes=[a.strip() for a in args.attributes.split(',') if a.strip()],
+                             classify_scheme=args.approach)
+    asyncio.run(_serve(service, args.host, args.port, args.unix_socket))
+
+
+if __name__ == '__main__':
+    main()
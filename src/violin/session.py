@@ -0,0 +1,222 @@
+"""
+session.py
+
+In-memory VIOLIN runs: model and reading tables (dataframes or Arrow tables) are preprocessed,
+scored, filtered by category, and plotted without intermediate files
+Created October 2026 - MeLoDy Lab
+"""
+
+from violin.in_out import preprocessing_model, preprocessing_reading, output, evidence_score_def
+from violin.network import node_edge_list
+from violin.scoring import score_reading, score_top, kind_dict, match_dict
+from violin.progress import categories
+from violin.visualize_violin import visualize
+from violin.index import build_index
+from violin.store import ResultsStore
+
+
+class ViolinSession:
+    """
+    Keeps the preprocessed model, network, reading, and scored reading of a VIOLIN run in memory.
+    Each stage is computed the first time it is used; files are only written by write()
+
+    Parameters
+    ----------
+    model : str, pd.DataFrame, or pyarrow.Table
+        Model in BioRECIPE format, as a filename or a table
+    reading : str, pd.DataFrame, or pyarrow.Table
+        Machine reading output in BioRECIPE format, as a filename or a table
+    kind_values : dict
+        Dictionary assigning Kind Score values
+        Default values found in scoring.kind_dict
+    match_values : dict
+        Dictionary assigning Match Score values
+        Default values found in scoring.match_dict
+    attributes : list
+        List of attributes compared between the model and the LEEs
+        Default is none
+    classify_scheme : str
+        The scheme of the classification
+        Default is '1'
+    evidence_score_cols : list
+        Column headings used to identify identical interactions in the machine reading output
+        Default values found in in_out.evidence_score_def
+
+    Examples
+    --------
+    >>> session = ViolinSession(model_df, reading_table, attributes=['Regulated Compartment ID'])
+    >>> session.scored                       # scored reading dataframe
+    >>> session.category('extensions')       # extensions, sorted by Total Score
+    >>> session.plot(filter_opt='10%')
+    >>> session.write('output/RA2')          # same files as in_out.output
+    >>> session.index('output/RA2_index')    # model element -> LEE index
+    """
+
+    def __init__(self, model, reading, kind_values=kind_dict, match_values=match_dict, attributes=[],
+                 classify_scheme='1', evidence_score_cols=evidence_score_def):
+        self.model = model
+        self.reading = reading
+        self.kind_values = kind_values
+        self.match_values = match_values
+        self.attributes = list(attributes)
+        self.classify_scheme = classify_scheme
+        self.evidence_score_cols = evidence_score_cols
+        self._model_df = None
+        self._graph = None
+        self._reading_df = None
+        self._scored = None
+
+    @property
+    def model_df(self):
+        """Preprocessed model dataframe"""
+        if self._model_df is None:
+            self._model_df = preprocessing_model(self.model)
+        return self._model_df
+
+    @property
+    def graph(self):
+        """Model network"""
+        if self._graph is None:
+            self._graph = node_edge_list(self.model_df)
+        return self._graph
+
+    @property
+    def reading_df(self):
+        """Preprocessed reading dataframe, with the Evidence Score"""
+        if self._reading_df is None:
+            self._reading_df = preprocessing_reading(self.reading, evidence_score_cols=self.evidence_score_cols,
+                                                     atts=self.attributes)
+        return self._reading_df
+
+    @property
+    def scored(self):
+        """Scored reading dataframe, see score()"""
+        if self._scored is None:
+            self.score()
+        return self._scored
+
+    def score(self, filter_opt=None, **kwargs):
+        """
+        Scores the reading against the model, replacing any previous scores
+
+        Parameters
+        ----------
+        filter_opt : str
+            When given, only the LEEs passing the filter are classified and kept (see scoring.score_top)
+            Accepted options are 'X%','Se>Y', or 'St>Z'
+            Default is None (all LEEs are scored)
+        kwargs : dict
+            Additional parameters for scoring.score_reading (e.g. progress, counter, checkpoint_dir)
+
+        Returns
+        -------
+        scored : pd.DataFrame
+            Scored reading dataframe
+        """
+        settings = {'kind_values': self.kind_values,
+                    'match_values': self.match_values,
+                    'attributes': list(self.attributes),
+                    'classify_scheme': self.classify_scheme}
+        if filter_opt is None:
+            self._scored = score_reading(self.reading_df, self.model_df, self.graph, **settings, **kwargs)
+        else:
+            self._scored = score_top(self.reading_df, self.model_df, self.graph, filter_opt=filter_opt,
+                                     **settings, **kwargs)
+        return self._scored
+
+    def category(self, name):
+        """
+        Scored LEEs of one output category, sorted by Total Score as in in_out.output
+
+        Parameters
+        ----------
+        name : str
+            'corroborations', 'extensions', 'contradictions', or 'flagged'
+
+        Returns
+        -------
+        category_df : pd.DataFrame
+        """
+        if name not in categories:
+            raise ValueError("Unknown category: {}, options are: {}".format(name, ', '.join(categories)))
+        values = [self.kind_values[kind] for kind in categories[name] if kind in self.kind_values]
+        scored = self.scored
+        return scored[scored['Kind Score'].isin(values)].sort_values(by='Total Score', ascending=False,
+                                                                      kind='mergesort')
+
+    def all_categories(self):
+        """
+        Scored LEEs of every output category
+
+        Returns
+        -------
+        category_dfs : dict
+            Category name -> dataframe, see category()
+        """
+        return {name: self.category(name) for name in categories}
+
+    def plot(self, filter_opt='100%', category=None):
+        """
+        Plots the scored output, see visualize_violin.visualize
+
+        Parameters
+        ----------
+        filter_opt : str
+            How much VIOLIN output should be visualized
+            Default is '100%' (Total Output)
+        category : str
+            Output category to be visualized
+            Default is None (all VIOLIN output)
+        """
+        visualize(self.match_values, self.kind_values, self.scored, filter_opt=filter_opt, category=category)
+
+    def write(self, file_name, output_format='csv'):
+        """
+        Writes the output files of the scored reading, see in_out.output
+
+        Parameters
+        ----------
+        file_name : str
+            Directory and filename of the output suffix
+        output_format : str
+            'csv' or 'parquet'
+            Default is 'csv'
+        """
+        output(self.scored, file_name, kind_values=self.kind_values, output_format=output_format)
+
+    def index(self, path):
+        """
+        Writes the inverted index from model elements to the scored LEEs, see index.build_index
+
+        Parameters
+        ----------
+        path : str
+            Directory of the index
+
+        Returns
+        -------
+        index : index.ViolinIndex
+        """
+        return build_index(self.scored, self.model_df, path, kind_values=self.kind_values)
+
+    def store(self, path, run_id=None):
+        """
+        Adds the scored LEEs to a SQLite results store, see store.ResultsStore
+
+        Parameters
+        ----------
+        path : str
+            Database file
+        run_id : str
+            ID of the run
+            Default is None (see store.ResultsStore.add_run)
+
+        Returns
+        -------
+        run_id : str
+        """
+        store = ResultsStore(path)
+        try:
+            return store.add_run(self.scored, self.model_df, self.kind_values, run_id=run_id)
+        finally:
+            store.close()
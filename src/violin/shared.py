@@ -0,0 +1,172 @@
+"""
+shared.py
+
+Handles the compiled model shared by worker processes: the model table as integer-coded columns of one string table,
+the model network as CSR adjacency arrays, and its signed reachability (see network.SignedReachability), saved as
+.npy files which the workers memory-map, so they share the same pages instead of each receiving a pickled copy
+Created October 2026 - MeLoDy Lab
+"""
+
+import json
+import os
+import uuid
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from violin.network import signed_reachability, signed_adjacency, network_digest, SignedReachability
+
+# Model table and network of the compiled models attached in this process, by directory and compilation token
+_attached = {}
+
+
+def _string_table(strings):
+    # One UTF-8 buffer with the offsets of each string
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def compile_model(model_df, graph, path, sources=None):
+    """
+    Saves the compiled model in a directory (see SharedModel): every model column, coded as integers into one
+    table of the distinct strings of the model (numeric columns are saved as they are), the model network as CSR
+    arrays (successors and edge weights of each node), and the signed reachability of the network from the given
+    sources when SciPy is installed (see network.signed_reachability)
+
+    Parameters
+    ----------
+    model_df : pd.DataFrame
+        The model dataframe
+    graph : nx.DiGraph
+        directed graph of the model (see network.node_edge_list)
+    path : str
+        Directory of the compiled model
+    sources : list
+        Source nodes of the saved reachability, e.g. the model elements of a reading (see scoring.path_sources);
+        the workers add the rows of other sources themselves
+        Default is None (every node)
+
+    Returns
+    -------
+    model : SharedModel
+    """
+    strings = {}
+    code = lambda value: strings.setdefault(value, len(strings))
+    arrays, columns = {}, []
+    for n, col in enumerate(model_df.columns):
+        values = model_df[col]
+        if values.dtype == object:
+            if not all(isinstance(value, str) for value in values):
+                raise ValueError('Model column ' + str(col) + ' has values which are not strings, '
+                                 'it cannot be shared')
+            arrays['column%d' % n] = np.array([code(value) for value in values], dtype=np.int32)
+            columns.append({'name': col, 'coded': True})
+        else:
+            arrays['column%d' % n] = values.to_numpy()
+            columns.append({'name': col, 'coded': False})
+    arrays['index'] = model_df.index.to_numpy(dtype=np.int64)
+
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    arrays['nodes'] = np.array([code(node) for node in nodes], dtype=np.int32)
+    arrays['indptr'] = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum([graph.out_degree(node) for node in nodes], out=arrays['indptr'][1:])
+    edges = list(graph.edges(data='weight'))
+    arrays['indices'] = np.array([index[v] for _, v, _ in edges], dtype=np.int32)
+    arrays['weights'] = np.array([w for _, _, w in edges], dtype=np.float64)
+    paths = signed_reachability(graph, sources)
+    if paths is not None:
+        # Columns in the order of the graph nodes, rows in the order of paths.sources
+        arrays['distances'] = paths.distances
+        arrays['sources'] = np.array([code(source) for source in paths.sources], dtype=np.int32)
+    arrays['strings'], arrays['offsets'] = _string_table(list(strings))
+
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), array)
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'token': uuid.uuid4().hex, 'columns': columns, 'rows': model_df.shape[0],
+                   'nodes': len(nodes), 'edges': len(edges), 'reachability': paths is not None}, f)
+    return SharedModel(path)
+
+
+class SharedModel:
+    """
+    Compiled model saved by compile_model. The arrays are memory-mapped, so the worker processes attaching to the
+    same directory share their pages; a pickled SharedModel only holds its path. The model dataframe and network are
+    rebuilt from the arrays once per process, and the signed reachability of the network, the largest part of the
+    compiled model (one distance per source and node), is used in place
+
+    Parameters
+    ----------
+    path : str
+        Directory of the compiled model
+
+    Examples
+    --------
+    >>> shared = compile_model(model_df, graph, 'compiled/')
+    >>> scored = score_reading(reading_df, model_df, graph, executor=executor, shared_model=shared)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        names = ['column%d' % n for n in range(len(self.meta['columns']))] + \
+            ['index', 'nodes', 'indptr', 'indices', 'weights', 'strings', 'offsets'] + \
+            (['distances', 'sources'] if self.meta['reachability'] else [])
+        self.arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in names}
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    @property
+    def nbytes(self):
+        """Size of the shared arrays, in bytes"""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def _attach(self):
+        key = (os.path.abspath(self.path), self.meta['token'])
+        if key not in _attached:
+            offsets = self.arrays['offsets']
+            buffer = self.arrays['strings'].tobytes()
+            strings = np.array([buffer[offsets[n]:offsets[n + 1]].decode() for n in range(len(offsets) - 1)],
+                               dtype=object)
+
+            model_df = pd.DataFrame({column['name']: strings[self.arrays['column%d' % n]] if column['coded']
+                                     else np.array(self.arrays['column%d' % n])
+                                     for n, column in enumerate(self.meta['columns'])},
+                                    index=pd.Index(np.array(self.arrays['index'])))
+            if model_df.index.equals(pd.RangeIndex(model_df.shape[0])):
+                model_df.index = pd.RangeIndex(model_df.shape[0])
+
+            nodes = list(strings[self.arrays['nodes']])
+            indptr, indices, weights = self.arrays['indptr'], self.arrays['indices'], self.arrays['weights']
+            graph = nx.DiGraph()
+            graph.add_nodes_from(nodes)
+            graph.add_weighted_edges_from((nodes[u], nodes[indices[e]], float(weights[e]))
+                                          for u in range(len(nodes)) for e in range(indptr[u], indptr[u + 1]))
+            if self.meta['reachability']:
+                # Seeds the cache of network.signed_reachability with the shared distances
+                _, positive, negative = signed_adjacency(graph)
+                paths = SignedReachability.from_distances(nodes, list(strings[self.arrays['sources']]),
+                                                          self.arrays['distances'], positive, negative)
+                graph.graph['signed_reachability'] = (network_digest(graph), paths)
+            _attached[key] = (model_df, graph)
+        return _attached[key]
+
+    @property
+    def model_df(self):
+        """The model dataframe, rebuilt once per process"""
+        return self._attach()[0]
+
+    @property
+    def graph(self):
+        """The model network, rebuilt once per process, with the shared signed reachability"""
+        return self._attach()[1]
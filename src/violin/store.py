@@ -0,0 +1,314 @@
+"""
+store.py
+
+Handles the SQLite results store: scored LEEs of one or more runs, with their categories, resolved model elements,
+and paper IDs, in an indexed database queried without loading whole output files
+Created October 2026 - MeLoDy Lab
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from violin.index import lee_elements
+from violin.progress import categories, category_values
+
+schema = """
+CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, created TEXT, model TEXT, reading TEXT,
+                                 n_lees INTEGER, settings TEXT);
+CREATE TABLE IF NOT EXISTS lees (run_id TEXT, lee INTEGER, category TEXT,
+                                 regulator TEXT, regulated TEXT, sign TEXT, connection_type TEXT,
+                                 evidence_score REAL, match_score REAL, kind_score REAL, epistemic_value REAL,
+                                 total_score REAL, data TEXT, PRIMARY KEY (run_id, lee));
+CREATE TABLE IF NOT EXISTS elements (run_id TEXT, lee INTEGER, role TEXT, model_row INTEGER, name TEXT);
+CREATE TABLE IF NOT EXISTS papers (run_id TEXT, lee INTEGER, paper_id TEXT);
+CREATE INDEX IF NOT EXISTS lees_category ON lees (run_id, category, total_score);
+CREATE INDEX IF NOT EXISTS lees_score ON lees (run_id, total_score);
+CREATE INDEX IF NOT EXISTS elements_name ON elements (name, role, run_id, lee);
+CREATE INDEX IF NOT EXISTS elements_row ON elements (run_id, model_row);
+CREATE INDEX IF NOT EXISTS papers_id ON papers (paper_id, run_id, lee);
+"""
+
+# Columns of the lees table returned by queries, and the reading or score column of each
+lee_cols = {'run_id': None, 'lee': None, 'category': None,
+            'regulator': 'Regulator Name', 'regulated': 'Regulated Name',
+            'sign': 'Sign', 'connection_type': 'Connection Type',
+            'evidence_score': 'Evidence Score', 'match_score': 'Match Score', 'kind_score': 'Kind Score',
+            'epistemic_value': 'Epistemic Value', 'total_score': 'Total Score'}
+
+# Model columns naming an element, as in index.build_index
+element_cols = ['Listname', 'Element Name', 'Element HGNC Symbol', 'Variable']
+
+
+def _names(value):
+    # Lower-case names of an element; HGNC symbols of a family or complex are comma-separated
+    value = str(value).lower().strip()
+    if value in ['', 'nan']:
+        return set()
+    return set([value] + [x.strip() for x in value.split(',') if x.strip()])
+
+
+def _value(value):
+    # JSON value of a reading cell
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_value(x) for x in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value if isinstance(value, (int, float, str)) or value is None else str(value)
+
+
+class ResultsStore:
+    """
+    SQLite database of scored LEEs. Each run (a scored reading) is kept under its run ID, with the category,
+    scores, and reading columns of every LEE, the names of the model elements its regulator and regulated element
+    were resolved to, and its paper IDs. Category, Total Score, element names, and paper IDs are indexed
+
+    Parameters
+    ----------
+    path : str
+        Database file, created when missing
+
+    Examples
+    --------
+    >>> store = ResultsStore('violin.sqlite')
+    >>> run_id = store.add_run(scored, model_df, kind_values, run_id='RA2')
+    >>> store.query(run_id='RA2', category='extensions', element='braf', min_evidence=4, limit=20)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(schema)
+
+    def close(self):
+        self.connection.close()
+
+    def add_run(self, scored_reading_df, model_df, kind_values, run_id=None, embedding_match=False,
+                model=None, reading=None, settings=None):
+        """
+        Inserts the LEEs of a scored reading in one transaction, replacing a run with the same ID
+
+        Parameters
+        ----------
+        scored_reading_df : pd.DataFrame
+            The scored reading dataframe (see scoring.score_reading); LEE ids are its row positions
+        model_df : pd.DataFrame
+            The model dataframe, used to resolve the LEE elements (see index.lee_elements);
+            None to only store the LEE element names
+        kind_values : dict
+            Dictionary assigning Kind Score values, used for the categories
+        run_id : str
+            ID of the run
+            Default is None (date and time, and a random suffix)
+        embedding_match : bool or embedding.EntityIndex
+            Passed to numeric.find_element
+            Default is False
+        model, reading : str
+            Model and reading files, kept with the run
+            Default is None
+        settings : dict
+            Scoring settings kept with the run (e.g. classify_scheme or attributes)
+            Default is None
+
+        Returns
+        -------
+        run_id : str
+        """
+        if run_id is None:
+            run_id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        scored = scored_reading_df.reset_index(drop=True)
+        n = scored.shape[0]
+        if model_df is not None:
+            regulators, regulated = lee_elements(scored, model_df, embedding_match)
+            model_names = {row: set().union(*[_names(model_df.at[row, col]) for col in element_cols
+                                              if col in model_df.columns]) for row in model_df.index}
+        else:
+            regulators, regulated = [[]]*n, [[]]*n
+        value_category = category_values(kind_values)
+
+        lees, elements, papers = [], [], []
+        records = scored.to_dict('records')
+        for x, record in enumerate(records):
+            row = [run_id, x, value_category.get(record['Kind Score'])]
+            for col in list(lee_cols)[3:]:
+                value = record.get(lee_cols[col])
+                if col in ['evidence_score', 'match_score', 'kind_score', 'epistemic_value', 'total_score']:
+                    value = None if str(value) in ['', 'nan'] else float(value)
+                else:
+                    value = None if value is None else str(value)
+                row.append(value)
+            row.append(json.dumps({col: _value(value) for col, value in record.items()}))
+            lees.append(row)
+            for role, rows in [('Regulator', regulators[x]), ('Regulated', regulated[x])]:
+                found = set()
+                for name in _names(record.get(role + ' Name')) | _names(record.get(role + ' HGNC Symbol')):
+                    found.add((None, name))
+                for model_row in rows:
+                    found.update((int(model_row), name) for name in model_names[model_row])
+                elements += [(run_id, x, role.lower(), model_row, name) for model_row, name in sorted(
+                    found, key=lambda item: (-1 if item[0] is None else item[0], item[1]))]
+            paper_ids = record.get('Paper IDs', [])
+            if not isinstance(paper_ids, (list, tuple, np.ndarray)):
+                paper_ids = [] if str(paper_ids) in ['', 'nan'] else str(paper_ids).split(',')
+            papers += [(run_id, x, str(paper_id)) for paper_id in dict.fromkeys(paper_ids)]
+
+        with self.connection:
+            self._delete(run_id)
+            self.connection.execute('INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)',
+                                    (run_id, time.strftime('%Y-%m-%d %H:%M:%S'), model, reading, n,
+                                     json.dumps(settings, default=str)))
+            self.connection.executemany('INSERT INTO lees ({}, data) VALUES ({})'.format(
+                ', '.join(lee_cols), ', '.join('?'*(len(lee_cols) + 1))), lees)
+            self.connection.executemany('INSERT INTO elements VALUES (?, ?, ?, ?, ?)', elements)
+            self.connection.executemany('INSERT INTO papers VALUES (?, ?, ?)', papers)
+        return run_id
+
+    def _delete(self, run_id):
+        for table in ['runs', 'lees', 'elements', 'papers']:
+            self.connection.execute('DELETE FROM {} WHERE run_id = ?'.format(table), (run_id,))
+
+    def delete_run(self, run_id):
+        """Deletes a run"""
+        with self.connection:
+            self._delete(run_id)
+
+    def runs(self):
+        """
+        Runs of the database
+
+        Returns
+        -------
+        runs_df : pd.DataFrame
+            ID, creation time, model and reading files, number of LEEs, and settings of each run
+        """
+        return pd.read_sql_query('SELECT * FROM runs ORDER BY created, run_id', self.connection)
+
+    def query(self, run_id=None, category=None, element=None, role='any', min_evidence=None, min_score=None,
+              paper_id=None, limit=None, full=False):
+        """
+        Scored LEEs, by decreasing Total Score
+
+        Parameters
+        ----------
+        run_id : str
+            Only LEEs of this run
+            Default is None (all runs)
+        category : str
+            Only LEEs of this category ('corroborations', 'extensions', 'contradictions', or 'flagged')
+            Default is None (all categories)
+        element : str or int
+            Only LEEs involving this element: a name, HGNC symbol, list-name, or variable name (case-insensitive)
+            of the LEE element or of the model element it was resolved to, or a model row
+            Default is None
+        role : str
+            Role of the element: 'regulator', 'regulated', or 'any'
+            Default is 'any'
+        min_evidence : float
+            Only LEEs with an Evidence Score of at least min_evidence
+            Default is None
+        min_score : float
+            Only LEEs with a Total Score of at least min_score
+            Default is None
+        paper_id : str
+            Only LEEs found in this paper
+            Default is None
+        limit : int
+            Maximum number of LEEs
+            Default is None (no maximum)
+        full : bool
+            Whether all the reading columns of the LEEs are returned, instead of the columns of the lees table
+            Default is False
+
+        Returns
+        -------
+        lees_df : pd.DataFrame
+        """
+        if category is not None and category not in categories:
+            raise ValueError("Unknown category: {}, options are: {}".format(category, ', '.join(categories)))
+        if role not in ['regulator', 'regulated', 'any']:
+            raise ValueError("role must be 'regulator', 'regulated', or 'any'")
+        conditions, params = [], []
+        if run_id is not None:
+            conditions.append('l.run_id = ?')
+            params.append(run_id)
+        if category is not None:
+            conditions.append('l.category = ?')
+            params.append(category)
+        if min_evidence is not None:
+            conditions.append('l.evidence_score >= ?')
+            params.append(float(min_evidence))
+        if min_score is not None:
+            conditions.append('l.total_score >= ?')
+            params.append(float(min_score))
+        if element is not None:
+            match = 'e.model_row = ?' if isinstance(element, (int, np.integer)) else 'e.name = ?'
+            params.append(int(element) if isinstance(element, (int, np.integer)) else str(element).lower().strip())
+            if role != 'any':
+                match += ' AND e.role = ?'
+                params.append(role)
+            conditions.append('EXISTS (SELECT 1 FROM elements e WHERE {} AND e.run_id = l.run_id '
+                              'AND e.lee = l.lee)'.format(match))
+        if paper_id is not None:
+            conditions.append('EXISTS (SELECT 1 FROM papers p WHERE p.paper_id = ? AND p.run_id = l.run_id '
+                              'AND p.lee = l.lee)')
+            params.append(str(paper_id))
+        sql = 'SELECT {} FROM lees l'.format(', '.join('l.' + col for col in list(lee_cols) + ['data']))
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY l.total_score DESC, l.run_id, l.lee'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        lees_df = pd.read_sql_query(sql, self.connection, params=params)
+        if full and lees_df.shape[0]:
+            data = pd.DataFrame([json.loads(row) for row in lees_df['data']], index=lees_df.index)
+            return pd.concat([lees_df[['run_id', 'lee', 'category']], data], axis=1)
+        return lees_df.drop(columns='data')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query a VIOLIN results store')
+    parser.add_argument('database', type=str, help='SQLite database written with use_violin(..., store=...)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('runs', help='list the runs of the database')
+    delete = subparsers.add_parser('delete', help='delete a run')
+    delete.add_argument('run_id', type=str)
+    query = subparsers.add_parser('query', help='scored LEEs, by decreasing Total Score')
+    query.add_argument('--run', type=str, default=None, help='(optional) run ID')
+    query.add_argument('--category', type=str, choices=list(categories), default=None,
+                       help='(optional) output category')
+    query.add_argument('--element', type=str, default=None,
+                       help='(optional) element name, HGNC symbol, list-name, or variable name')
+    query.add_argument('--role', type=str, choices=['regulator', 'regulated', 'any'], default='any',
+                       help='(optional) role of --element, default is any')
+    query.add_argument('--min-evidence', type=float, default=None, help='(optional) minimum Evidence Score')
+    query.add_argument('--min-score', type=float, default=None, help='(optional) minimum Total Score')
+    query.add_argument('--paper', type=str, default=None, help='(optional) paper ID')
+    query.add_argument('--limit', type=int, default=20, help='maximum number of LEEs, default is 20')
+    query.add_argument('--full', action='store_true', help='(optional) return all the reading columns')
+    query.add_argument('--output', type=str, default=None, help='(optional) CSV file of the LEEs')
+    args = parser.parse_args()
+
+    store = ResultsStore(args.database)
+    if args.command == 'runs':
+        print(store.runs().to_string(index=False))
+    elif args.command == 'delete':
+        store.delete_run(args.run_id)
+    else:
+        lees_df = store.query(run_id=args.run, category=args.category, element=args.element, role=args.role,
+                              min_evidence=args.min_evidence, min_score=args.min_score, paper_id=args.paper,
+                              limit=args.limit, full=args.full)
+        if args.output is not None:
+            lees_df.to_csv(args.output, index=False)
+        else:
+            print(lees_df.to_string(index=False))
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
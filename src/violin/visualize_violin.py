@@ -4,17 +4,257 @@ visualize_violin.py
 Creates visual representation of VIOLIN output
 Created November 2019 - Casey Hansen MeLoDy Lab
 """
+import concurrent.futures
+import multiprocessing
+import os
+import os.path
 import pandas as pd
 import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-import matplotlib.ticker as mticker
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import numpy as np
+from violin.scoring import parse_filter_opt
+from violin.progress import categories
+from violin.in_out import read_output
+from violin.histogram import ScoreHistogram, bin_cols
 
-def visualize (match_values, kind_values, file_name, filter_opt='100%'):
+# Kind Score classifications of the overview plot, and their colors
+overview_kinds = {'corroboration': ['strong corroboration', 'empty attribute', 'indirect interaction',
+                                    'path corroboration', 'specification'],
+                  'extensions': ['full extension', 'hanging extension', 'internal extension'],
+                  'contradictions': ['dir contradiction', 'sign contradiction', 'att contradiction'],
+                  'flagged': ['dir mismatch', 'path mismatch', 'self-regulation']}
+overview_colors = ['royalblue', 'limegreen', 'gold', 'darkorange']
+
+
+def score_histogram(kind_values, file_name, category=None):
+    """
+    Score histogram of VIOLIN output (see histogram.ScoreHistogram)
+
+    Parameters
+    ----------
+    kind_values : dict
+        Dictionary assigning Kind Score values
+    file_name : str, pd.DataFrame, or histogram.ScoreHistogram
+        See visualize
+    category : str
+        Classification to keep: 'corroborations', 'extensions', 'contradictions', or 'flagged'
+        Default is None (all VIOLIN output); file names already identify their classification
+
+    Returns
+    -------
+    histogram : histogram.ScoreHistogram
+    category : str
+        The classification, found from the file name for category output files
+    """
+    if isinstance(file_name, ScoreHistogram):
+        histogram = file_name
+    elif isinstance(file_name, pd.DataFrame):
+        histogram = ScoreHistogram.from_scored(file_name)
+    elif file_name.endswith('.json'):
+        histogram = ScoreHistogram.load(file_name)
+    elif os.path.isdir(file_name) or file_name.endswith('.parquet'):
+        # Only the partitions of the category and the score columns are read
+        histogram = ScoreHistogram.from_scored(read_output(file_name, columns=bin_cols, category=category))
+    else:
+        histogram = ScoreHistogram.from_scored(pd.read_csv(file_name, sep=',', index_col=None, usecols=bin_cols))
+        if '_outputDF' not in file_name:
+            category = file_name.split('.')[0].split('_')[-1]
+    if category is not None:
+        histogram = histogram.kinds(kind_values, category)
+    return histogram, category
+
+
+def _grouped_bars(ax, histograms, col, labels, log=False, rotation=0):
+    # One bar per category at each score value of col, with zeros for the values a category does not have
+    scores = sorted(set().union(*[histogram.score_counts(col).index for histogram in histograms]))
+    X_axis = np.arange(len(scores))
+    for idx, histogram in enumerate(histograms):
+        counts = histogram.score_counts(col).reindex(scores, fill_value=0)
+        ax.bar(X_axis+(idx*0.2), counts.values, 0.2, color=overview_colors[idx], label=labels[idx])
+    ax.set_xticks(X_axis)
+    ax.set_xticklabels(scores, rotation=rotation)
+    if log:
+        ax.set_yscale('log')
+    ax.legend(prop={'size': 6})
+    ax.set_ylabel('Number of LEEs')
+    ax.set_xlabel(col)
+
+
+def _pie(fig, ax, counts, labels, colors, anchor, **kwargs):
+    if all(x == 0 for x in counts):
+        return
+    ax.pie(np.array(counts), colors=colors, **kwargs)
+    if labels is not None:
+        ax.legend(labels=labels, bbox_to_anchor=anchor[0], loc=anchor[1], bbox_transform=fig.transFigure)
+
+
+def plot_overview(fig, kept, kind_values):
+    """
+    Draws the number of LEEs per category, and per Evidence, Match, and Total Score of each category
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure
+    kept : histogram.ScoreHistogram
+        Histogram of the filtered output
+    kind_values : dict
+        Dictionary assigning Kind Score values
+    """
+    labels = list(overview_kinds)
+    histograms = [kept.select([kind_values[kind] for kind in kinds]) for kinds in overview_kinds.values()]
+
+    ax = fig.add_subplot(2, 2, 1)
+    category = ['Corroboration', 'Extension', 'Contradiction', 'Flagged']
+    X_axis = np.arange(len(category))
+    ax.bar(X_axis, [len(histogram) for histogram in histograms], label=category, color=overview_colors)
+    ax.set_xticks(X_axis)
+    ax.set_xticklabels(category)
+    ax.set_ylabel('Number of LEEs')
+
+    _grouped_bars(fig.add_subplot(2, 2, 2), histograms, 'Evidence Score', labels, log=True, rotation=45)
+    _grouped_bars(fig.add_subplot(2, 2, 3), histograms, 'Match Score', labels)
+    _grouped_bars(fig.add_subplot(2, 2, 4), histograms, 'Total Score', labels, log=True, rotation=60)
+
+
+def plot_subcategories(fig, kept, kind_values):
+    """
+    Draws the number of LEEs per Kind Score classification of each category
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure
+    kept : histogram.ScoreHistogram
+        Histogram of the filtered output
+    kind_values : dict
+        Dictionary assigning Kind Score values
+    """
+    kind = kept.score_counts('Kind Score')
+    count = lambda name: int(kind.get(kind_values[name], 0)) if name in kind_values else False
+
+    strong_corr, weak_corr1, weak_corr2, weak_corr3, spec = \
+        [count(name) for name in ['strong corroboration', 'empty attribute', 'indirect interaction',
+                                  'path corroboration', 'specification']]
+    mylabels = ["Strong Corroborations: "+str(strong_corr), "empty attribute: "+str(weak_corr1),
+                "indirect interactions: "+str(weak_corr2), "path corroborations: "+str(weak_corr3),
+                "Specifications: "+str(spec)]
+    _pie(fig, fig.add_subplot(1, 4, 1), [strong_corr, weak_corr1, weak_corr2, weak_corr3, spec], mylabels,
+         ['#235490', '#2B65AD', '#718EC5', '#B0BEDA', '#E7EFF9'], ((0.2, 0), "lower center"))
+
+    full_ext, hang_ext, int_ext = [count(name) for name in ['full extension', 'hanging extension',
+                                                            'internal extension']]
+    mylabels = ["Full Extensions: "+str(full_ext), "Hanging Extensions: "+str(hang_ext),
+                "Internal Extensions: "+str(int_ext)]
+    _pie(fig, fig.add_subplot(1, 4, 2), [full_ext, hang_ext, int_ext], mylabels,
+         ['#24552D', '#49A155', '#7DBA84'], ((0.4, 0), "lower center"))
+
+    dir_cont, sign_cont, att_cont = [count(name) for name in ['dir contradiction', 'sign contradiction',
+                                                              'att contradiction']]
+    mylabels = ["Direction Contradictions: "+str(dir_cont), "Sign Contradictions: "+str(sign_cont),
+                "Attribute Contradictions: "+str(att_cont)]
+    _pie(fig, fig.add_subplot(1, 4, 3), [dir_cont, sign_cont, att_cont], mylabels,
+         ['#BE9735', '#E2B441', '#F9E6A9'], ((0.62, 0), "lower center"))
+
+    flg1, flg2, flg3, flg4, flg5 = [count(name) for name in ['dir mismatch', 'path mismatch', 'self-regulation',
+                                                             'flagged4', 'flagged5']]
+    if flg4 and flg5:
+        flgds = [flg1, flg2, flg3, flg4, flg5]
+        mylabels = ["dir mismatch: "+str(flg1), "path mismatch: "+str(flg2), "self-regulation: "+str(flg3),
+                    "Flagged 4: "+str(flg4), "Flagged 5: "+str(flg5)]
+        mycolors = ['#AA5626', '#C7652E', '#F1C6A8', '#F5D4BE', '#FCF1EA']
+    else:
+        flgds = [flg1, flg2, flg3]
+        mylabels = ["dir mismatch: " + str(flg1), "path mismatch: " + str(flg2), "self-regulation: " + str(flg3)]
+        mycolors = ['#AA5626', '#C7652E', '#F1C6A8']
+    _pie(fig, fig.add_subplot(1, 4, 4), flgds, mylabels, mycolors, ((0.82, 0), "lower center"))
+
+
+def plot_category(fig, kept, match_values, kind_values, category, total):
+    """
+    Draws the Evidence, Match, and Total Scores of the LEEs of a category, and its Kind Score classifications
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure
+    kept : histogram.ScoreHistogram
+        Histogram of the filtered output of the category
+    match_values : dict
+        Dictionary assigning Match Score values
+    kind_values : dict
+        Dictionary assigning Kind Score values
+    category : str
+        'corroborations', 'extensions', 'contradictions', or 'flagged'
+    total : int
+        Number of LEEs of the category before filtering
+    """
+    mycolors = {"corroborations": 'royalblue',
+                "extensions": 'limegreen',
+                "contradictions": 'gold',
+                "flagged": 'darkorange'}
+
+    #Evidence Score plots
+    evidence = kept.score_counts('Evidence Score')
+    ax = fig.add_subplot(2, 2, 1)
+    ax.bar(evidence.index, evidence.values, 0.2, color=mycolors[category], label=category)
+    ax.set_yscale('log')
+    ax.legend(prop={'size': 6})
+    ax.set_ylabel('Number of LEEs')
+    ax.set_xlabel('Evidence Score')
+
+    #Match Score plots
+    ax = fig.add_subplot(2, 2, 2)
+    scores = sorted([match_values['source present'], match_values['target present'],
+                     match_values['both present'], match_values['neither present']])
+    X_axis = np.arange(len(scores))
+    counts = kept.score_counts('Match Score').reindex(scores, fill_value=0)
+    ax.bar(X_axis, counts.values, 0.2, color=mycolors[category], label=category)
+    ax.set_xticks(X_axis)
+    ax.set_xticklabels(scores)
+    ax.legend(prop={'size': 6})
+    ax.set_ylabel('Number of LEEs')
+    ax.set_xlabel('Match Score')
+
+    #Total Score plots
+    ax = fig.add_subplot(2, 2, 3)
+    scores = kept.score_counts('Total Score')
+    ax.bar(scores.index, scores.values, 0.2, color=mycolors[category], label=category)
+    ax.set_yscale('log')
+    ax.legend(prop={'size': 6})
+    ax.set_ylabel('Number of LEEs')
+    ax.set_xlabel('Total Score')
+
+    #Category Breakdown
+    ax = fig.add_subplot(2, 2, 4)
+    kind = kept.score_counts('Kind Score')
+    cats = {'corroborations': ['strong corroboration', 'empty attribute', 'indirect interaction', 'path corroboration'],
+            'corroborations colors': ['#235490', '#2B65AD', '#718EC5', '#B0BEDA'],
+            'extensions': ['full extension', 'hanging extension', 'internal extension', 'specification'],
+            'extensions colors': ['#24552D', '#49A155', '#7DBA84', '#B6D5B8'],
+            'contradictions': ['dir contradiction', 'sign contradiction', 'att contradiction'],
+            'contradictions colors': ['#BE9735', '#E2B441', '#F9E6A9'],
+            'flagged': ['dir mismatch', 'path mismatch', 'self-regulation'],
+            'flagged colors': ['#AA5626', '#C7652E', '#F1C6A8']}
+    sub_cats = cats[category]
+    colors = cats[category+' colors']
+    # If separated (several subcategory values), one slice per subcategory
+    if len(set(kind_values[each] for each in sub_cats)) > 1:
+        counts = [int(kind.get(kind_values[x], 0)) for x in sub_cats]
+        mylabels = [x+": "+str(n) for x, n in zip(sub_cats, counts)]
+        _pie(fig, ax, counts, mylabels, colors, ((1, 0.25), "lower right"))
+    else:
+        _pie(fig, ax, [total], None, [colors[1]], None, autopct=lambda p: '{:.0f}'.format(p * total / 100))
+
+
+def visualize (match_values, kind_values, file_name, filter_opt='100%', category=None, save_dir=None):
     """
     This creates graphs of the VIOLIN output:
     evidence score, match score, and total score,
-    and classification breakdown
+    and classification breakdown.
+    The graphs are drawn from the score histogram of the output (see histogram.ScoreHistogram),
+    in time independent of the number of LEEs once the histogram is built
 
     Parameters
     ----------
@@ -22,9 +262,12 @@ def visualize (match_values, kind_values, file_name, filter_opt='100%'):
         Dictionary assigning Match Score Values
     kind_values : dict
         Dictionary assigning Kind Score values
-    file_name : string
+    file_name : string, pd.DataFrame, or histogram.ScoreHistogram
         VIOLIN output to be visualized. Can be specific classification,
         or choosing 'TotalOutput' file will visualize all VIOLIN output
+        Can also be the scored reading dataframe itself (see scoring.score_reading),
+        a Parquet output dataset (see in_out.output_parquet), of which only the score columns are read,
+        or the score histogram of a scoring run (or its .json file)
     filter_opt : str
         How much VIOLIN output should be visualized. Can be filtered
         by top % of total score, evidence score (Se) threshold, or
@@ -32,318 +275,94 @@ def visualize (match_values, kind_values, file_name, filter_opt='100%'):
         Accepted options are 'X%','Se>Y', or 'St>Z',
         where X, Y, and Z, are values
         Default is '100%' (Total Output)
+    category : str
+        Classification of a scored reading dataframe, Parquet dataset, or histogram to be visualized:
+        'corroborations', 'extensions', 'contradictions', or 'flagged'
+        Default is None (all VIOLIN output); file names already identify their classification
+    save_dir : str
+        Directory where the graphs are saved as .png files, drawn with the Agg backend without a display,
+        instead of being shown
+        Default is None (graphs are shown)
+
+    Returns
+    -------
+    files : list
+        Files of the saved graphs (empty when save_dir is None)
     """
+    histogram, category = score_histogram(kind_values, file_name, category)
+    kept = histogram.filter(*parse_filter_opt(filter_opt))
 
-    # Input file
-    output = pd.read_csv(file_name, sep=',',index_col=None).fillna("nan")
+    figures = []
+    # If visualizing all categories of output
+    if category is None:
+        figures.append(('Output_Overview.png', (12, 6), lambda fig: plot_overview(fig, kept, kind_values)))
+        # If Kind Score identifies sub-categories, add additional plot;
+        #check with contradictions
+        if len(set(kind_values[each] for each in ['dir contradiction', 'sign contradiction', 'att contradiction'])) > 1:
+            figures.append(('Subcategory_Overview.png', (16, 4),
+                            lambda fig: plot_subcategories(fig, kept, kind_values)))
+    # If only visualizing one category:
+    else:
+        figures.append((category+'_Overview.png', (12, 6),
+                        lambda fig: plot_category(fig, kept, match_values, kind_values, category, len(histogram))))
 
-    # Filtering by %
-    if '%' in filter_opt:
-        filter_value = int(filter_opt.replace('%',''))/100
-        percent = int(output.shape[0]*filter_value)
-        kept = output.head(percent)
+    files = []
+    for name, size, draw in figures:
+        if save_dir is None:
+            fig = plt.figure(figsize=size)
+            draw(fig)
+            if name == 'Output_Overview.png':
+                plt.show()
+                plt.close()
+        else:
+            fig = Figure(figsize=size)
+            FigureCanvasAgg(fig)
+            draw(fig)
+            files.append(os.path.join(save_dir, name))
+            fig.savefig(files[-1], bbox_inches="tight", dpi=200)
+    return files
 
-    # Filtering by Total Score
-    elif 'St>' in filter_opt:
-        filter_value = int(filter_opt.replace('St>',''))
-        kept = output.loc[(output['Total Score'] >= filter_value)]
 
-    # Filtering by Evidence Score
-    elif 'Se>' in filter_opt:
-        filter_value = int(filter_opt.replace('Se>',''))
-        kept = output.loc[(output['Evidence Score'] >= filter_value)]
+def _plot(args):
+    return visualize(*args)
 
-    # Else - filter value error
-    else:
-        raise ValueError('Filter value not accepted'+'\n'+
-        'Accepted options are \'X%\',\'Se>Y\', or \'St>Z\','+'\n'+
-        'where X, Y, and Z, are numerical values')
 
-    # If visualizing all categories of output
-    if '_outputDF' in file_name:
-        # Separating output my category
-        corroborations = kept[kept["Kind Score"].isin([kind_values['strong corroboration'],
-                                                           kind_values['empty attribute'],
-                                                           kind_values['indirect interaction'],
-                                                           kind_values['path corroboration'],
-                                                           kind_values['specification']])]
-        extensions = kept[kept["Kind Score"].isin([kind_values['full extension'],
-                                                    kind_values['hanging extension'],
-                                                    kind_values['internal extension']])]
-        contradictions = kept[kept["Kind Score"].isin([kind_values['dir contradiction'],
-                                                        kind_values['sign contradiction'],
-                                                        kind_values['att contradiction']])]
-        flagged = kept[kept["Kind Score"].isin([kind_values['dir mismatch'],
-                                                    kind_values['path mismatch'],
-                                                    kind_values['self-regulation']])]
-
-        plt.figure(figsize=(12, 6))
-        # Plot main category distribution
-        category = ['Corroboration','Extension','Contradiction','Flagged']
-        X_axis = np.arange(len(category))
-        mycolors = ['royalblue','limegreen','gold','darkorange']
-        counts = [corroborations.shape[0],extensions.shape[0],contradictions.shape[0],flagged.shape[0]]
-
-        plt.subplot(2, 2, 1)
-        plt.bar(X_axis,counts,label=category,color=mycolors)
-        plt.xticks(X_axis, category)
-        plt.ylabel('Number of LEEs')
-
-        #Evidence Score plots
-        scores = list(set(kept['Evidence Score']))
-        X_axis = np.arange(len(scores))
-        category = [corroborations['Evidence Score'],extensions['Evidence Score'],
-                    contradictions['Evidence Score'],flagged['Evidence Score']]
-        cat_lab = ['corroboration', 'extensions', 'contradictions', 'flagged']
-        colors = ['royalblue','limegreen','gold','darkorange']
-
-        plt.subplot(2, 2, 2)
-        for idx in range(len(category)):
-            evidence = category[idx].value_counts().keys().tolist()
-            counts = category[idx].value_counts().tolist()
-            # housekeeping to make sure all data is the same size
-            for value in scores:
-                if value not in evidence:
-                    evidence += [value]
-                    counts += [0]
-            counts = [x for _,x in sorted(zip(evidence,counts))]
-            plt.bar(X_axis+(idx*0.2),counts,0.2,color=colors[idx],label=cat_lab[idx])
-        plt.xticks(X_axis, scores, rotation=45)
-        plt.yscale('log')
-        plt.legend(prop={'size': 6})
-        plt.ylabel('Number of LEEs')
-        plt.xlabel('Evidence Score')
-
-        #Match Score plots
-        scores = list(set(kept['Match Score']))
-        X_axis = np.arange(len(scores))
-        category = [corroborations['Match Score'],extensions['Match Score'],
-                    contradictions['Match Score'],flagged['Match Score']]
-        cat_lab = ['corroboration', 'extensions', 'contradictions', 'flagged']
-        colors = ['royalblue','limegreen','gold','darkorange']
-
-        plt.subplot(2, 2, 3)
-        for idx in range(len(category)):
-            evidence = category[idx].value_counts().keys().tolist()
-            counts = category[idx].value_counts().tolist()
-            for value in scores:
-                if value not in evidence:
-                    evidence += [value]
-                    counts += [0]
-            counts = [x for _,x in sorted(zip(evidence,counts))]
-            plt.bar(X_axis+(idx*0.2),counts,0.2,color=colors[idx],label=cat_lab[idx])
-        plt.xticks(X_axis, scores)
-        plt.legend(prop={'size': 6})
-        plt.ylabel('Number of LEEs')
-        plt.xlabel('Match Score')
-
-        #Total Score plots
-        score_set = list(set(kept['Total Score'].tolist()))
-        scores = [float(i) for i in score_set]
-        X_axis = np.arange(len(scores))
-        category = [corroborations['Total Score'],extensions['Total Score'],
-                    contradictions['Total Score'],flagged['Total Score']]
-        cat_lab = ['corroboration', 'extensions', 'contradictions', 'flagged']
-        colors = ['royalblue','limegreen','gold','darkorange']
-
-        plt.subplot(2, 2, 4)
-        for idx in range(4):
-            evidence = [float(i) for i in category[idx].value_counts().keys().tolist()]
-            counts = category[idx].value_counts().tolist()
-            for value in scores:
-                if value not in evidence:
-                    evidence += [value]
-                    counts += [0]
-            counts = [x for _,x in sorted(zip(evidence,counts))]
-            plt.bar(X_axis+(idx*0.2),counts,0.2,color=colors[idx],label=cat_lab[idx])
-        scores.sort()
-        plt.xticks(X_axis, scores, rotation=60)
-        plt.yscale('log')
-        plt.legend(prop={'size': 6})
-        plt.ylabel('Number of LEEs')
-        plt.xlabel('Total Score')
-        plt.show()
-        #plt.savefig('Output_Overview.png',bbox_inches = "tight",dpi=200)
-        plt.close()
+def plot_all(match_values, kind_values, file_name, save_dir, filter_opt='100%', workers=None):
+    """
+    Saves the graphs of all VIOLIN output and of each category (see visualize), in parallel processes
 
-        # If Kind Score identifies sub-categories, add additional plot;
-        #check with contradictions
-        cat_vals = []
-        for each in ['dir contradiction','sign contradiction','att contradiction']: cat_vals += [kind_values[each]]
-        if len(set(cat_vals))>1:
-            kind = list(kept['Kind Score'])
-
-            strong_corr = kind.count(kind_values['strong corroboration'])
-            weak_corr1 = kind.count(kind_values['empty attribute'])
-            weak_corr2 = kind.count(kind_values['indirect interaction'])
-            weak_corr3 = kind.count(kind_values['path corroboration'])
-            spec = kind.count(kind_values['specification'])
-            corrs = np.array([strong_corr, weak_corr1, weak_corr2, weak_corr3, spec])
-            mylabels = ["Strong Corroborations: "+str(strong_corr), "empty attribute: "+str(weak_corr1),
-                        "indirect interactions: "+str(weak_corr2), "path corroborations: "+str(weak_corr3), "Specifications: "+str(spec)]
-            mycolors = ['#235490','#2B65AD','#718EC5','#B0BEDA', '#E7EFF9']
-            plt.figure(figsize=(16, 4))
-            plt.subplot(1, 4, 1)
-            if all(x == 0 for x in corrs):
-                pass
-            else:
-                plt.pie(corrs,colors=mycolors)
-                plt.legend(labels=mylabels,bbox_to_anchor=(0.2,0), loc="lower center",
-                       bbox_transform=plt.gcf().transFigure)
-
-            full_ext = kind.count(kind_values['full extension'])
-            hang_ext = kind.count(kind_values['hanging extension'])
-            int_ext = kind.count(kind_values['internal extension'])
-            exts = np.array([full_ext, hang_ext, int_ext])
-            mylabels = ["Full Extensions: "+str(full_ext), "Hanging Extensions: "+str(hang_ext),
-                        "Internal Extensions: "+str(int_ext)]
-            mycolors = ['#24552D','#49A155','#7DBA84']
-            plt.subplot(1, 4, 2)
-            if all(x == 0 for x in exts):
-                pass
-            else:
-                plt.pie(exts,colors=mycolors)
-                plt.legend(labels=mylabels,bbox_to_anchor=(0.4,0), loc="lower center",
-                       bbox_transform=plt.gcf().transFigure)
-
-            dir_cont = kind.count(kind_values['dir contradiction'])
-            sign_cont = kind.count(kind_values['sign contradiction'])
-            att_cont =  kind.count(kind_values['att contradiction'])
-            conts = np.array([dir_cont, sign_cont, att_cont])
-            mylabels = ["Direction Contradictions: "+str(dir_cont), "Sign Contradictions: "+str(sign_cont),
-                        "Attribute Contradictions: "+str(att_cont)]
-            mycolors = ['#BE9735','#E2B441','#F9E6A9']
-            plt.subplot(1, 4, 3)
-            if all(x == 0 for x in conts):
-                pass
-            else:
-                plt.pie(conts,colors=mycolors)
-                plt.legend(labels=mylabels,bbox_to_anchor=(0.62,0), loc="lower center",
-                       bbox_transform=plt.gcf().transFigure)
-            flg4, flg5 = False, False
-            flg1 = kind.count(kind_values['dir mismatch'])
-            flg2 = kind.count(kind_values['path mismatch'])
-            flg3 = kind.count(kind_values['self-regulation'])
-            if 'flagged4' in kind_values:
-                flg4 = kind.count(kind_values['flagged4'])
-            else: pass
-            if 'flagged5' in kind_values:
-                flg5 = kind.count(kind_values['flagged5'])
-            else: pass
-            flgds = np.array([flg1, flg2, flg3, flg4, flg5]) if (flg4 and flg5) else np.array([flg1, flg2, flg3])
-            mylabels = ["dir mismatch: "+str(flg1), "path mismatch: "+str(flg2),
-                        "self-regulation: "+str(flg3), "Flagged 4: "+str(flg4), "Flagged 5: "+str(flg5)] if (flg4 and flg5) else \
-                        ["dir mismatch: " + str(flg1), "path mismatch: " + str(flg2),
-                        "self-regulation: " + str(flg3)]
-            mycolors = ['#AA5626','#C7652E','#F1C6A8', '#F5D4BE', '#FCF1EA'] if (flg4 and flg5) else ['#AA5626','#C7652E','#F1C6A8']
-            plt.subplot(1, 4, 4)
-            if all(x == 0 for x in flgds):
-                pass
-            else:
-                plt.pie(flgds,colors=mycolors)
-                plt.legend(labels=mylabels,bbox_to_anchor=(0.82,0), loc="lower center",
-                       bbox_transform=plt.gcf().transFigure)
-            #plt.savefig('Subcategory_Overview.png',bbox_inches = "tight",dpi=200)
-            plt.close
+    Parameters
+    ----------
+    match_values : dict
+        Dictionary assigning Match Score Values
+    kind_values : dict
+        Dictionary assigning Kind Score values
+    file_name : str, pd.DataFrame, or histogram.ScoreHistogram
+        VIOLIN output to be visualized, see visualize; read once
+    save_dir : str
+        Directory where the graphs are saved
+    filter_opt : str
+        How much VIOLIN output should be visualized, see visualize
+        Default is '100%' (Total Output)
+    workers : int
+        Number of worker processes, 0 to draw in this process
+        Default is None (one per graph, up to the number of CPUs)
 
-    # If only visualizing one category:
+    Returns
+    -------
+    files : list
+        Files of the saved graphs
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    histogram, _ = score_histogram(kind_values, file_name)
+    jobs = [(match_values, kind_values, histogram, filter_opt, category, save_dir)
+            for category in [None] + list(categories)]
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(jobs))
+    if workers > 0:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = list(executor.map(_plot, jobs))
     else:
-        category = file_name.split('.')[0].split('_')[-1]
-        mycolors = {"corroborations" : 'royalblue',
-                    "extensions" : 'limegreen',
-                    "contradictions" : 'gold',
-                    "flagged" : 'darkorange'}
-
-        plt.figure(figsize=(12, 6))
-        #Evidence Score plots
-        evidence = kept['Evidence Score'].value_counts().keys().tolist()
-        counts = kept['Evidence Score'].value_counts().tolist()
-        plt.subplot(2, 2, 1)
-        plt.bar(evidence,counts,0.2,color=mycolors[category],label=category)
-        plt.yscale('log')
-        plt.legend(prop={'size': 6})
-        plt.ylabel('Number of LEEs')
-        plt.xlabel('Evidence Score')
-
-        #Match Score plots
-        plt.subplot(2, 2, 2)
-        scores = [match_values['source present'],match_values['target present'],
-                match_values['both present'],match_values['neither present']]
-        scores.sort()
-        X_axis = np.arange(len(scores))
-        evidence = kept['Match Score'].value_counts().keys().tolist()
-        counts = kept['Match Score'].value_counts().tolist()
-        for value in scores:
-            if value not in evidence:
-                evidence += [value]
-                counts += [0]
-        counts = [x for _,x in sorted(zip(evidence,counts))]
-        plt.bar(X_axis,counts,0.2,color=mycolors[category],label=category)
-        plt.xticks(X_axis, scores)
-        plt.legend(prop={'size': 6})
-        plt.ylabel('Number of LEEs')
-        plt.xlabel('Match Score')
-        ticks_loc = X_axis
-
-
-        #Total Score plots
-        plt.subplot(2, 2, 3)
-
-        scores = list(set(kept['Total Score']))
-        scores = [float(i) for i in scores]
-        X_axis = np.arange(len(scores))
-        evidence = kept['Total Score'].value_counts().keys().tolist()
-        counts = kept['Total Score'].value_counts().tolist()
-        plt.bar(evidence,counts,0.2,color=mycolors[category],label=category)
-        # plt.xticks(X_axis, evidence, rotation=45)
-        plt.yscale('log')
-        plt.legend(prop={'size': 6})
-        plt.ylabel('Number of LEEs')
-        plt.xlabel('Total Score')
-
-        #Category Breakdown
-        plt.subplot(2, 2, 4)
-        #Pie Chart
-        kind = list(kept['Kind Score'])
-        cats = {'corroborations':['strong corroboration', 'empty attribute', 'indirect interaction', 'path corroboration'],
-                'corroborations colors':['#235490','#2B65AD','#718EC5','#B0BEDA'],
-                'extensions':['full extension', 'hanging extension', 'internal extension', 'specification'],
-                'extensions colors': ['#24552D','#49A155','#7DBA84','#B6D5B8'],
-                'contradictions':['dir contradiction', 'sign contradiction', 'att contradiction','none'],
-                'contradictions colors':['#BE9735','#E2B441','#F9E6A9','none'],
-                'flagged':['dir mismatch', 'path mismatch', 'self-regulation', 'none'],
-                'flagged colors':['#AA5626','#C7652E','#F1C6A8','none']}
-        cat_df = pd.DataFrame(cats)
-        #1: Get subcategory names
-        sub_cats = cats[category]
-        if 'none' in sub_cats: sub_cats.remove('none')
-        mycolors = cats[category+' colors']
-        if 'none' in mycolors: mycolors.remove('none')
-        #2: see if separated (set of category values >2)
-        cat_vals = []
-        for each in sub_cats: cat_vals += [kind_values[each]]
-        #3: If separated, get subcategory names
-        if len(set(cat_vals))>1:
-            mylabels = []
-            counts = []
-            for x in sub_cats:
-                mylabels += [x+": "+str(kind.count(kind_values[x]))]
-                counts += [kind.count(kind_values[x])]
-            numbs = np.array(counts)
-            if all(x ==0 for x in numbs):
-                pass
-            else:
-                plt.pie(numbs,colors=mycolors)
-                plt.legend(labels=mylabels,bbox_to_anchor=(1,0.25), loc="lower right",
-                    bbox_transform=plt.gcf().transFigure)
-        else:
-            mylabels = [category]
-            counts = [output.shape[0]]
-            numbs = np.array(counts)
-            if all(x==0 for x in numbs):
-                pass
-            else:
-                plt.pie(numbs,colors=[mycolors[1]],autopct=lambda p: '{:.0f}'.format(p * counts[0] / 100))
-                #plt.savefig(category+'_Overview.png',bbox_inches = "tight",dpi=200)
-                plt.close
-    return
+        results = [_plot(job) for job in jobs]
+    return [file for files in results for file in files]
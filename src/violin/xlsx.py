@@ -0,0 +1,158 @@
+"""
+xlsx.py
+
+Handles fast reading of .xlsx models and readings: the calamine engine when it is installed,
+streaming of huge sheets, and a cached columnar (Parquet) copy reused instead of the sheet
+Created October 2026 - MeLoDy Lab
+
+Usage (one-time conversion):
+    python -m violin.xlsx examples/input/interactions/REACH/*.xlsx
+"""
+
+import argparse
+import os.path
+
+import pandas as pd
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+# Suffix of the cached columnar copy of a sheet
+cache_ext = '.parquet'
+
+
+def cache_path(file_name):
+    """
+    Returns the filename of the cached columnar copy of a sheet (e.g. model.xlsx.parquet)
+
+    Parameters
+    ----------
+    file_name : str
+        Directory and filename of the .xlsx file
+
+    Returns
+    -------
+    path : str
+    """
+    return file_name + cache_ext
+
+
+def _cache_valid(file_name):
+    # The cache is only reused while it is newer than the sheet
+    path = cache_path(file_name)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(file_name)
+
+
+def read_excel(file_name, use_cache=True):
+    """
+    Reads the first sheet of an .xlsx file as a dataframe, from its cached columnar copy when valid
+    (see convert), otherwise with the calamine engine when python-calamine is installed, or openpyxl
+
+    Parameters
+    ----------
+    file_name : str
+        Directory and filename of the .xlsx file
+    use_cache : bool
+        Whether a cached columnar copy newer than the sheet is read instead
+        Default is True
+
+    Returns
+    -------
+    df : pd.DataFrame
+    """
+    if use_cache and _cache_valid(file_name):
+        return pd.read_parquet(cache_path(file_name))
+    if python_calamine is not None:
+        return pd.read_excel(file_name, index_col=None, engine='calamine')
+    return pd.read_excel(file_name, index_col=None)
+
+
+def iter_rows(file_name, chunk_size=10000):
+    """
+    Streams the first sheet of an .xlsx file in chunks of rows, without loading the whole sheet
+
+    Parameters
+    ----------
+    file_name : str
+        Directory and filename of the .xlsx file
+    chunk_size : int
+        Number of rows in each chunk
+        Default is 10000
+
+    Yields
+    ------
+    chunk : pd.DataFrame
+        Consecutive rows of the sheet, with the column names of the header row
+    """
+    if python_calamine is not None:
+        workbook = python_calamine.CalamineWorkbook.from_path(file_name)
+        rows = workbook.get_sheet_by_index(0).iter_rows()
+        close = None
+    else:
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_name, read_only=True, data_only=True)
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        close = workbook.close
+
+    try:
+        columns = next(rows, None)
+        if columns is None:
+            return
+        columns = list(columns)
+        chunk = []
+        for row in rows:
+            # Empty cells are read as None by openpyxl and '' by calamine
+            chunk.append([None if x == '' else x for x in row])
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        if close is not None:
+            close()
+
+
+def convert(file_name):
+    """
+    Converts an .xlsx file to its cached columnar copy, which is read in place of the sheet
+    (by read_excel, and so by in_out.preprocessing_model and in_out.preprocessing_reading)
+    until the sheet is modified. Requires pyarrow
+
+    Parameters
+    ----------
+    file_name : str
+        Directory and filename of the .xlsx file
+
+    Returns
+    -------
+    path : str
+        Filename of the cached copy
+    """
+    df = read_excel(file_name, use_cache=False)
+    # Parquet columns have a single type: cells of text columns holding numbers are stored as text
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].dropna()
+        if not values.map(lambda x: isinstance(x, str)).all():
+            df[col] = df[col].map(lambda x: x if pd.isna(x) else str(x))
+    df.columns = [str(c) for c in df.columns]
+    path = cache_path(file_name)
+    df.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert .xlsx models and readings to cached columnar files')
+    parser.add_argument('files', nargs='+', help='.xlsx files to convert')
+    args = parser.parse_args()
+    for file_name in args.files:
+        if os.path.splitext(file_name)[1] != '.xlsx':
+            parser.error('Only .xlsx files are converted: ' + file_name)
+        print(file_name, '->', convert(file_name))
+
+
+if __name__ == '__main__':
+    main()